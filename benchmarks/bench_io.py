@@ -0,0 +1,251 @@
+# benchmarks/bench_io.py
+"""
+İçe aktarma ve dışa aktarma verim (throughput) benchmark'ı.
+
+Her boyut için sentetik veri setinden yükleyicilerin beklediği biçimde Excel dosyaları
+üretilir ve şu aşamalar ayrı ayrı ölçülür:
+    ders_parse / ders_load            ExcelLoader.load_dersler
+    ogrenci_parse / ogrenci_load      ExcelLoader.load_ogrenciler
+    fill_parse / fill_normalize /
+    fill_build / fill_write           fill_ogrenci_ders aşama fonksiyonları
+    export_excel                      ExamScheduler.export_to_excel
+    schedule_persist                  ExamScheduler.schedule (yalnızca PostgreSQL ile)
+    export_pdf                        SeatPlanner.export_pdf / render_pdf
+Her aşama için süre, satır/sn ve tepe RSS raporlanır.
+
+--dsn verilirse geçici bir şema (bench_<pid>) içinde gerçek PostgreSQL'e yazılır ve iş
+bitince şema silinir; verilmezse benchmarks.standin.StandInDatabase kullanılır ve
+DB yazma aşamaları yalnızca Python tarafı maliyetini ölçer (fill_write atlanır).
+
+Kullanım (depo kökünden):
+    python -m benchmarks.bench_io --students 1000 10000 --output bench_io.json
+    python -m benchmarks.bench_io --students 10000 --dsn "host=localhost dbname=bench user=postgres password=..."
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+from time import perf_counter
+
+import ref_cache
+from benchmarks.bench_scheduler import REPO_ROOT, START_DATE, DEFAULT_TIMES, peak_rss_mb, child_env
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+
+
+class StageTimer:
+    def __init__(self):
+        self.results = []
+
+    @contextmanager
+    def stage(self, name):
+        """Aşamayı ölçer; gövde info["rows"] değerini işlenen satır sayısıyla doldurur."""
+        info = {"rows": 0}
+        rss0 = peak_rss_mb()
+        t0 = perf_counter()
+        yield info
+        wall = perf_counter() - t0
+        rss1 = peak_rss_mb()
+        self.results.append({
+            "stage": name,
+            "wall_sec": round(wall, 4),
+            "rows": info["rows"],
+            "rows_per_sec": round(info["rows"] / wall, 1) if wall > 0 else None,
+            "peak_rss_mb": rss1,
+            "rss_growth_mb": round(rss1 - rss0, 1),
+        })
+
+
+def open_postgres(dsn):
+    """Geçici şemalı bir Database bağlantısı açar. Dönüş: (db, şema adı)"""
+    from psycopg2.extensions import parse_dsn
+    from connection import Database
+
+    cfg = parse_dsn(dsn)
+    db = Database(host=cfg.get("host", "localhost"), database=cfg.get("dbname", "exam_schedule_db"),
+                  user=cfg.get("user", "exam_user"), password=cfg.get("password", ""),
+                  port=int(cfg.get("port", 5432)))
+    db.connect()
+    schema = f"bench_{os.getpid()}"
+    db.execute(f"CREATE SCHEMA {schema}")
+    db.execute(f"SET search_path TO {schema}")
+    with open(SCHEMA_FILE, encoding="utf-8") as f:
+        db.execute(f.read())
+    return db, schema
+
+
+def run_size(n_students, seed=0, dsn=None, pdf_exams=20, workdir=None):
+    """Tek bir boyut için tüm aşamaları bu süreçte çalıştırır."""
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    import pandas as pd
+    from excel_loader import ExcelLoader
+    from exam_scheduler import ExamScheduler
+    import fill_ogrenci_ders as fill
+    from benchmarks.synthetic import generate_dataset, to_snapshot
+    from benchmarks.workbooks import write_course_workbook, write_student_workbook
+    from benchmarks.standin import StandInDatabase
+
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_io_")
+    dataset = generate_dataset(n_students, seed=seed)
+    course_wb = os.path.join(workdir, f"dersler_{n_students}.xlsx")
+    student_wb = os.path.join(workdir, f"ogrenciler_{n_students}.xlsx")
+
+    timer = StageTimer()
+    with timer.stage("generate_workbooks") as info:
+        info["rows"] = write_course_workbook(dataset, course_wb) + write_student_workbook(dataset, student_wb)
+
+    schema = None
+    if dsn:
+        db, schema = open_postgres(dsn)
+    else:
+        db = StandInDatabase()
+
+    try:
+        loader = ExcelLoader(db)
+        bolum = dataset["courses"][0]["bolum"]
+
+        with timer.stage("ders_parse") as info:
+            info["rows"] = len(pd.read_excel(course_wb, header=None))
+        with timer.stage("ders_load") as info:
+            loader.load_dersler(course_wb, bolum)
+            info["rows"] = len(dataset["courses"])
+
+        with timer.stage("ogrenci_parse") as info:
+            info["rows"] = len(pd.read_excel(student_wb))
+        with timer.stage("ogrenci_load") as info:
+            loader.load_ogrenciler(student_wb)
+            info["rows"] = len(dataset["enrollments"])
+
+        with timer.stage("fill_parse") as info:
+            df = fill.read_students_excel(student_wb)
+            info["rows"] = len(df)
+        with timer.stage("fill_normalize") as info:
+            df = fill.normalize_students(df)
+            info["rows"] = len(df)
+        if dsn:
+            rows = db.execute("SELECT id, kod FROM dersler", fetchall=True)
+            kod_to_id = {fill.norm_code(kod): cid for cid, kod in rows}
+        else:
+            kod_to_id = {fill.norm_code(c["kod"]): c["id"] for c in dataset["courses"]}
+        with timer.stage("fill_build") as info:
+            students, rels, _, _ = fill.build_upserts(df, kod_to_id)
+            info["rows"] = len(students) + len(rels)
+        if dsn:
+            with timer.stage("fill_write") as info:
+                fill.write_upserts(db.cur, students, rels)
+                db.conn.commit()
+                info["rows"] = len(students) + len(rels)
+
+        # Dışa aktarma girdisi: bellekte üretilmiş plan
+        snapshot = to_snapshot(dataset)
+        plan = ExamScheduler(None, times_per_day=DEFAULT_TIMES).plan(
+            snapshot, START_DATE, START_DATE + timedelta(days=20))
+        scheduled = plan["scheduled"]
+
+        with timer.stage("export_excel") as info:
+            ExamScheduler(db).export_to_excel(scheduled, filename=os.path.join(workdir, "takvim.xlsx"))
+            info["rows"] = len(scheduled)
+
+        from seat_planner import SeatPlanner
+        if dsn:
+            for r in dataset["rooms"]:
+                db.execute(
+                    "INSERT INTO derslikler (id, bolum, kod, ad, kapasite, enine_sira, boyuna_sira, sira_yapisi) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                    (r["id"], r["bolum"], r["kod"], r["ad"], r["kapasite"], r["enine"], r["boyuna"], r["sira"])
+                )
+            ref_cache.for_db(db).invalidate("derslikler")
+            with timer.stage("schedule_persist") as info:
+                persisted, _ = ExamScheduler(db, times_per_day=DEFAULT_TIMES).schedule(
+                    START_DATE, START_DATE + timedelta(days=20))
+                info["rows"] = sum(se["n_students"] for se in persisted) + len(persisted)
+            planner = SeatPlanner(db)
+            with timer.stage("export_pdf") as info:
+                for se in persisted[:pdf_exams]:
+                    planner.export_pdf(se["sinav_id"], os.path.join(workdir, f"oturma_{se['sinav_id']}.pdf"))
+                    info["rows"] += se["n_students"]
+        else:
+            names = {no: adsoyad for no, adsoyad, _ in dataset["students"]}
+            by_id = {c["id"]: c for c in snapshot["courses"]}
+            rooms = {r["id"]: r for r in snapshot["rooms"]}
+            with timer.stage("export_pdf") as info:
+                for i, se in enumerate(scheduled[:pdf_exams]):
+                    room = rooms[se["derslik_id"]]
+                    students = sorted(by_id[se["ders_id"]]["students"])
+                    assigns = [(no, names[no], k // room["enine"] + 1, k % room["enine"] + 1)
+                               for k, no in enumerate(students)]
+                    sinav = (i + 1, se["ders_kod"], se["ders_ad"], se["tarih"], se["saat"],
+                             se["derslik_ad"], room["enine"], room["boyuna"])
+                    SeatPlanner.render_pdf(sinav, assigns, os.path.join(workdir, f"oturma_{i + 1}.pdf"))
+                    info["rows"] += len(assigns)
+    finally:
+        if schema:
+            db.execute(f"DROP SCHEMA {schema} CASCADE")
+        db.close()
+
+    return {
+        "n_students": n_students,
+        "n_enrollments": len(dataset["enrollments"]),
+        "backend": "postgresql" if dsn else "standin",
+        "stages": timer.results,
+    }
+
+
+def run_in_subprocess(n_students, args):
+    cmd = [sys.executable, "-m", "benchmarks.bench_io", "--child", str(n_students), "--seed", str(args.seed),
+           "--pdf-exams", str(args.pdf_exams)]
+    if args.dsn:
+        cmd += ["--dsn", args.dsn]
+    try:
+        proc = subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True, text=True, timeout=args.timeout,
+                              env=child_env())
+    except subprocess.TimeoutExpired:
+        return {"n_students": n_students, "error": f"timeout ({args.timeout} sn)"}
+    if proc.returncode != 0:
+        return {"n_students": n_students, "error": (proc.stderr.strip().splitlines() or ["hata"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="İçe/dışa aktarma verim benchmark'ı")
+    parser.add_argument("--students", type=int, nargs="+", default=[1000, 10000], help="öğrenci sayıları")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dsn", help="geçici PostgreSQL için bağlantı dizesi (yoksa gömülü stand-in)")
+    parser.add_argument("--pdf-exams", type=int, default=20, help="PDF'i üretilecek sınav sayısı")
+    parser.add_argument("--timeout", type=int, default=3600, help="boyut başına süre sınırı (sn)")
+    parser.add_argument("--output", help="sonuçların yazılacağı JSON dosyası (varsayılan: stdout)")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        print(json.dumps(run_size(args.child, seed=args.seed, dsn=args.dsn, pdf_exams=args.pdf_exams),
+                         default=str))
+        return 0
+
+    results = []
+    for n in args.students:
+        res = run_in_subprocess(n, args)
+        results.append(res)
+        for st in res.get("stages", []):
+            print(f"{n:>7} {st['stage']:<18} {st['wall_sec']:>9.3f} sn {st['rows_per_sec'] or 0:>12.1f} satır/sn "
+                  f"{st['peak_rss_mb']:>8} MB", file=sys.stderr)
+        if "error" in res:
+            print(f"{n:>7} öğrenci: {res['error']}", file=sys.stderr)
+
+    out = {"benchmark": "io", "params": {"seed": args.seed, "pdf_exams": args.pdf_exams}, "results": results}
+    text = json.dumps(out, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+# benchmarks/bench_scheduler.py
+"""
+ExamScheduler için sentetik veri üzerinde ölçek eğrisi benchmark'ı.
+
+Veritabanı gerekmez: veri benchmarks.synthetic ile üretilir ve ExamScheduler.plan()
+bellekteki anlık görüntü üzerinde çalıştırılır. Her boyut ayrı bir alt süreçte koşar,
+böylece tepe bellek (peak RSS) ölçümleri birbirini etkilemez.
+
+Kullanım (depo kökünden):
+    python -m benchmarks.bench_scheduler --sizes 1000 5000 20000 100000 --output bench_scheduler.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+from datetime import date, timedelta
+from time import perf_counter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [1000, 5000, 20000, 100000]
+DEFAULT_TIMES = ["09:00", "11:00", "13:30", "15:30", "17:00"]
+START_DATE = date(2025, 1, 6)  # Pazartesi; tarih sabit ki sonuçlar karşılaştırılabilsin
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux KB, macOS byte döndürür
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def child_env():
+    """Alt süreç ortamı: sabit hash tohumu ile küme/sözlük sırası çalıştırmalar arasında aynı kalır."""
+    env = dict(os.environ)
+    env["PYTHONHASHSEED"] = "0"
+    return env
+
+
+def run_scenario(n_students, seed=0, days=21, times=None, duration=75):
+    """Tek bir boyutu bu süreçte çalıştırır ve ölçümleri sözlük olarak döndürür."""
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    from exam_scheduler import ExamScheduler
+    from run_report import RunReport
+    from benchmarks.synthetic import generate_dataset, to_snapshot
+
+    t0 = perf_counter()
+    dataset = generate_dataset(n_students, seed=seed)
+    snapshot = to_snapshot(dataset)
+    generate_sec = perf_counter() - t0
+    rss_before = peak_rss_mb()
+
+    scheduler = ExamScheduler(None, times_per_day=times or DEFAULT_TIMES)
+    report = RunReport()
+    t0 = perf_counter()
+    result = scheduler.plan(snapshot, START_DATE, START_DATE + timedelta(days=days - 1),
+                            duration_default=duration, report=report)
+    runtime = perf_counter() - t0
+
+    n_courses = len(snapshot["courses"])
+    n_placed = result["metrics"]["n_scheduled"]
+    return {
+        "n_students": n_students,
+        "n_courses": n_courses,
+        "n_rooms": len(snapshot["rooms"]),
+        "n_enrollments": len(dataset["enrollments"]),
+        "generate_sec": round(generate_sec, 4),
+        "runtime_sec": round(runtime, 4),
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_before_plan_mb": rss_before,
+        "placement_rate": round(n_placed / n_courses, 4) if n_courses else 1.0,
+        "n_failed": result["metrics"]["n_failed"],
+        "conflict_checks": report.counters.get("conflict_checks", 0),
+        "candidates_tried": report.counters.get("candidates_tried", 0),
+        "counters": report.counters,
+    }
+
+
+def run_in_subprocess(n_students, args):
+    cmd = [sys.executable, "-m", "benchmarks.bench_scheduler", "--child", str(n_students),
+           "--seed", str(args.seed), "--days", str(args.days), "--duration", str(args.duration),
+           "--times", ",".join(args.times)]
+    try:
+        proc = subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True, text=True, timeout=args.timeout,
+                              env=child_env())
+    except subprocess.TimeoutExpired:
+        return {"n_students": n_students, "error": f"timeout ({args.timeout} sn)"}
+    if proc.returncode != 0:
+        return {"n_students": n_students, "error": (proc.stderr.strip().splitlines() or ["hata"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ExamScheduler sentetik veri benchmark'ı")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="öğrenci sayıları")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=21, help="takvim günü cinsinden sınav penceresi")
+    parser.add_argument("--duration", type=int, default=75, help="varsayılan sınav süresi (dk)")
+    parser.add_argument("--times", type=lambda s: [t.strip() for t in s.split(",") if t.strip()],
+                        default=DEFAULT_TIMES, help="günlük saatler, virgülle")
+    parser.add_argument("--timeout", type=int, default=1800, help="boyut başına süre sınırı (sn)")
+    parser.add_argument("--output", help="sonuçların yazılacağı JSON dosyası (varsayılan: stdout)")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        res = run_scenario(args.child, seed=args.seed, days=args.days, times=args.times,
+                           duration=args.duration)
+        print(json.dumps(res))
+        return 0
+
+    results = []
+    for n in args.sizes:
+        res = run_in_subprocess(n, args)
+        results.append(res)
+        if "error" in res:
+            print(f"{n:>7} öğrenci: {res['error']}", file=sys.stderr)
+        else:
+            print(f"{n:>7} öğrenci: {res['runtime_sec']:.2f} sn, {res['peak_rss_mb']} MB, "
+                  f"yerleşim %{res['placement_rate'] * 100:.1f}, "
+                  f"çakışma kontrolü {res['conflict_checks']}", file=sys.stderr)
+
+    out = {
+        "benchmark": "scheduler",
+        "params": {"seed": args.seed, "days": args.days, "duration": args.duration, "times": args.times},
+        "results": results,
+    }
+    text = json.dumps(out, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
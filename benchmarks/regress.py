@@ -0,0 +1,210 @@
+# benchmarks/regress.py
+"""
+Performans regresyon koruması.
+
+Scheduler ve içe/dışa aktarma benchmark'larını --repeat kez çalıştırır, senaryo ve metrik
+başına medyan / varyans hesaplar ve benchmarks/baselines/ altındaki kayıtlı baseline
+dosyalarıyla karşılaştırır. Bir metrik eşik değerinden fazla kötüleşirse okunabilir bir
+fark tablosu basar ve 1 ile çıkar.
+
+Sonuçlar deterministiktir: veri sabit tohumla üretilir, alt süreçler PYTHONHASHSEED=0
+ile çalışır ve baseline'daki parametreler (tohum, boyutlar, saatler) uyuşmazsa
+karşılaştırma yapılmaz. Sayaç metrikleri (çakışma kontrolü, yerleşim oranı) bu yüzden
+makineden bağımsızdır ve depoda (baselines/<suite>.json) tutulur. Süre ve bellek metrikleri
+makineye özgüdür: baselines/local/ altına yazılır (depoya girmez); yoksa ilk çalıştırma
+bu metrikleri yalnızca raporlar, başarısız saymaz.
+
+Kullanım (depo kökünden):
+    python -m benchmarks.regress --update          # baseline'ları kaydet (sayaçlar + bu makinenin süreleri)
+    python -m benchmarks.regress                   # ölç ve karşılaştır
+    python -m benchmarks.regress --suites scheduler --threshold 0.3
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+from types import SimpleNamespace
+
+from benchmarks import bench_io, bench_scheduler
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# metrik -> yön ("lower": küçük daha iyi, "higher": büyük daha iyi)
+METRICS = {
+    "scheduler": {"runtime_sec": "lower", "peak_rss_mb": "lower",
+                  "conflict_checks": "lower", "placement_rate": "higher"},
+    "io": {"wall_sec": "lower", "peak_rss_mb": "lower"},
+}
+DEFAULT_SIZES = {"scheduler": [1000, 5000, 20000], "io": [1000, 10000]}
+# Makineden bağımsız metrikler: depodaki baseline'a yazılır
+PORTABLE = {"conflict_checks", "placement_rate"}
+
+
+def collect(suite, params):
+    """Bir çalıştırmanın sonuçlarını {senaryo: {metrik: değer}} biçiminde düzleştirir."""
+    flat = {}
+    if suite == "scheduler":
+        args = SimpleNamespace(seed=params["seed"], days=params["days"], duration=params["duration"],
+                               times=params["times"], timeout=params["timeout"])
+        for n in params["sizes"]:
+            res = bench_scheduler.run_in_subprocess(n, args)
+            if "error" in res:
+                raise RuntimeError(f"scheduler/{n}: {res['error']}")
+            flat[f"scheduler/{n}"] = {m: res[m] for m in METRICS["scheduler"]}
+    else:
+        args = SimpleNamespace(seed=params["seed"], dsn=params.get("dsn"), pdf_exams=params["pdf_exams"],
+                               timeout=params["timeout"])
+        for n in params["sizes"]:
+            res = bench_io.run_in_subprocess(n, args)
+            if "error" in res:
+                raise RuntimeError(f"io/{n}: {res['error']}")
+            for st in res["stages"]:
+                flat[f"io/{n}/{st['stage']}"] = {m: st[m] for m in METRICS["io"]}
+    return flat
+
+
+def aggregate(runs):
+    """Tekrarlı çalıştırmaları senaryo/metrik başına medyan ve varyansa indirger."""
+    out = {}
+    for key in runs[0]:
+        out[key] = {}
+        for metric in runs[0][key]:
+            values = [r[key][metric] for r in runs if key in r]
+            out[key][metric] = {
+                "median": statistics.median(values),
+                "variance": statistics.variance(values) if len(values) > 1 else 0.0,
+                "n": len(values),
+            }
+    return out
+
+
+def compare(suite, baseline, current, threshold):
+    """Dönüş: (tablo satırları, regresyon sayısı)"""
+    lines, regressions = [], 0
+    for key in sorted(current):
+        if key not in baseline:
+            lines.append(f"  {key:<34} (baseline yok, atlandı)")
+            continue
+        for metric, cur in current[key].items():
+            base = baseline[key].get(metric)
+            if base is None:
+                continue
+            b, c = base["median"], cur["median"]
+            noise = 3 * (base["variance"] ** 0.5)
+            if METRICS[suite][metric] == "lower":
+                limit = max(b * (1 + threshold), b + noise)
+                bad = c > limit
+            else:
+                limit = min(b * (1 - threshold), b - noise) if metric != "placement_rate" else b - 0.001
+                bad = c < limit
+            change = f"{(c - b) / b * 100:+.1f}%" if b else "n/a"
+            mark = "REGRESYON" if bad else "ok"
+            regressions += bad
+            lines.append(f"  {key:<34} {metric:<16} {b:>12.4g} -> {c:<12.4g} {change:>8}  {mark}")
+    return lines, regressions
+
+
+def baseline_path(suite, local=False):
+    return os.path.join(BASELINE_DIR, "local" if local else "", f"{suite}.json")
+
+
+def select(scenarios, portable):
+    """Senaryolardan yalnızca makineden bağımsız (portable=True) ya da makineye özgü metrikler."""
+    out = {}
+    for key, metrics in scenarios.items():
+        picked = {m: v for m, v in metrics.items() if (m in PORTABLE) == portable}
+        if picked:
+            out[key] = picked
+    return out
+
+
+def write_baseline(path, fingerprint, scenarios):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"params": fingerprint, "scenarios": scenarios}, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    print(f"baseline yazıldı: {path}")
+
+
+def load_baseline(path, fingerprint):
+    """Dönüş: senaryolar; dosya yoksa None. Parametreler uyuşmazsa ValueError."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["params"] != fingerprint:
+        raise ValueError(f"baseline parametreleri farklı, karşılaştırılamaz ({path}):\n"
+                         f"  baseline: {baseline['params']}\n  şimdiki:  {fingerprint}")
+    return baseline["scenarios"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark sonuçlarını kayıtlı baseline'larla karşılaştırır")
+    parser.add_argument("--suites", nargs="+", choices=sorted(METRICS), default=sorted(METRICS))
+    parser.add_argument("--repeat", type=int, default=3, help="senaryo başına tekrar sayısı")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="izin verilen göreli kötüleşme (0.2 = %%20)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dsn", help="io benchmark'ı için geçici PostgreSQL (yoksa stand-in)")
+    parser.add_argument("--timeout", type=int, default=1800)
+    parser.add_argument("--update", action="store_true", help="baseline dosyalarını yeniden yaz")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for suite in args.suites:
+        params = {"seed": args.seed, "sizes": DEFAULT_SIZES[suite], "timeout": args.timeout}
+        if suite == "scheduler":
+            params.update(days=21, duration=75, times=bench_scheduler.DEFAULT_TIMES)
+        else:
+            params.update(pdf_exams=20, dsn=args.dsn)
+        # baseline uyumluluğu için kaydedilen parametreler (dsn / timeout hariç)
+        fingerprint = {k: v for k, v in params.items() if k not in ("dsn", "timeout")}
+        fingerprint["backend"] = "postgresql" if params.get("dsn") else "standin" if suite == "io" else None
+
+        runs = []
+        for i in range(args.repeat):
+            print(f"[{suite}] çalıştırma {i + 1}/{args.repeat}...", file=sys.stderr)
+            runs.append(collect(suite, params))
+        current = aggregate(runs)
+
+        if args.update:
+            portable = select(current, portable=True)
+            if portable:
+                write_baseline(baseline_path(suite), fingerprint, portable)
+            write_baseline(baseline_path(suite, local=True), fingerprint, select(current, portable=False))
+            continue
+
+        try:
+            shared = load_baseline(baseline_path(suite), fingerprint)
+            local = load_baseline(baseline_path(suite, local=True), fingerprint)
+        except ValueError as e:
+            print(f"[{suite}] {e}")
+            failed = True
+            continue
+        if local is None:
+            # Bu makinede ilk çalıştırma: süre / bellek karşılaştırılmaz, kayıt için --update
+            print(f"[{suite}] bu makine için süre/bellek baseline'ı yok; yalnızca sayaçlar karşılaştırılır "
+                  f"(kaydetmek için --update).")
+        baseline = {}
+        for scenarios in (shared or {}, local or {}):
+            for key, metrics in scenarios.items():
+                baseline.setdefault(key, {}).update(metrics)
+        if local is None:
+            current = select(current, portable=True)
+
+        lines, regressions = compare(suite, baseline, current, args.threshold)
+        if not lines:
+            print(f"[{suite}] karşılaştırılacak baseline yok (ilk çalıştırma).")
+            continue
+        print(f"[{suite}] eşik %{args.threshold * 100:.0f}, {args.repeat} tekrar:")
+        print("\n".join(lines))
+        if regressions:
+            print(f"[{suite}] {regressions} metrikte regresyon.")
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+-- Benchmark'lar için geçici PostgreSQL şeması (uygulamanın kullandığı sütunlarla sınırlı)
+CREATE TABLE IF NOT EXISTS derslikler (
+    id SERIAL PRIMARY KEY,
+    bolum VARCHAR(100),
+    kod VARCHAR(50),
+    ad VARCHAR(100),
+    kapasite INT,
+    enine_sira INT,
+    boyuna_sira INT,
+    sira_yapisi INT
+);
+
+CREATE TABLE IF NOT EXISTS dersler (
+    id SERIAL PRIMARY KEY,
+    bolum VARCHAR(100),
+    kod VARCHAR(50) UNIQUE,
+    ad VARCHAR(200),
+    hoca VARCHAR(100),
+    sinif INT,
+    zorunlu BOOLEAN
+);
+
+CREATE TABLE IF NOT EXISTS derslik_takvim (
+    id SERIAL PRIMARY KEY,
+    derslik_id INT NOT NULL REFERENCES derslikler(id) ON DELETE CASCADE,
+    tarih DATE NOT NULL,
+    baslangic TIME,
+    bitis TIME,
+    aciklama VARCHAR(200)
+);
+
+CREATE TABLE IF NOT EXISTS ogrenciler (
+    no VARCHAR(20) PRIMARY KEY,
+    adsoyad VARCHAR(200),
+    sinif INT,
+    ad VARCHAR(200) GENERATED ALWAYS AS (TRIM(REGEXP_REPLACE(adsoyad, '\s+\S+$', ''))) STORED,
+    soyad VARCHAR(200) GENERATED ALWAYS AS (REGEXP_REPLACE(adsoyad, '.*\s+', '')) STORED
+);
+
+CREATE TABLE IF NOT EXISTS ogrenci_ders (
+    ogrenci_no VARCHAR(20) NOT NULL REFERENCES ogrenciler(no) ON DELETE CASCADE,
+    ders_id INT NOT NULL REFERENCES dersler(id) ON DELETE CASCADE,
+    PRIMARY KEY (ogrenci_no, ders_id)
+);
+
+CREATE TABLE IF NOT EXISTS degisiklik_sayaci (
+    tablo VARCHAR(63) PRIMARY KEY,
+    sayac BIGINT NOT NULL DEFAULT 0,
+    kurulum TIMESTAMP NOT NULL DEFAULT clock_timestamp()
+);
+INSERT INTO degisiklik_sayaci (tablo) VALUES ('ogrenci_ders') ON CONFLICT DO NOTHING;
+CREATE OR REPLACE FUNCTION degisiklik_sayaci_artir() RETURNS trigger AS $$
+BEGIN
+    UPDATE degisiklik_sayaci SET sayac = sayac + 1 WHERE tablo = TG_TABLE_NAME;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS ogrenci_ders_sayac ON ogrenci_ders;
+CREATE TRIGGER ogrenci_ders_sayac
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON ogrenci_ders
+    FOR EACH STATEMENT EXECUTE FUNCTION degisiklik_sayaci_artir();
+
+CREATE TABLE IF NOT EXISTS takvim_surumleri (
+    id SERIAL PRIMARY KEY,
+    ad VARCHAR(200),
+    tur VARCHAR(50) NOT NULL DEFAULT '',
+    bolum VARCHAR(100) NOT NULL DEFAULT '',
+    kaynak_id INT REFERENCES takvim_surumleri(id) ON DELETE SET NULL,
+    olusturma TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS yayindaki_takvim (
+    bolum VARCHAR(100) NOT NULL,
+    tur VARCHAR(50) NOT NULL,
+    surum_id INT NOT NULL REFERENCES takvim_surumleri(id),
+    yayin_zamani TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (bolum, tur)
+);
+
+CREATE TABLE IF NOT EXISTS sinavlar (
+    id SERIAL PRIMARY KEY,
+    ders_id INT REFERENCES dersler(id) ON DELETE CASCADE,
+    tarih DATE,
+    saat TIME,
+    sure INT,
+    derslik_id INT REFERENCES derslikler(id),
+    surum_id INT REFERENCES takvim_surumleri(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS sinavlar_surum_ders ON sinavlar (surum_id, ders_id);
+
+CREATE OR REPLACE VIEW yayindaki_sinavlar AS
+    SELECT s.* FROM sinavlar s JOIN yayindaki_takvim y ON y.surum_id = s.surum_id;
+
+CREATE TABLE IF NOT EXISTS oturma (
+    id SERIAL PRIMARY KEY,
+    sinav_id INT REFERENCES sinavlar(id) ON DELETE CASCADE,
+    ogrenci_no VARCHAR(20),
+    sira INT,
+    sutun INT
+);
+
+CREATE TABLE IF NOT EXISTS gozetmenler (
+    id SERIAL PRIMARY KEY,
+    bolum VARCHAR(100),
+    ad VARCHAR(200) NOT NULL,
+    max_gorev INT
+);
+
+CREATE TABLE IF NOT EXISTS gozetmen_takvim (
+    id SERIAL PRIMARY KEY,
+    gozetmen_id INT NOT NULL REFERENCES gozetmenler(id) ON DELETE CASCADE,
+    tarih DATE NOT NULL,
+    baslangic TIME,
+    bitis TIME
+);
+
+CREATE TABLE IF NOT EXISTS gozetmen_atama (
+    sinav_id INT NOT NULL REFERENCES sinavlar(id) ON DELETE CASCADE,
+    gozetmen_id INT NOT NULL REFERENCES gozetmenler(id) ON DELETE CASCADE,
+    PRIMARY KEY (sinav_id, gozetmen_id)
+);
+
+CREATE TABLE IF NOT EXISTS ogrenci_sinav (
+    no VARCHAR(20) NOT NULL,
+    ad VARCHAR(100),
+    soyad VARCHAR(100),
+    ders_id INT NOT NULL REFERENCES dersler(id) ON DELETE CASCADE,
+    PRIMARY KEY (no, ders_id)
+);
+CREATE INDEX IF NOT EXISTS ogrenci_sinav_ders ON ogrenci_sinav (ders_id);
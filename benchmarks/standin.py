@@ -0,0 +1,42 @@
+# benchmarks/standin.py
+"""
+PostgreSQL yokken kullanılan gömülü Database yerine geçen sınıf.
+
+Sorguları çalıştırmaz; yalnızca sayar ve yükleyicilerin ihtiyaç duyduğu tek aramayı
+(ders kodu -> id) yanıtlar. Böylece ExcelLoader'ın Python tarafı maliyeti sunucu
+gecikmesinden bağımsız ölçülür.
+"""
+
+
+class StandInDatabase:
+    def __init__(self):
+        self.round_trips = 0
+        self.rows_written = 0
+        self.kod_to_id = {}
+
+    def execute(self, query, params=None, fetchone=False, fetchall=False):
+        self.round_trips += 1
+        q = " ".join(query.split())
+        if q.startswith("INSERT INTO dersler"):
+            kod = params[1]
+            if kod not in self.kod_to_id:
+                self.kod_to_id[kod] = len(self.kod_to_id) + 1
+                self.rows_written += 1
+            return None
+        if q.startswith("SELECT id FROM dersler WHERE kod=%s"):
+            cid = self.kod_to_id.get(params[0])
+            return (cid,) if cid else None
+        if q.split(" ", 1)[0].upper() in ("INSERT", "UPDATE", "DELETE"):
+            self.rows_written += 1
+        if fetchone:
+            return None
+        if fetchall:
+            return []
+        return None
+
+    def stream(self, query, params=None, itersize=2000):
+        self.round_trips += 1
+        return iter(())
+
+    def close(self):
+        pass
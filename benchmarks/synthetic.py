@@ -0,0 +1,110 @@
+# benchmarks/synthetic.py
+"""
+Tohumlanmış sentetik veri üreteci: öğrenciler, dersler, öğrenci-ders kayıtları ve derslikler.
+
+Yapı gerçek fakülteye benzer: her bölümde 4 sınıf, sınıf başına zorunlu dersler,
+3. ve 4. sınıfların ortak seçmeli havuzu ve alttan/üstten ders alan düzensiz öğrenciler.
+Aynı (n_students, seed) her zaman aynı veriyi üretir.
+"""
+import random
+
+STUDENTS_PER_DEPARTMENT = 1000
+MANDATORY_PER_YEAR = 6
+ELECTIVES_PER_DEPARTMENT = 12
+ELECTIVES_PER_STUDENT = 2
+IRREGULAR_RATIO = 0.1
+ROOM_CAPACITIES = [30, 40, 40, 50, 60, 80, 100, 120, 150, 300]
+
+FIRST_NAMES = ["Ahmet", "Ayşe", "Mehmet", "Fatma", "Mustafa", "Zeynep", "Ali", "Elif", "Can", "Ece"]
+LAST_NAMES = ["Yılmaz", "Kaya", "Demir", "Şahin", "Çelik", "Yıldız", "Aydın", "Öztürk", "Arslan", "Doğan"]
+
+
+def generate_dataset(n_students, seed=0):
+    """
+    Dönüş: {
+        "students": [(no, adsoyad, sinif)],
+        "courses": [{"id", "bolum", "kod", "ad", "hoca", "sinif", "zorunlu"}],
+        "enrollments": [(ogrenci_no, ders_id)],
+        "rooms": [{"id", "bolum", "kod", "ad", "kapasite", "enine", "boyuna", "sira"}],
+    }
+    """
+    rng = random.Random(seed)
+    n_departments = max(1, round(n_students / STUDENTS_PER_DEPARTMENT))
+    courses, rooms, students, enrollments = [], [], [], []
+    course_id = room_id = 0
+    student_seq = 0
+
+    for dep in range(n_departments):
+        bolum = f"Bölüm {dep + 1}"
+        instructors = [f"Hoca {dep + 1}-{k + 1}" for k in range(MANDATORY_PER_YEAR * 2)]
+
+        mandatory = {}  # sınıf -> [ders_id]
+        for year in range(1, 5):
+            mandatory[year] = []
+            for k in range(MANDATORY_PER_YEAR):
+                course_id += 1
+                courses.append({
+                    "id": course_id, "bolum": bolum, "kod": f"B{dep + 1:02d}{year}{k + 1:02d}",
+                    "ad": f"Zorunlu Ders {year}.{k + 1}", "hoca": rng.choice(instructors),
+                    "sinif": year, "zorunlu": True,
+                })
+                mandatory[year].append(course_id)
+        electives = []
+        for k in range(ELECTIVES_PER_DEPARTMENT):
+            course_id += 1
+            year = 3 + k % 2
+            courses.append({
+                "id": course_id, "bolum": bolum, "kod": f"S{dep + 1:02d}{year}{k + 1:02d}",
+                "ad": f"Seçmeli Ders {k + 1}", "hoca": rng.choice(instructors),
+                "sinif": year, "zorunlu": False,
+            })
+            electives.append(course_id)
+
+        for cap in ROOM_CAPACITIES:
+            room_id += 1
+            enine = 6 if cap <= 60 else 10
+            boyuna = -(-cap // enine)
+            rooms.append({
+                "id": room_id, "bolum": bolum, "kod": f"D{dep + 1:02d}-{room_id}",
+                "ad": f"Derslik {dep + 1}-{room_id}", "kapasite": cap,
+                "enine": enine, "boyuna": boyuna, "sira": 2,
+            })
+
+        dep_students = min(STUDENTS_PER_DEPARTMENT, n_students - student_seq) if dep < n_departments - 1 \
+            else n_students - student_seq
+        for _ in range(dep_students):
+            student_seq += 1
+            no = f"{2020 + dep % 5}{student_seq:07d}"
+            year = rng.randint(1, 4)
+            students.append((no, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", year))
+            taken = set(mandatory[year])
+            if rng.random() < IRREGULAR_RATIO:
+                # düzensiz öğrenci: komşu sınıftan birkaç ders
+                other = year - 1 if year > 1 and (year == 4 or rng.random() < 0.5) else year + 1
+                taken.update(rng.sample(mandatory[other], 2))
+            if year >= 3:
+                taken.update(rng.sample(electives, ELECTIVES_PER_STUDENT))
+            enrollments.extend((no, cid) for cid in sorted(taken))
+
+    return {"students": students, "courses": courses, "enrollments": enrollments, "rooms": rooms}
+
+
+def to_snapshot(dataset, bolum=None):
+    """Veri setini ExamScheduler.plan() için load_snapshot() biçimine çevirir."""
+    by_course = {}
+    for no, cid in dataset["enrollments"]:
+        by_course.setdefault(cid, []).append(no)
+    courses = []
+    for c in dataset["courses"]:
+        if bolum and c["bolum"] != bolum:
+            continue
+        students = by_course.get(c["id"], [])
+        courses.append({"id": c["id"], "kod": c["kod"], "ad": c["ad"], "sinif": c["sinif"], "hoca": c["hoca"],
+                        "students": students, "n_students": len(students)})
+    rooms = [
+        {"id": r["id"], "kod": r["kod"], "ad": r["ad"], "kapasite": r["kapasite"],
+         "enine": r["enine"], "boyuna": r["boyuna"], "sira": r["sira"]}
+        for r in dataset["rooms"] if not bolum or r["bolum"] == bolum
+    ]
+    rooms.sort(key=lambda r: -r["kapasite"])
+    return {"courses": courses, "rooms": rooms}
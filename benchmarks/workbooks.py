@@ -0,0 +1,47 @@
+# benchmarks/workbooks.py
+"""Sentetik veri setinden ExcelLoader / fill_ogrenci_ders'in beklediği biçimde çalışma kitapları yazar."""
+import pandas as pd
+
+COURSE_HEADER = ["DERS KODU", "DERSİN ADI", "DERSİ VEREN ÖĞR. ELEMANI"]
+
+
+def write_course_workbook(dataset, path):
+    """
+    ExcelLoader.load_dersler biçimi (başlıksız): "N. Sınıf" satırı, "DERS KODU" başlık satırı,
+    zorunlu dersler; varsa "SEÇMELİ DERSLER" satırı ve o sınıfın seçmelileri.
+    Dönüş: ders satırı sayısı
+    """
+    rows = []
+    n = 0
+    for bolum in sorted({c["bolum"] for c in dataset["courses"]}):
+        dep_courses = [c for c in dataset["courses"] if c["bolum"] == bolum]
+        for year in range(1, 5):
+            rows.append([f"{year}. Sınıf", None, None])
+            rows.append(COURSE_HEADER)
+            for c in dep_courses:
+                if c["sinif"] == year and c["zorunlu"]:
+                    rows.append([c["kod"], c["ad"], c["hoca"]]); n += 1
+            electives = [c for c in dep_courses if c["sinif"] == year and not c["zorunlu"]]
+            if electives:
+                rows.append(["SEÇMELİ DERSLER", None, None])
+                rows.append(COURSE_HEADER)
+                for c in electives:
+                    rows.append([c["kod"], c["ad"], c["hoca"]]); n += 1
+    pd.DataFrame(rows).to_excel(path, header=False, index=False)
+    return n
+
+
+def write_student_workbook(dataset, path):
+    """
+    ExcelLoader.load_ogrenciler / fill_ogrenci_ders biçimi: kayıt başına bir satır,
+    "Öğrenci No", "Ad Soyad", "Sınıf", "Ders" sütunları.
+    Dönüş: satır sayısı
+    """
+    kod_by_id = {c["id"]: c["kod"] for c in dataset["courses"]}
+    student_by_no = {no: (adsoyad, sinif) for no, adsoyad, sinif in dataset["students"]}
+    rows = []
+    for no, cid in dataset["enrollments"]:
+        adsoyad, sinif = student_by_no[no]
+        rows.append({"Öğrenci No": no, "Ad Soyad": adsoyad, "Sınıf": f"{sinif}. Sınıf", "Ders": kod_by_id[cid]})
+    pd.DataFrame(rows).to_excel(path, index=False)
+    return len(rows)
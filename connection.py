@@ -1,24 +1,99 @@
 
 import psycopg2
+import psycopg2.errors
 from psycopg2 import OperationalError
 from passlib.hash import sha256_crypt
+from time import perf_counter
+from collections import OrderedDict
+import atexit
+import os
+import re
 import sys
 
+from query_stats import QueryStats, normalize_query
+
+_PLACEHOLDER_RE = re.compile(r"%%|%s")
+_PREPARABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def _to_positional(query):
+    """psycopg2 '%s' yer tutucularını PREPARE için $1, $2 ... biçimine çevirir."""
+    n = 0
+
+    def repl(m):
+        nonlocal n
+        if m.group(0) == "%%":
+            return "%"
+        n += 1
+        return f"${n}"
+    return _PLACEHOLDER_RE.sub(repl, query.strip().rstrip(";"))
+
+
 class Database:
-    def __init__(self, host="localhost", database="exam_schedule_db", user="exam_user", password="1234", port=5432):
+    def __init__(self, host="localhost", database="exam_schedule_db", user="exam_user", password="1234", port=5432,
+                 prepare_threshold=5, prepared_cache_size=64):
         self.config = dict(host=host, database=database, user=user, password=password, port=port)
         self.conn = None
         self.cur = None
+        # Sunucu taraflı hazır ifadeler: aynı parametreli sorgu prepare_threshold kez
+        # çalıştıktan sonra PREPARE edilir; bağlantı başına en fazla prepared_cache_size
+        # ifade LRU ile tutulur. prepare_threshold=None özelliği kapatır.
+        self.prepare_threshold = prepare_threshold
+        self.prepared_cache_size = prepared_cache_size
+        self._prepared = OrderedDict()   # sorgu metni -> ifade adı
+        self._query_counts = {}
+        self._unpreparable = set()
+        self._prepared_seq = 0
+        # Profil raporları için sayaçlar (bkz. run_report.RunReport)
+        self.round_trips = 0
+        self.rows_written = 0
+        # Sorgu istatistikleri (varsayılan kapalı; bkz. query_stats.py)
+        self.stats = None
+        self._stream_seq = 0
+        if os.environ.get("EXAM_DB_STATS"):
+            self.enable_stats(slow_ms=float(os.environ["EXAM_DB_STATS"]),
+                              dump_path=os.environ.get("EXAM_DB_STATS_FILE"))
+
+    def enable_stats(self, slow_ms=200, slow_log_path=None, dump_path=None):
+        """
+        Sorgu başına süre/satır istatistiklerini açar. slow_ms üstündeki sorgular
+        yavaş sorgu kaydına (ve verilirse slow_log_path dosyasına) düşer; dump_path
+        verilirse istatistikler program çıkışında JSON olarak yazılır.
+        """
+        if self.stats is None:
+            self.stats = QueryStats(slow_ms=slow_ms, slow_log_path=slow_log_path)
+            if dump_path:
+                atexit.register(self.stats.dump, dump_path)
+        return self.stats
+
+    @staticmethod
+    def _caller():
+        # connection.py dışındaki ilk çerçeve: "dosya:fonksiyon"
+        f = sys._getframe(2)
+        while f is not None and f.f_code.co_filename == __file__:
+            f = f.f_back
+        if f is None:
+            return "?"
+        return f"{os.path.basename(f.f_code.co_filename)}:{f.f_code.co_name}"
 
     def connect(self):
         try:
             self.conn = psycopg2.connect(**self.config)
             self.cur = self.conn.cursor()
+            self._reset_prepared()
             # Users tablosunun olduğundan emin ol
             self.create_users_table()
-            print("✅ Veritabanına bağlantı başarılı.")
+            self.create_room_calendar_table()
+            self.create_invigilator_tables()
+            self.create_schedule_version_tables()
+            self.create_student_exam_table()
+            self.create_change_counter()
+            # Katalog kontrollerinin açtığı okuma işlemi kapatılsın
+            self.conn.commit()
+            # Durum mesajları stderr'e: komut satırı araçlarının stdout'u yalnızca sonuç içindir
+            print("✅ Veritabanına bağlantı başarılı.", file=sys.stderr)
         except OperationalError as e:
-            print("❌ Veritabanı bağlantı hatası:", e)
+            print("❌ Veritabanı bağlantı hatası:", e, file=sys.stderr)
             sys.exit(1)
 
     def create_users_table(self):
@@ -34,17 +109,296 @@ class Database:
         """
         self.execute(q)
 
+    def create_room_calendar_table(self):
+        # Dersliklerin sınav dışı kullanımları; baslangic/bitis boşsa gün boyu kapalı
+        q = """
+        CREATE TABLE IF NOT EXISTS derslik_takvim (
+            id SERIAL PRIMARY KEY,
+            derslik_id INT NOT NULL REFERENCES derslikler(id) ON DELETE CASCADE,
+            tarih DATE NOT NULL,
+            baslangic TIME,
+            bitis TIME,
+            aciklama VARCHAR(200)
+        );
+        CREATE INDEX IF NOT EXISTS derslik_takvim_derslik_tarih ON derslik_takvim (derslik_id, tarih);
+        """
+        self.execute(q)
+
+    def create_invigilator_tables(self):
+        # Gözetmenler, müsait olmadıkları zamanlar ve sınav başına atamalar
+        q = """
+        CREATE TABLE IF NOT EXISTS gozetmenler (
+            id SERIAL PRIMARY KEY,
+            bolum VARCHAR(100),
+            ad VARCHAR(200) NOT NULL,
+            max_gorev INT
+        );
+        CREATE TABLE IF NOT EXISTS gozetmen_takvim (
+            id SERIAL PRIMARY KEY,
+            gozetmen_id INT NOT NULL REFERENCES gozetmenler(id) ON DELETE CASCADE,
+            tarih DATE NOT NULL,
+            baslangic TIME,
+            bitis TIME
+        );
+        CREATE TABLE IF NOT EXISTS gozetmen_atama (
+            sinav_id INT NOT NULL REFERENCES sinavlar(id) ON DELETE CASCADE,
+            gozetmen_id INT NOT NULL REFERENCES gozetmenler(id) ON DELETE CASCADE,
+            PRIMARY KEY (sinav_id, gozetmen_id)
+        );
+        """
+        self.execute(q)
+
+    def _schema_has(self, relations=(), columns=()):
+        """
+        Şema nesneleri zaten var mı; katalogdan tek sorguyla bakılır, tablolara kilit konmaz.
+        relations: tablo / görünüm / indeks adları; columns: (tablo, sütun) çiftleri.
+        """
+        checks = ["to_regclass(%s) IS NOT NULL"] * len(relations)
+        checks += ["EXISTS (SELECT 1 FROM information_schema.columns "
+                   "WHERE table_schema = current_schema() AND table_name=%s AND column_name=%s)"] * len(columns)
+        params = tuple(relations) + tuple(x for col in columns for x in col)
+        return self.execute("SELECT " + " AND ".join(checks), params, fetchone=True)[0]
+
+    def create_schedule_version_tables(self):
+        # Takvim sürümleri (bkz. schedule_versions.py); yayındaki plan (bolum, tur) başına tek satır.
+        # ALTER TABLE / CREATE OR REPLACE VIEW sinavlar'ı ACCESS EXCLUSIVE kilitler: her bağlantıda
+        # değil, yalnızca nesneler eksikse (ilk kurulumda) çalıştırılır.
+        if self._schema_has(("takvim_surumleri", "yayindaki_takvim", "yayindaki_sinavlar", "sinavlar_surum_ders"),
+                            [("sinavlar", "surum_id")]):
+            return
+        q = """
+        CREATE TABLE IF NOT EXISTS takvim_surumleri (
+            id SERIAL PRIMARY KEY,
+            ad VARCHAR(200),
+            tur VARCHAR(50) NOT NULL DEFAULT '',  -- Vize / Final / Bütünleme
+            bolum VARCHAR(100) NOT NULL DEFAULT '',
+            kaynak_id INT REFERENCES takvim_surumleri(id) ON DELETE SET NULL,
+            olusturma TIMESTAMP NOT NULL DEFAULT now()
+        );
+        CREATE TABLE IF NOT EXISTS yayindaki_takvim (
+            bolum VARCHAR(100) NOT NULL,
+            tur VARCHAR(50) NOT NULL,
+            surum_id INT NOT NULL REFERENCES takvim_surumleri(id),
+            yayin_zamani TIMESTAMP NOT NULL DEFAULT now(),
+            PRIMARY KEY (bolum, tur)
+        );
+        ALTER TABLE sinavlar ADD COLUMN IF NOT EXISTS
+            surum_id INT REFERENCES takvim_surumleri(id) ON DELETE CASCADE;
+        CREATE INDEX IF NOT EXISTS sinavlar_surum_ders ON sinavlar (surum_id, ders_id);
+        CREATE OR REPLACE VIEW yayindaki_sinavlar AS
+            SELECT s.* FROM sinavlar s JOIN yayindaki_takvim y ON y.surum_id = s.surum_id;
+        """
+        self.execute(q)
+        # Sürümlerden önce kaydedilmiş plan varsa bölüm başına yayındaki ilk sürüm olarak devralınır
+        # (türü bilinmediği için tur boş; bkz. schedule_versions)
+        rows = self.execute(
+            "SELECT DISTINCT coalesce(d.bolum, '') FROM sinavlar s JOIN dersler d ON d.id = s.ders_id "
+            "WHERE s.surum_id IS NULL",
+            fetchall=True
+        ) or []
+        for (bolum,) in rows:
+            vid = self.execute("SELECT nextval('takvim_surumleri_id_seq')", fetchone=True)[0]
+            self.execute("INSERT INTO takvim_surumleri (id, ad, bolum) VALUES (%s, 'Önceki plan', %s)", (vid, bolum))
+            self.execute(
+                "UPDATE sinavlar s SET surum_id=%s FROM dersler d "
+                "WHERE d.id = s.ders_id AND coalesce(d.bolum, '')=%s AND s.surum_id IS NULL",
+                (vid, bolum)
+            )
+            self.execute(
+                "INSERT INTO yayindaki_takvim (bolum, tur, surum_id) VALUES (%s, '', %s) ON CONFLICT DO NOTHING",
+                (bolum, vid)
+            )
+
+    def create_student_exam_table(self):
+        # Ad/soyad ayrımı öğrenci eklenirken bir kez hesaplanır (son kelime soyad, geri kalanı ad);
+        # ogrenci_sinav yayındaki plandan artımlı güncellenir (bkz. schedule_versions.refresh_ogrenci_sinav).
+        # ogrenciler'e sütun eklemek tabloyu kilitler: yalnızca eksikse çalıştırılır.
+        if self._schema_has(("ogrenci_sinav", "ogrenci_sinav_ders"), [("ogrenciler", "ad"), ("ogrenciler", "soyad")]):
+            return
+        q = """
+        ALTER TABLE ogrenciler ADD COLUMN IF NOT EXISTS
+            ad VARCHAR(200) GENERATED ALWAYS AS (TRIM(REGEXP_REPLACE(adsoyad, '\\s+\\S+$', ''))) STORED;
+        ALTER TABLE ogrenciler ADD COLUMN IF NOT EXISTS
+            soyad VARCHAR(200) GENERATED ALWAYS AS (REGEXP_REPLACE(adsoyad, '.*\\s+', '')) STORED;
+        CREATE TABLE IF NOT EXISTS ogrenci_sinav (
+            no VARCHAR(20) NOT NULL,
+            ad VARCHAR(100),
+            soyad VARCHAR(100),
+            ders_id INT NOT NULL REFERENCES dersler(id) ON DELETE CASCADE,
+            PRIMARY KEY (no, ders_id)
+        );
+        CREATE INDEX IF NOT EXISTS ogrenci_sinav_ders ON ogrenci_sinav (ders_id);
+        """
+        self.execute(q)
+
+    def create_change_counter(self):
+        # ogrenci_ders'e yazan her ifade (içe aktarma, panelden silme, cascade) sayacı artırır;
+        # kayıt görüntüsü (enrollment_snapshot) geçerliliğini tabloyu taramadan buradan okur.
+        # CREATE TRIGGER ogrenci_ders'i kilitler: yalnızca sayaç tablosu eksikse çalıştırılır.
+        if self._schema_has(("degisiklik_sayaci",)):
+            return
+        q = """
+        CREATE TABLE IF NOT EXISTS degisiklik_sayaci (
+            tablo VARCHAR(63) PRIMARY KEY,
+            sayac BIGINT NOT NULL DEFAULT 0,
+            kurulum TIMESTAMP NOT NULL DEFAULT clock_timestamp()
+        );
+        INSERT INTO degisiklik_sayaci (tablo) VALUES ('ogrenci_ders') ON CONFLICT DO NOTHING;
+        CREATE OR REPLACE FUNCTION degisiklik_sayaci_artir() RETURNS trigger AS $$
+        BEGIN
+            UPDATE degisiklik_sayaci SET sayac = sayac + 1 WHERE tablo = TG_TABLE_NAME;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+        DROP TRIGGER IF EXISTS ogrenci_ders_sayac ON ogrenci_ders;
+        CREATE TRIGGER ogrenci_ders_sayac
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON ogrenci_ders
+            FOR EACH STATEMENT EXECUTE FUNCTION degisiklik_sayaci_artir();
+        """
+        self.execute(q)
+
+    def _reset_prepared(self):
+        self._prepared.clear()
+        self._query_counts.clear()
+        self._prepared_seq = 0
+
+    def _prepared_name(self, query, params):
+        """
+        Sorgu sık çalışıyorsa hazır ifade adını döndürür (gerekirse PREPARE eder),
+        aksi halde None. Yalnızca konumsal parametreli tek DML/SELECT ifadeleri uygundur.
+        """
+        if self.prepare_threshold is None or not isinstance(params, (tuple, list)) or not params:
+            return None
+        name = self._prepared.get(query)
+        if name is not None:
+            self._prepared.move_to_end(query)
+            return name
+        if query in self._unpreparable:
+            return None
+
+        n = self._query_counts.get(query, 0) + 1
+        if len(self._query_counts) > 10000:
+            # f-string ile üretilen tek seferlik sorgular sayacı şişirmesin
+            self._query_counts.clear()
+        self._query_counts[query] = n
+        if n < self.prepare_threshold:
+            return None
+
+        body = query.strip().rstrip(";")
+        keyword = (body.lstrip("( \n\t").split(None, 1) or [""])[0].upper()
+        if (keyword not in _PREPARABLE or ";" in body or "%(" in body
+                or body.replace("%%", "").count("%s") != len(params)):
+            self._unpreparable.add(query)
+            return None
+
+        self._prepared_seq += 1
+        name = f"ps_{self._prepared_seq}"
+        # PREPARE başarısız olursa (ör. tür çıkarımı yapılamadı) açık işlem bozulmasın
+        self.cur.execute("SAVEPOINT ps_prepare")
+        try:
+            self.cur.execute(f"PREPARE {name} AS {_to_positional(query)}")
+            self.cur.execute("RELEASE SAVEPOINT ps_prepare")
+        except psycopg2.Error:
+            self.cur.execute("ROLLBACK TO SAVEPOINT ps_prepare")
+            self._unpreparable.add(query)
+            return None
+        finally:
+            self.round_trips += 2
+
+        self._prepared[query] = name
+        if len(self._prepared) > self.prepared_cache_size:
+            _, old = self._prepared.popitem(last=False)
+            self.cur.execute(f"DEALLOCATE {old}")
+            self.round_trips += 1
+        return name
+
+    def _forget_prepared(self, query, name, error):
+        """
+        Hazır ifadeyi geçersiz kılan hatadan sonra önbelleği düzeltir. Hazır ifadeler işlemle
+        geri alınmaz; diğer hatalar (benzersizlik ihlali vb.) önbelleğe dokunmaz.
+        """
+        if isinstance(error, psycopg2.errors.InvalidSqlStatementName):
+            # Sunucuda ifadeler yok (ör. DISCARD ALL): hepsi yeniden hazırlanır
+            self._reset_prepared()
+            return
+        # Şema değişti ("cached plan must not change result type"): yalnızca bu ifade yeniden hazırlanır
+        self._prepared.pop(query, None)
+        self._query_counts.pop(query, None)
+        try:
+            self.cur.execute(f"DEALLOCATE {name}")
+            self.conn.commit()
+        except psycopg2.Error:
+            self.conn.rollback()
+        self.round_trips += 1
+
     def execute(self, query, params=None, fetchone=False, fetchall=False):
+        t0 = perf_counter() if self.stats is not None else None
+        rows, error, name = -1, None, None
         try:
-            self.cur.execute(query, params)
+            name = self._prepared_name(query, params)
+            if name is not None:
+                self.cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+            else:
+                self.cur.execute(query, params)
+            self.round_trips += 1
+            rows = self.cur.rowcount
+            if self.cur.rowcount > 0 and (self.cur.description is None
+                                          or query.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE")):
+                self.rows_written += self.cur.rowcount
             if fetchone:
                 return self.cur.fetchone()
             if fetchall:
                 return self.cur.fetchall()
             self.conn.commit()
         except Exception as e:
+            error = e
+            self.conn.rollback()
+            if name is not None and isinstance(e, (psycopg2.errors.InvalidSqlStatementName,
+                                                   psycopg2.errors.FeatureNotSupported)):
+                self._forget_prepared(query, name, e)
+            # Hatanın hangi sorgudan geldiği traceback'te görünsün
+            if hasattr(e, "add_note"):
+                e.add_note(f"Sorgu: {normalize_query(query)[:200]}")
+            raise
+        finally:
+            if t0 is not None:
+                self.stats.record(query, (perf_counter() - t0) * 1000, rows, self._caller(), error)
+
+    def stream(self, query, params=None, itersize=2000):
+        """
+        Büyük SELECT sonuçlarını sunucu taraflı (isimli) cursor ile itersize'lık
+        parçalar halinde okuyan üreteç. Satırlar tek tek döner; bellek kullanımı
+        sonuç boyutundan bağımsız kalır.
+
+        Not: isimli cursor açık işlemle (transaction) yaşar; tüketim bitmeden aynı
+        bağlantıda commit eden bir yazma yapılmamalıdır.
+        """
+        self._stream_seq += 1
+        cur = self.conn.cursor(name=f"stream_{os.getpid()}_{self._stream_seq}")
+        cur.itersize = itersize
+        t0 = perf_counter() if self.stats is not None else None
+        rows, error = 0, None
+        try:
+            cur.execute(query, params)
+            while True:
+                batch = cur.fetchmany(itersize)
+                self.round_trips += 1
+                if not batch:
+                    break
+                rows += len(batch)
+                yield from batch
+        except Exception as e:
+            error = e
             self.conn.rollback()
+            if hasattr(e, "add_note"):
+                e.add_note(f"Sorgu: {normalize_query(query)[:200]}")
             raise
+        finally:
+            # Erken bırakılan üreteçte de sunucu cursor'ı kapatılır
+            if not cur.closed:
+                cur.close()
+            if t0 is not None:
+                self.stats.record(query, (perf_counter() - t0) * 1000, rows, self._caller(), error)
 
     def add_user(self, ad, email, sifre_plain, rol="koordinator", bolum=""):
         # Şifreleyip kaydediliyor
@@ -1,20 +1,29 @@
 # coordinator_panel.py
+import os
+import shutil
 import sys
+from contextlib import nullcontext
+from datetime import date
 import pandas as pd
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 
-from PySide6.QtCore import Qt, QDate
+from PySide6.QtCore import Qt, QDate, QThread, Signal
 from PySide6.QtWidgets import (
     QApplication, QWidget, QLabel, QLineEdit, QPushButton, QVBoxLayout, QHBoxLayout,
     QTableWidget, QTableWidgetItem, QMessageBox, QSpinBox, QGraphicsScene, QGraphicsView,
     QFileDialog, QFrame, QDialog, QDateEdit, QTextEdit, QListWidget, QListWidgetItem,
-    QCheckBox, QAbstractItemView, QInputDialog
+    QCheckBox, QAbstractItemView, QInputDialog, QComboBox
 )
 
 from connection import Database
+import ref_cache
+import invigilators
+import schedule_quality
+import schedule_versions
+import job_service
+from run_report import RunReport
 from excel_loader import ExcelLoader
-from exam_scheduler import ExamScheduler
+from exam_scheduler import ExamScheduler, CancelToken, SchedulingCancelled, time_from_str
+from seat_planner import SeatPlanner
 
 
 # Koordinatör Paneli
@@ -29,6 +38,7 @@ class CoordinatorPanel(QWidget):
 
         self.loader = ExcelLoader(db)
         self._seat_widgets = []
+        self.bg_worker = None  # oturma / PDF işleri (bkz. _run_background)
 
         # --- Derslik formu ---
         self.kod_input = QLineEdit(placeholderText="Derslik Kodu")
@@ -40,9 +50,10 @@ class CoordinatorPanel(QWidget):
         self.sira_input = QSpinBox(); self.sira_input.setRange(1, 10); self.sira_input.setValue(3)
 
         self.add_btn = QPushButton("Derslik Ekle"); self.add_btn.clicked.connect(self.add_derslik)
-        self.refresh_btn = QPushButton("Yenile"); self.refresh_btn.clicked.connect(self.load_derslikler)
+        self.refresh_btn = QPushButton("Yenile"); self.refresh_btn.clicked.connect(self.refresh_derslikler)
         self.delete_btn = QPushButton("Seçili Sil"); self.delete_btn.clicked.connect(self.delete_selected)
         self.visual_btn = QPushButton("Görselleştir"); self.visual_btn.clicked.connect(self.show_visual)
+        self.calendar_btn = QPushButton("Derslik Takvimi"); self.calendar_btn.clicked.connect(self.open_room_calendar)
 
         # --- Excel ve planlama butonları ---
         self.load_ders_excel_btn = QPushButton("Ders Listesi Yükle")
@@ -51,6 +62,9 @@ class CoordinatorPanel(QWidget):
         self.load_ogr_excel_btn = QPushButton("Öğrenci Listesi Yükle")
         self.load_ogr_excel_btn.clicked.connect(self.load_ogr_excel)
 
+        self.load_gozetmen_excel_btn = QPushButton("Gözetmen Listesi Yükle")
+        self.load_gozetmen_excel_btn.clicked.connect(self.load_gozetmen_excel)
+
         self.generate_exam_btn = QPushButton("Sınav Takvimi Oluştur")
         self.generate_exam_btn.clicked.connect(self.open_exam_settings)
 
@@ -89,10 +103,12 @@ class CoordinatorPanel(QWidget):
         btns.addWidget(self.refresh_btn)
         btns.addWidget(self.delete_btn)
         btns.addWidget(self.visual_btn)
+        btns.addWidget(self.calendar_btn)
 
         excel_line = QHBoxLayout()
         excel_line.addWidget(self.load_ders_excel_btn)
         excel_line.addWidget(self.load_ogr_excel_btn)
+        excel_line.addWidget(self.load_gozetmen_excel_btn)
         excel_line.addWidget(self.generate_exam_btn)
 
         excel_line2 = QHBoxLayout()
@@ -125,27 +141,28 @@ class CoordinatorPanel(QWidget):
         msg.setIcon(icon)
         msg.exec()
     def show_exams(self):
-        """Veritabanındaki planlanan sınavları listeler."""
+        """Yayındaki takvim sürümlerinin sınavlarını listeler (taslaklar gösterilmez)."""
         try:
-            rows = self.db.execute("""
+            rows = self.db.stream("""
                 SELECT s.id, d.kod, d.ad, s.tarih, s.saat, l.ad
-                FROM sinavlar s
+                FROM yayindaki_sinavlar s
                 JOIN dersler d ON s.ders_id = d.id
                 JOIN derslikler l ON s.derslik_id = l.id
                 ORDER BY s.tarih, s.saat
-            """, fetchall=True)
-
-            if not rows:
-                self.show_message("Boş", "Henüz sınav planı oluşturulmamış.")
-                return
+            """)
 
             table = QTableWidget()
             table.setColumnCount(6)
             table.setHorizontalHeaderLabels(["ID", "Ders Kodu", "Ders Adı", "Tarih", "Saat", "Derslik"])
-            table.setRowCount(len(rows))
+            # Satırlar geldikçe tabloya eklenir (ara liste oluşturulmaz)
             for i, r in enumerate(rows):
+                table.insertRow(i)
                 for j, val in enumerate(r):
                     table.setItem(i, j, QTableWidgetItem(str(val)))
+
+            if table.rowCount() == 0:
+                self.show_message("Boş", "Henüz sınav planı oluşturulmamış.")
+                return
             table.resizeColumnsToContents()
 
             dlg = QDialog(self)
@@ -158,41 +175,81 @@ class CoordinatorPanel(QWidget):
         except Exception as e:
             self.show_message("Hata", f"Sınav listesi yüklenemedi: {e}", QMessageBox.Critical)
 
+    def _run_background(self, job, on_done, error_title):
+        """
+        Oturma / PDF işini arayüzü dondurmadan çalıştırır: iş servisi açıksa job oraya gönderir,
+        değilse SchedulerWorker'ın kendi bağlantısıyla çalışır. on_done sonucu alır.
+        """
+        if self.bg_worker is not None and self.bg_worker.isRunning():
+            self.show_message("Meşgul", "Önceki işlem sürüyor.", QMessageBox.Warning)
+            return
+        self.bg_worker = SchedulerWorker(job, self.db.config, parent=self)
+        self.bg_worker.done.connect(on_done)
+        self.bg_worker.error.connect(lambda msg: self.show_message("Hata", f"{error_title}: {msg}", QMessageBox.Critical))
+        self.bg_worker.start()
+
+    def closeEvent(self, event):
+        # Süren oturma / PDF işi bitmeden iş parçacığı yok edilmesin
+        if self.bg_worker is not None and self.bg_worker.isRunning():
+            self.bg_worker.cancel_token.cancel()
+            self.bg_worker.wait()
+        super().closeEvent(event)
+
+    def _seating_job(self, exam_id, assign=False, output_path=None):
+        bolum = self.bolum_adi
+
+        def job(db, progress, cancel_token):
+            if job_service.is_available():
+                # Servis yalnızca kendi çıktı dizinine yazar: PDF orada üretilip seçilen yere taşınır
+                remote_path = f"oturma_{exam_id}_{os.getpid()}.pdf" if output_path else None
+                job_id = job_service.submit({"type": "seating", "bolum": bolum, "sinav_id": exam_id,
+                                             "assign": assign, "output_path": remote_path})["id"]
+                out = job_service.wait(job_id, cancel_token=cancel_token)
+                if output_path:
+                    out["pdf"] = shutil.move(out["pdf"], output_path)
+                return out
+            planner = SeatPlanner(db)
+            out = {"sinav_id": exam_id}
+            # Oturma yazan iş aynı bölümü planlayan çalıştırmalarla sıraya girer
+            with schedule_versions.department_lock(db, bolum, cancel_token=cancel_token) if assign else nullcontext():
+                if assign:
+                    out["n_students"] = len(planner.assign_seats(exam_id))
+                if output_path:
+                    out["pdf"] = planner.export_pdf(exam_id, output_path)
+            return out
+        return job
+
     def create_seating(self):
         """Kullanıcıdan sınav ID alıp oturma planı oluşturur."""
         exam_id, ok = QInputDialog.getInt(self, "Sınav ID", "Sınav ID numarasını girin:")
         if not ok:
             return
-        try:
-            planner = SeatPlanner(self.db)
-            assignments = planner.assign_seats(exam_id)
-            self.show_message("Başarılı", f"Oturma planı oluşturuldu ({len(assignments)} öğrenci).")
-        except Exception as e:
-            self.show_message("Hata", f"Oturma planı oluşturulamadı: {e}", QMessageBox.Critical)
+        self._run_background(
+            self._seating_job(exam_id, assign=True),
+            lambda res: self.show_message("Başarılı", f"Oturma planı oluşturuldu ({res['n_students']} öğrenci)."),
+            "Oturma planı oluşturulamadı")
 
     def export_seating_pdf(self):
         """Seçili sınav için oturma planını PDF olarak dışa aktarır."""
         exam_id, ok = QInputDialog.getInt(self, "Sınav ID", "Sınav ID numarasını girin:")
         if not ok:
             return
-        try:
-            path, _ = QFileDialog.getSaveFileName(self, "PDF olarak kaydet", "oturma_plani.pdf", "PDF Files (*.pdf)")
-            if not path:
-                return
-            planner = SeatPlanner(self.db)
-            output = planner.export_pdf(exam_id, path)
-            self.show_message("Kaydedildi", f"PDF oluşturuldu:\n{output}")
-        except Exception as e:
-            self.show_message("Hata", f"PDF oluşturulamadı: {e}", QMessageBox.Critical)
+        path, _ = QFileDialog.getSaveFileName(self, "PDF olarak kaydet", "oturma_plani.pdf", "PDF Files (*.pdf)")
+        if not path:
+            return
+        self._run_background(
+            self._seating_job(exam_id, output_path=os.path.abspath(path)),
+            lambda res: self.show_message("Kaydedildi", f"PDF oluşturuldu:\n{res['pdf']}"),
+            "PDF oluşturulamadı")
+    def refresh_derslikler(self):
+        # "Yenile" her zaman veritabanından okur
+        ref_cache.for_db(self.db).invalidate("derslikler", notify=False)
+        self.load_derslikler()
+
     def load_derslikler(self):
-        q = """
-        SELECT id, kod, ad, kapasite, enine_sira, boyuna_sira, sira_yapisi
-        FROM derslikler
-        WHERE bolum=%s
-        ORDER BY id
-        """
         try:
-            rows = self.db.execute(q, (self.bolum_adi,), fetchall=True)
+            rows = [(r["id"], r["kod"], r["ad"], r["kapasite"], r["enine"], r["boyuna"], r["sira"])
+                    for r in ref_cache.for_db(self.db).rooms(self.bolum_adi)]
             self.table.setRowCount(0)
             for r in rows:
                 row_pos = self.table.rowCount()
@@ -257,6 +314,7 @@ class CoordinatorPanel(QWidget):
         """
         try:
             self.db.execute(q, (self.bolum_adi, kod, ad, kapasite, enine, boyuna, sira))
+            ref_cache.for_db(self.db).invalidate("derslikler")
             self.show_message("Başarılı", "Derslik eklendi.")
             self.kod_input.clear()
             self.ad_input.clear()
@@ -277,6 +335,7 @@ class CoordinatorPanel(QWidget):
         if QMessageBox.question(self, "Onay", f"{ad} silinsin mi?") == QMessageBox.Yes:
             try:
                 self.db.execute("DELETE FROM derslikler WHERE id=%s", (derslik_id,))
+                ref_cache.for_db(self.db).invalidate("derslikler")
                 self.show_message("Başarılı", "Silindi")
                 self.load_derslikler()
             except Exception as e:
@@ -371,10 +430,10 @@ class CoordinatorPanel(QWidget):
                 (self.bolum_adi,)
             )
             self.db.execute("DELETE FROM dersler WHERE bolum=%s", (self.bolum_adi,))
+            ref_cache.for_db(self.db).invalidate("dersler")
 
-            # Sequence reset (varsa)
+            # Sequence reset (varsa); sinavlar'ın sırası diğer sürümlerin satırları için korunur
             self.db.execute("ALTER SEQUENCE IF EXISTS dersler_id_seq RESTART WITH 1;")
-            self.db.execute("ALTER SEQUENCE IF EXISTS sinavlar_id_seq RESTART WITH 1;")
 
             self.loader.load_dersler(path, self.bolum_adi)
             self.show_message("Başarılı", "Yeni ders listesi yüklendi.")
@@ -394,18 +453,183 @@ class CoordinatorPanel(QWidget):
             self.db.execute("DELETE FROM ogrenci_ders;")
             self.db.execute("DELETE FROM ogrenciler;")
             self.loader.load_ogrenciler(path)
+            # Kayıtlar değişti: yayındaki plana göre ogrenci_sinav yalnızca farkla güncellenir
+            schedule_versions.refresh_all_ogrenci_sinav(self.db)
             self.show_message("Başarılı", "Öğrenciler yüklendi")
         except Exception as e:
             self.show_message("Hata", f"Yükleme hatası: {e}", QMessageBox.Critical)
 
+    def load_gozetmen_excel(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Gözetmen Listesi Seç", "", "Excel Files (*.xlsx *.xls)")
+        if not path:
+            return
+        try:
+            n = self.loader.load_gozetmenler(path, self.bolum_adi)
+            self.show_message("Başarılı", f"{n} gözetmen yüklendi")
+        except Exception as e:
+            self.show_message("Hata", f"Yükleme hatası: {e}", QMessageBox.Critical)
+
     # Sınav ayarları dialogu
     def open_exam_settings(self):
         dlg = ExamSettingsDialog(self.db, self.bolum_adi, parent=self)
         dlg.exec()
 
+    # Seçili dersliğin kapalı zamanları
+    def open_room_calendar(self):
+        sel = self.table.selectedItems()
+        if not sel:
+            self.show_message("Seçim yok", "Seçim yap", QMessageBox.Warning)
+            return
+        row = sel[0].row()
+        dlg = RoomCalendarDialog(self.db, int(self.table.item(row, 0).text()),
+                                 self.table.item(row, 2).text(), parent=self)
+        dlg.exec()
+
+
+# Derslik takvimi (sınav dışı kullanımlar)
+class RoomCalendarDialog(QDialog):
+    """derslik_takvim kayıtları; planlayıcı bu zamanlarda dersliği kullanmaz."""
+    def __init__(self, db: Database, derslik_id: int, derslik_ad: str, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.derslik_id = derslik_id
+
+        self.setWindowTitle(f"{derslik_ad} - Kapalı Zamanlar")
+        self.setMinimumSize(560, 400)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels(["ID", "Tarih", "Başlangıç", "Bitiş", "Açıklama"])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+
+        self.date_edit = QDateEdit()
+        self.date_edit.setCalendarPopup(True)
+        self.date_edit.setDate(QDate.currentDate())
+        self.start_input = QLineEdit(placeholderText="Başlangıç (boş = gün boyu)")
+        self.end_input = QLineEdit(placeholderText="Bitiş")
+        self.note_input = QLineEdit(placeholderText="Açıklama")
+
+        self.add_btn = QPushButton("Ekle"); self.add_btn.clicked.connect(self.add_block)
+        self.delete_btn = QPushButton("Seçili Sil"); self.delete_btn.clicked.connect(self.delete_selected)
+
+        form = QHBoxLayout()
+        form.addWidget(self.date_edit)
+        form.addWidget(self.start_input)
+        form.addWidget(self.end_input)
+        form.addWidget(self.note_input)
+        form.addWidget(self.add_btn)
+
+        main = QVBoxLayout()
+        main.addLayout(form)
+        main.addWidget(self.table)
+        main.addWidget(self.delete_btn)
+        self.setLayout(main)
+
+        self.load_blocks()
+
+    def load_blocks(self):
+        rows = self.db.execute(
+            "SELECT id, tarih, baslangic, bitis, aciklama FROM derslik_takvim WHERE derslik_id=%s ORDER BY tarih, baslangic",
+            (self.derslik_id,), fetchall=True
+        )
+        self.table.setRowCount(0)
+        for r in rows or []:
+            row_pos = self.table.rowCount()
+            self.table.insertRow(row_pos)
+            values = (r[0], r[1], r[2].strftime("%H:%M") if r[2] else "Gün boyu",
+                      r[3].strftime("%H:%M") if r[3] else "", r[4] or "")
+            for c, val in enumerate(values):
+                self.table.setItem(row_pos, c, QTableWidgetItem(str(val)))
+        self.table.resizeColumnsToContents()
+
+    def add_block(self):
+        bas_txt, bit_txt = self.start_input.text().strip(), self.end_input.text().strip()
+        try:
+            bas = time_from_str(bas_txt) if bas_txt else None
+            bit = time_from_str(bit_txt) if bit_txt else None
+        except ValueError:
+            QMessageBox.warning(self, "Hatalı saat", "Saatleri SS:DD biçiminde girin.")
+            return
+        if (bas is None) != (bit is None) or (bas is not None and bas >= bit):
+            QMessageBox.warning(self, "Hatalı aralık", "Başlangıç ve bitiş birlikte girilmeli (başlangıç < bitiş).")
+            return
+        try:
+            self.db.execute(
+                "INSERT INTO derslik_takvim (derslik_id, tarih, baslangic, bitis, aciklama) VALUES (%s, %s, %s, %s, %s)",
+                (self.derslik_id, self.date_edit.date().toPython(), bas, bit, self.note_input.text().strip() or None)
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Hata", f"Ekleme başarısız: {e}")
+            return
+        self.start_input.clear()
+        self.end_input.clear()
+        self.note_input.clear()
+        self.load_blocks()
+
+    def delete_selected(self):
+        sel = self.table.selectedItems()
+        if not sel:
+            return
+        block_id = self.table.item(sel[0].row(), 0).text()
+        try:
+            self.db.execute("DELETE FROM derslik_takvim WHERE id=%s", (block_id,))
+        except Exception as e:
+            QMessageBox.critical(self, "Hata", f"Silme hatası: {e}")
+            return
+        self.load_blocks()
+
+
+# Arka plan planlama iş parçacığı
+class SchedulerWorker(QThread):
+    """
+    Verilen işi (job(db, progress, cancel_token)) GUI iş parçacığının dışında çalıştırır.
+    İş, db_config ile açılan kendi bağlantısını kullanır (GUI'nin bağlantısı ve cursor'ı
+    iş parçacıkları arasında paylaşılmaz); bağlantı iş bitince kapatılır.
+    """
+    progress = Signal(dict)
+    done = Signal(object)
+    error = Signal(str)
+
+    def __init__(self, job, db_config, parent=None):
+        super().__init__(parent)
+        self.job = job
+        self.db_config = db_config
+        self.cancel_token = CancelToken()
+
+    def run(self):
+        db = Database(**self.db_config)
+        try:
+            try:
+                db.connect()
+            except SystemExit:
+                raise RuntimeError("Veritabanına bağlanılamadı")
+            result = self.job(db, self.progress.emit, self.cancel_token)
+        except SchedulingCancelled:
+            self.error.emit("Planlama iptal edildi, veritabanında değişiklik yapılmadı.")
+        except Exception as e:
+            self.error.emit(str(e))
+        else:
+            self.done.emit(result)
+        finally:
+            db.close()
+
 
 # Sınav Ayarları / Oluşturma Dialogu
 class ExamSettingsDialog(QDialog):
+    PHASE_LABELS = {
+        "load": "Veriler yükleniyor",
+        "search": "Sınavlar yerleştiriliyor",
+        "write": "Sınavlar kaydediliyor",
+        "seating": "Oturma planları oluşturuluyor",
+        "done": "Planlama tamamlandı",
+        "export": "Excel'e aktarılıyor",
+        "ogrenci_sinav": "ogrenci_sinav tablosu yenileniyor",
+        "invigilators": "Gözetmenler atanıyor",
+        "queued": "İş serviste sıra bekliyor",
+        "running": "İş serviste çalışıyor",
+    }
+
     def __init__(self, db: Database, bolum: str, parent=None):
         super().__init__(parent)
         self.db = db
@@ -417,6 +641,8 @@ class ExamSettingsDialog(QDialog):
         # State
         self.last_scheduled = None
         self.per_course_durations = {}
+        self.seed = None  # Excel'den okunan warm-start tohumu (önceki dönem)
+        self.seed_path = None  # aynı tohumun dosyası (iş servisi dosyayı kendisi okur)
 
         # Sol: ders listesi (checkbox)
         self.course_list = QListWidget()
@@ -437,6 +663,22 @@ class ExamSettingsDialog(QDialog):
         self.no_simult_cb = QCheckBox("Sınavların aynı anda olmamasını sağla")
         self.no_simult_cb.setChecked(False)
 
+        self.incremental_cb = QCheckBox("Mevcut planı koru, yalnızca değişen dersleri yeniden planla")
+        self.incremental_cb.setChecked(False)
+
+        self.warm_start_cb = QCheckBox("Son planı başlangıç olarak kullan (warm-start)")
+        self.warm_start_cb.setChecked(False)
+
+        self.profile_cb = QCheckBox("Faz bazlı profil raporunu göster")
+        self.profile_cb.setChecked(False)
+        self.split_cb = QCheckBox("Büyük dersleri birden fazla dersliğe bölebilir")
+        self.split_cb.setChecked(True)
+        self.proctor_cb = QCheckBox("Gözetmenleri ata (gözetmen listesinden)")
+        self.proctor_cb.setChecked(True)
+        self.proctor_ratio_spin = QSpinBox()
+        self.proctor_ratio_spin.setRange(0, 500)
+        self.proctor_ratio_spin.setValue(0)
+
         self.duration_spin = QSpinBox()
         self.duration_spin.setRange(30, 240)
         self.duration_spin.setValue(75)
@@ -445,7 +687,19 @@ class ExamSettingsDialog(QDialog):
         self.bekleme_spin.setRange(0, 120)
         self.bekleme_spin.setValue(15)
 
-        self.type_combo = QLineEdit("Final")  # Basit metin (istenirse ileride combobox yapılır)
+        # Öğrenci başına sınırlar (0 = sınırsız)
+        self.student_day_spin = QSpinBox()
+        self.student_day_spin.setRange(0, 10)
+        self.student_day_spin.setValue(0)
+        self.consecutive_spin = QSpinBox()
+        self.consecutive_spin.setRange(0, 10)
+        self.consecutive_spin.setValue(0)
+
+        # Sınav türü sürümün yayın anahtarıdır (bölüm + tür başına bir yayındaki plan)
+        self.type_combo = QComboBox()
+        self.type_combo.setEditable(True)
+        self.type_combo.addItems(["Vize", "Final", "Bütünleme"])
+        self.type_combo.setCurrentText("Final")
         self.times_edit = QLineEdit("09:00, 10:00, 13:30, 15:30, 17:00")
 
         # Sağ: ders bazlı süre override
@@ -459,9 +713,15 @@ class ExamSettingsDialog(QDialog):
 
         # çalıştır & çıktı
         self.run_btn = QPushButton("Programı Oluştur")
-        # yeni planlamada temiz başlangıç için TRUNCATE uyguluyoruz:
+        # tam planlamada tablolar ExamScheduler tarafından sıfırlanır; artımlı modda korunur
         self.run_btn.clicked.connect(self.run_scheduler)
 
+        self.cancel_btn = QPushButton("İptal")
+        self.cancel_btn.clicked.connect(self.cancel_run)
+        self.cancel_btn.setEnabled(False)
+        self.status_label = QLabel("")
+        self.worker = None
+
         self.output_text = QTextEdit()
         self.output_text.setReadOnly(True)
 
@@ -469,6 +729,32 @@ class ExamSettingsDialog(QDialog):
         self.save_excel_btn.clicked.connect(self.save_last_excel)
         self.save_excel_btn.setEnabled(False)
 
+        self.quality_btn = QPushButton("Kalite Raporu (son plan / kayıtlı takvim)")
+        self.quality_btn.clicked.connect(self.show_quality_report)
+        self.save_quality_btn = QPushButton("Kalite Raporunu Excel'e Kaydet")
+        self.save_quality_btn.clicked.connect(self.save_quality_report)
+        self.save_quality_btn.setEnabled(False)
+        self.last_quality = None
+
+        self.what_if_btn = QPushButton("Senaryoları Karşılaştır (kuru çalıştırma)")
+        self.what_if_btn.clicked.connect(self.run_what_if)
+
+        self.seed_excel_btn = QPushButton("Önceki Takvimi Tohum Olarak Yükle (Excel)")
+        self.seed_excel_btn.clicked.connect(self.load_seed_excel)
+
+        # Takvim sürümleri: seçili taslak yerinde yeniden yazılır; "Yeni taslak" ya da
+        # yayındaki sürüm seçiliyse yeni taslak açılır, yayındaki plan değişmez
+        self.version_combo = QComboBox()
+        self.version_name_edit = QLineEdit()
+        self.version_name_edit.setPlaceholderText("Yeni taslak adı (boşsa numara)")
+        self.publish_cb = QCheckBox("Oluşturulan taslağı hemen yayınla")
+        self.publish_cb.setChecked(False)
+        self.publish_btn = QPushButton("Seçili Sürümü Yayınla")
+        self.publish_btn.clicked.connect(self.publish_selected)
+        self.diff_btn = QPushButton("Yayındaki Sürümle Karşılaştır")
+        self.diff_btn.clicked.connect(self.compare_versions)
+        self.load_versions()
+
         # Yerleşim
         left_layout = QVBoxLayout()
         left_layout.addWidget(QLabel("Ders Listesi (seçmek için tikleyin)"))
@@ -480,21 +766,45 @@ class ExamSettingsDialog(QDialog):
         center_layout.addWidget(self.end_date)
         center_layout.addWidget(self.skip_weekends_cb)
         center_layout.addWidget(self.no_simult_cb)
+        center_layout.addWidget(self.incremental_cb)
+        center_layout.addWidget(self.warm_start_cb)
+        center_layout.addWidget(self.profile_cb)
+        center_layout.addWidget(self.split_cb)
+        center_layout.addWidget(self.proctor_cb)
+        center_layout.addWidget(QLabel("Gözetmen başına öğrenci (0 = derslik başına 1):"))
+        center_layout.addWidget(self.proctor_ratio_spin)
         center_layout.addWidget(QLabel("Varsayılan sınav süresi (dk):"))
         center_layout.addWidget(self.duration_spin)
         center_layout.addWidget(QLabel("Bekleme süresi (dk):"))
         center_layout.addWidget(self.bekleme_spin)
+        center_layout.addWidget(QLabel("Öğrenci başına günlük en fazla sınav (0 = sınırsız):"))
+        center_layout.addWidget(self.student_day_spin)
+        center_layout.addWidget(QLabel("Art arda en fazla sınav (0 = sınırsız):"))
+        center_layout.addWidget(self.consecutive_spin)
         center_layout.addWidget(QLabel("Günlük saatler (virgül ile):"))
         center_layout.addWidget(self.times_edit)
+        center_layout.addWidget(QLabel("Sınav türü:"))
+        center_layout.addWidget(self.type_combo)
         center_layout.addStretch()
+        center_layout.addWidget(self.what_if_btn)
         center_layout.addWidget(self.run_btn)
+        center_layout.addWidget(self.cancel_btn)
 
         right_layout = QVBoxLayout()
         right_layout.addWidget(self.override_label)
         right_layout.addWidget(self.override_spin)
         right_layout.addWidget(self.set_override_btn)
         right_layout.addStretch()
+        right_layout.addWidget(QLabel("Takvim sürümü:"))
+        right_layout.addWidget(self.version_combo)
+        right_layout.addWidget(self.version_name_edit)
+        right_layout.addWidget(self.publish_cb)
+        right_layout.addWidget(self.publish_btn)
+        right_layout.addWidget(self.diff_btn)
+        right_layout.addWidget(self.seed_excel_btn)
         right_layout.addWidget(self.save_excel_btn)
+        right_layout.addWidget(self.quality_btn)
+        right_layout.addWidget(self.save_quality_btn)
 
         bottom_layout = QHBoxLayout()
         bottom_layout.addLayout(left_layout)
@@ -504,6 +814,7 @@ class ExamSettingsDialog(QDialog):
         main = QVBoxLayout()
         main.addLayout(bottom_layout)
         main.addWidget(QLabel("Çıktı:"))
+        main.addWidget(self.status_label)
         main.addWidget(self.output_text)
         self.setLayout(main)
 
@@ -516,10 +827,7 @@ class ExamSettingsDialog(QDialog):
         msg.exec()
 
     def load_courses(self):
-        rows = self.db.execute(
-            "SELECT id, kod, ad, sinif FROM dersler WHERE bolum=%s ORDER BY sinif, kod",
-            (self.bolum,), fetchall=True
-        )
+        rows = [(c["id"], c["kod"], c["ad"], c["sinif"]) for c in ref_cache.for_db(self.db).courses(self.bolum)]
         self.course_list.clear()
         for r in rows:
             item = QListWidgetItem(f"{r[1]} - {r[2]} (Sınıf {r[3]})")
@@ -528,6 +836,24 @@ class ExamSettingsDialog(QDialog):
             item.setCheckState(Qt.Checked)
             self.course_list.addItem(item)
 
+    def load_versions(self):
+        self.version_combo.clear()
+        self.version_combo.addItem("Yeni taslak", None)
+        try:
+            versions = schedule_versions.list_versions(self.db, self.bolum)
+        except Exception:
+            versions = []
+        for v in versions:
+            label = f"#{v['id']} {v['ad']} ({v['tur'] or '-'}, {v['n_sinav']} sınav)"
+            self.version_combo.addItem(label + (" [yayında]" if v["yayinda"] else ""), v)
+
+    def student_limits(self):
+        """Öğrenci başına sınır ayarları; 0 olanlar kapalı (None) gönderilir."""
+        return {
+            "max_exams_per_student_day": self.student_day_spin.value() or None,
+            "max_consecutive_exams": self.consecutive_spin.value() or None,
+        }
+
     def selected_course_ids(self):
         ids = []
         for i in range(self.course_list.count()):
@@ -546,15 +872,26 @@ class ExamSettingsDialog(QDialog):
             self.per_course_durations[cid] = val
         self.show_message("Uygulandı", f"Seçili derslere {val} dk olarak ayarlandı.")
 
-    def run_scheduler(self):
-        # her çalıştırmada temiz başlatma:
+    def load_seed_excel(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Tohum Takvim Seç", "", "Excel Files (*.xlsx *.xls)")
+        if not path:
+            return
         try:
-            self.db.execute("TRUNCATE TABLE sinavlar RESTART IDENTITY CASCADE;")
-            self.db.execute("TRUNCATE TABLE ogrenci_sinav RESTART IDENTITY CASCADE;")
-            self.db.execute("TRUNCATE TABLE oturma RESTART IDENTITY CASCADE;")
+            self.seed = ExamScheduler.load_seed_from_excel(path)
+            self.seed_path = path
+            self.show_message("Yüklendi", f"Tohum takvim yüklendi ({len(self.seed)} sınav).")
         except Exception as e:
-            self.output_text.append(f"⚠ Tablolar sıfırlanamadı: {e}")
+            self.seed, self.seed_path = None, None
+            self.show_message("Hata", f"Tohum takvim okunamadı: {e}", QMessageBox.Critical)
 
+    def run_scheduler(self):
+        # Plan bir taslak sürüme yazılır: tam planlamada yalnızca o sürümün satırları
+        # silinir, artımlı modda kaynak sürümün kopyası korunur ve yalnızca fark yazılır.
+        # ogrenci_sinav yalnızca yayınlanınca yenilenir.
+        # Planlama arka plandaki SchedulerWorker'da çalışır; diyalog donmaz.
+        # İş servisi (job_service.py) açıksa iş oraya gönderilir, değilse burada çalışır.
+        if self.worker is not None and self.worker.isRunning():
+            return
         try:
             start = self.start_date.date().toPython()
             end = self.end_date.date().toPython()
@@ -563,65 +900,321 @@ class ExamSettingsDialog(QDialog):
             bekleme = self.bekleme_spin.value()
             skip_weekends = self.skip_weekends_cb.isChecked()
             no_sim = self.no_simult_cb.isChecked()
+            incremental = self.incremental_cb.isChecked()
+            warm_start = self.warm_start_cb.isChecked()
+            show_profile = self.profile_cb.isChecked()
+            student_limits = self.student_limits()
+            split_rooms = self.split_cb.isChecked()
+            assign_proctors = self.proctor_cb.isChecked()
+            proctor_ratio = self.proctor_ratio_spin.value() or None
+            exam_type = self.type_combo.currentText().strip()
+            target = self.version_combo.currentData()
+            version_name = self.version_name_edit.text().strip() or None
+            publish = self.publish_cb.isChecked()
 
             selected = self.selected_course_ids()
             if not selected:
                 self.show_message("Seçim yok", "En az bir ders seçin.", QMessageBox.Warning)
                 return
 
-            scheduler = ExamScheduler(
-                self.db,
-                times_per_day=times,
-                bekleme_suresi_minutes=bekleme,
-                no_simultaneous_exams=no_sim
-            )
+            for t in times:
+                time_from_str(t)
+        except Exception as e:
+            self.output_text.setText(f"❌ Hata: {e}")
+            return
 
-            scheduled, failed = scheduler.schedule(
+        per_course_durations = dict(self.per_course_durations)
+        excel_seed, seed_path = self.seed, self.seed_path
+        def remote_job(db, progress, cancel_token):
+            # Servis ders kodlarıyla çalışır; sonuç JSON'dan panelin kayıt biçimine çevrilir
+            cache = ref_cache.for_db(db)
+            settings = {
+                "start_date": start.isoformat(), "end_date": end.isoformat(),
+                "times_per_day": times, "duration_default": duration,
+                "bekleme_suresi_minutes": bekleme, "skip_weekends": skip_weekends,
+                "no_simultaneous_exams": no_sim, "incremental": incremental,
+                "warm_start": warm_start, "split_rooms": split_rooms,
+                "proctors": assign_proctors, "students_per_proctor": proctor_ratio,
+                "exam_type": exam_type, "seed_excel": seed_path,
+                "courses": [cache.course(cid)["kod"] for cid in selected],
+                "per_course_durations": {cache.course(cid)["kod"]: m for cid, m in per_course_durations.items()},
+                **student_limits,
+            }
+            job_id = job_service.submit({
+                "type": "schedule", "bolum": self.bolum, "settings": settings,
+                "commit": True, "publish": publish, "version_name": version_name,
+                "version_id": target["id"] if target and not target["yayinda"] else None,
+                "excel_dir": ".",
+            })["id"]
+            res = job_service.wait(job_id, progress=progress, cancel_token=cancel_token)
+
+            scheduled = [dict(se, tarih=date.fromisoformat(se["tarih"]), saat=time_from_str(se["saat"]))
+                         for se in res["scheduled"]]
+            proctors = res.get("proctors")
+            proctor_lines = None
+            if proctors is not None:
+                proctor_lines = proctors["summary"] or [
+                    "⚠ Gözetmen listesi boş, atama yapılmadı (Gözetmen Listesi Yükle)"]
+            return {"scheduled": scheduled,
+                    "failed": [{"course": {"kod": f["kod"]}, "reason": f["reason"]} for f in res["failed"]],
+                    "excel": res.get("excel"), "incremental": incremental,
+                    "rebuild": (True, f"ogrenci_sinav güncellendi ({res['changed_courses']} ders)")
+                    if res["published"] else None,
+                    "proctor_lines": proctor_lines, "version_id": res["version_id"],
+                    "report": RunReport.from_dict(res["timings"]) if show_profile else None,
+                    "query_lines": None}
+
+        def job(db, progress, cancel_token):
+            if job_service.is_available():
+                return remote_job(db, progress, cancel_token)
+            # Servis yoksa aynı bölüme yazan diğer istemcilerle (CLI, servis) sıraya gir
+            with schedule_versions.department_lock(db, self.bolum, cancel_token=cancel_token):
+                return local_job(db, progress, cancel_token)
+
+        def local_job(db, progress, cancel_token):
+            # Profil raporu istenmişse bu çalıştırmanın sorgu istatistikleri de toplanır
+            if show_profile:
+                db.enable_stats()
+            scheduler = ExamScheduler(db, times_per_day=times, bekleme_suresi_minutes=bekleme,
+                                      no_simultaneous_exams=no_sim)
+            # Kaynak: seçili sürüm, yoksa bu türün yayındaki planı
+            source_id = target["id"] if target else schedule_versions.published_id(db, self.bolum, exam_type)
+            # Seçili taslak yerinde yeniden yazılır; yoksa schedule() yazarken yeni taslak açar
+            if target and not target["yayinda"]:
+                scheduler.version_id = target["id"]
+
+            # Excel tohumu önceki döneme aittir: günleri yeni aralığa eşle.
+            # Aksi halde işaretliyse kaynak sürümün planı tohum olur.
+            seed, align = None, False
+            if excel_seed:
+                seed, align = excel_seed, True
+            elif warm_start and not incremental:
+                seed = scheduler.load_seed_from_db(source_id)
+
+            scheduled, failed, report = scheduler.schedule(
                 start,
                 end,
                 selected_course_ids=selected,
                 duration_default=duration,
-                per_course_durations=self.per_course_durations,
+                per_course_durations=per_course_durations,
                 bolum=self.bolum,
                 skip_weekends=skip_weekends,
                 excluded_weekdays=None,
                 excluded_dates=None,
-                no_simultaneous_exams=no_sim
+                no_simultaneous_exams=no_sim,
+                incremental=incremental,
+                seed=seed,
+                seed_align_dates=align,
+                progress=progress,
+                cancel_token=cancel_token,
+                with_report=True,
+                split_rooms=split_rooms,
+                exam_type=exam_type,
+                version_name=version_name,
+                source_version_id=source_id,
+                **student_limits
             )
 
-            self.last_scheduled = scheduled
-
-            # Çıktı
-            self.output_text.clear()
-            self.output_text.append(f"✅ Planlanan sınav: {len(scheduled)}")
-            self.output_text.append(f"✅ Oturma planları otomatik oluşturuldu")
-            for se in scheduled:
-                self.output_text.append(
-                    f"{se['ders_kod']} - {se['ders_ad']} | "
-                    f"{se['tarih']} {se['saat'].strftime('%H:%M')} | {se['derslik_ad']}"
-                )
-
-            if failed:
-                self.output_text.append(f"\n⚠ Planlanamayan: {len(failed)}")
-                for f in failed:
-                    c = f.get("course")
-                    k = c.get("kod") if isinstance(c, dict) else (
-                        c[1] if isinstance(c, (list, tuple)) and len(c) > 1 else str(c)
-                    )
-                    self.output_text.append(f"{k} -> {f.get('reason')}")
+            # Gözetmen ataması (Excel'e de yazılır)
+            proctor_lines = None
+            if assign_proctors and scheduled:
+                progress({"phase": "invigilators"})
+                with report.phase("invigilators"):
+                    proctors = scheduler.assign_invigilators(scheduled, bolum=self.bolum,
+                                                             students_per_proctor=proctor_ratio)
+                proctor_lines = invigilators.summary(proctors, proctors["staff"]) if proctors["staff"] else [
+                    "⚠ Gözetmen listesi boş, atama yapılmadı (Gözetmen Listesi Yükle)"]
 
             # Excel export
+            fname = None
             if scheduled:
-                fname = scheduler.export_to_excel(scheduled, filename="sinav_takvimi.xlsx")
-                self.output_text.append(f"\nExcel kaydedildi: {fname}")
-                self.save_excel_btn.setEnabled(True)
+                progress({"phase": "export"})
+                with report.phase("excel_export"):
+                    fname = scheduler.export_to_excel(scheduled, filename="sinav_takvimi.xlsx",
+                                                      exam_type=exam_type)
+
+            # Yayınlanırsa kapasiteye göre ogrenci_sinav tablosunu yenile
+            rebuild = None
+            if publish:
+                progress({"phase": "ogrenci_sinav"})
+                changed = schedule_versions.publish(db, scheduler.last_version_id)
+                with report.phase("rebuild_ogrenci_sinav"):
+                    rebuild = self.rebuild_ogrenci_sinav(scheduler.last_version_id, changed, db=db)
+            return {"scheduled": scheduled, "failed": failed, "excel": fname,
+                    "rebuild": rebuild, "incremental": incremental, "proctor_lines": proctor_lines,
+                    "version_id": scheduler.last_version_id,
+                    "report": report if show_profile else None,
+                    "query_lines": db.stats.format(top=10) if show_profile else None}
+
+        self.output_text.clear()
+        self.output_text.append("▶ Planlama başladı...")
+        self._last_phase = None
+        self.worker = SchedulerWorker(job, self.db.config, parent=self)
+        self.worker.progress.connect(self._on_progress)
+        self.worker.done.connect(self._on_schedule_done)
+        self.worker.error.connect(self._on_schedule_error)
+        self.worker.finished.connect(self._on_worker_finished)
+        self._set_running(True)
+        self.worker.start()
+
+    def cancel_run(self):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel_token.cancel()
+            self.status_label.setText("İptal ediliyor...")
+
+    def _set_running(self, running):
+        for w in (self.run_btn, self.what_if_btn, self.set_override_btn, self.seed_excel_btn,
+                  self.quality_btn, self.publish_btn, self.diff_btn):
+            w.setEnabled(not running)
+        self.cancel_btn.setEnabled(running)
+        if not running:
+            self.status_label.setText("")
+
+    def _on_progress(self, event):
+        phase = event.get("phase")
+        if phase != self._last_phase:
+            self._last_phase = phase
+            label = self.PHASE_LABELS.get(phase, phase)
+            elapsed = event.get("elapsed")
+            self.output_text.append(f"… {label}" + (f" ({elapsed:.1f} sn)" if elapsed is not None else ""))
+        if event.get("total"):
+            self.status_label.setText(
+                f"{event['placed']}/{event['total']} yerleştirildi, {event['failed']} başarısız "
+                f"— {event['elapsed']:.1f} sn"
+            )
+        if event.get("ok") is False:
+            self.output_text.append(f"⚠ {event.get('course')}: uygun slot bulunamadı")
+
+    def _on_schedule_error(self, message):
+        self.output_text.append(f"❌ Hata: {message}")
+
+    def _on_worker_finished(self):
+        self._set_running(False)
+        self.worker = None
+
+    def _on_schedule_done(self, result):
+        scheduled, failed = result["scheduled"], result["failed"]
+        self.last_scheduled = scheduled
+
+        # Çıktı
+        self.output_text.clear()
+        n_courses = len({se['ders_id'] for se in scheduled})
+        n_split = len({se['ders_id'] for se in scheduled if 'parca' in se})
+        self.output_text.append(f"✅ Planlanan sınav: {n_courses}"
+                                + (f" ({n_split} ders birden fazla dersliğe bölündü)" if n_split else ""))
+        if result["incremental"]:
+            n_kept = len({se['ders_id'] for se in scheduled if se.get('fixed')})
+            self.output_text.append(f"✅ Korunan: {n_kept}, yeniden planlanan: {n_courses - n_kept}")
+        self.output_text.append(f"✅ Oturma planları otomatik oluşturuldu")
+        for se in scheduled:
+            self.output_text.append(
+                f"{se['ders_kod']} - {se['ders_ad']} | "
+                f"{se['tarih']} {se['saat'].strftime('%H:%M')} | {se['derslik_ad']}"
+                + (f" (parça {se['parca']}/{se['parca_sayisi']}, {se['n_students']} öğrenci)" if 'parca' in se else "")
+                + (f" | Gözetmen: {', '.join(se['gozetmenler']) or '-'}" if 'gozetmenler' in se else "")
+            )
+
+        for line in result["proctor_lines"] or []:
+            self.output_text.append(line)
 
-            # Kapasiteye göre ogrenci_sinav tablosunu yenile
-            ok, msg = self.rebuild_ogrenci_sinav()
+        if failed:
+            self.output_text.append(f"\n⚠ Planlanamayan: {len(failed)}")
+            for f in failed:
+                c = f.get("course")
+                k = c.get("kod") if isinstance(c, dict) else (
+                    c[1] if isinstance(c, (list, tuple)) and len(c) > 1 else str(c)
+                )
+                self.output_text.append(f"{k} -> {f.get('reason')}")
+
+        if result["excel"]:
+            self.output_text.append(f"\nExcel kaydedildi: {result['excel']}")
+            self.save_excel_btn.setEnabled(True)
+
+        if result["rebuild"] is not None:
+            ok, msg = result["rebuild"]
+            self.output_text.append(f"✅ Sürüm #{result['version_id']} yayınlandı")
             self.output_text.append(("✅ " if ok else "❌ ") + msg)
+        else:
+            self.output_text.append(f"ℹ Taslak #{result['version_id']} kaydedildi; yayındaki plan değişmedi "
+                                    "(Seçili Sürümü Yayınla)")
+        self.load_versions()
+        i = self.version_combo.findText(f"#{result['version_id']} ", Qt.MatchStartsWith)
+        if i >= 0:
+            self.version_combo.setCurrentIndex(i)
+
+        if result["report"] is not None:
+            self.output_text.append("\nProfil raporu:")
+            for line in result["report"].format():
+                self.output_text.append(line)
+            if result["query_lines"]:
+                self.output_text.append("\nSorgular (bu çalıştırma):")
+                for line in result["query_lines"]:
+                    self.output_text.append(line)
+
+    def reject(self):
+        # Çalışan planlama varsa iptal edip iş parçacığının bitmesini bekle
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel_token.cancel()
+            self.worker.wait()
+        super().reject()
+
+    def run_what_if(self):
+        """Mevcut ayarları ve alternatif saat listelerini veritabanına yazmadan karşılaştırır."""
+        selected = self.selected_course_ids()
+        if not selected:
+            self.show_message("Seçim yok", "En az bir ders seçin.", QMessageBox.Warning)
+            return
+        text, ok = QInputDialog.getMultiLineText(
+            self, "Senaryolar",
+            "Her satıra bir alternatif günlük saat listesi yazın (ör. 09:00, 13:30):",
+            "09:00, 13:30, 17:00"
+        )
+        if not ok:
+            return
+
+        times = [t.strip() for t in self.times_edit.text().split(",") if t.strip()]
+        no_sim = self.no_simult_cb.isChecked()
+        variants = [
+            {"name": "Mevcut ayarlar"},
+            {"name": "Aynı anda sınav " + ("serbest" if no_sim else "yok"), "no_simultaneous_exams": not no_sim},
+        ]
+        for line in text.splitlines():
+            alt = [t.strip() for t in line.split(",") if t.strip()]
+            if alt:
+                variants.append({"name": "Saatler: " + ", ".join(alt), "times_per_day": alt})
 
+        try:
+            scheduler = ExamScheduler(self.db, times_per_day=times,
+                                      bekleme_suresi_minutes=self.bekleme_spin.value())
+            results = scheduler.what_if(
+                self.start_date.date().toPython(),
+                self.end_date.date().toPython(),
+                variants,
+                selected_course_ids=selected,
+                bolum=self.bolum,
+                duration_default=self.duration_spin.value(),
+                per_course_durations=self.per_course_durations,
+                skip_weekends=self.skip_weekends_cb.isChecked(),
+                no_simultaneous_exams=no_sim,
+                split_rooms=self.split_cb.isChecked(),
+                **self.student_limits()
+            )
         except Exception as e:
             self.output_text.setText(f"❌ Hata: {e}")
+            return
+
+        self.output_text.clear()
+        self.output_text.append("Senaryo karşılaştırması (veritabanına yazılmadı):")
+        for r in results:
+            if "error" in r:
+                self.output_text.append(f"{r['name']}: ❌ {r['error']}")
+                continue
+            m = r['metrics']
+            self.output_text.append(
+                f"{r['name']}: planlanan {m['n_scheduled']}, planlanamayan {m['n_failed']}, "
+                f"gün {m['days_used']}, günde en çok {m['max_exams_per_day']}, "
+                f"doluluk %{m['seat_utilization'] * 100:.0f}"
+            )
 
     def save_last_excel(self):
         if not self.last_scheduled:
@@ -643,191 +1236,98 @@ class ExamSettingsDialog(QDialog):
                 "Süre": se['sure'],
                 "Öğrenci Sayısı": se.get('n_students', 0)
             })
+            if 'gozetmenler' in se:
+                df_rows[-1]["Gözetmenler"] = ", ".join(se['gozetmenler'])
 
         pd.DataFrame(df_rows).to_excel(path, index=False)
         self.show_message("Kaydedildi", f"Excel kaydedildi: {path}")
 
-    
-    def rebuild_ogrenci_sinav(self):
-        """
-        ogrenci_sinav tablosunu (no, ad, soyad, ders_id) kapasiteyi dikkate alarak baştan kurar.
-        - Her ders için (sinavlar'daki ilk sınav esas) dersliğin kapasitesi kadar öğrenci eklenir.
-        - Öğrenciler ogrenci_no'ya göre sıralanır.
-        """
-        q_drop = "DROP TABLE IF EXISTS ogrenci_sinav;"
-
-        q_create = """
-        CREATE TABLE ogrenci_sinav (
-            no VARCHAR(20) NOT NULL,
-            ad VARCHAR(100),
-            soyad VARCHAR(100),
-            ders_id INT NOT NULL REFERENCES dersler(id) ON DELETE CASCADE,
-            PRIMARY KEY (no, ders_id)
-        );
-        """
+    def show_quality_report(self):
+        """Son oluşturulan plan, yoksa seçili sürüm (ya da yayındaki takvim) için kalite göstergeleri."""
+        try:
+            if self.last_scheduled:
+                scheduled = self.last_scheduled
+                enrollment = schedule_quality.load_enrollment(self.db)
+            else:
+                version = self.version_combo.currentData()
+                scheduled, enrollment = schedule_quality.from_db(
+                    self.db, version_id=version["id"] if version else None)
+            if not scheduled:
+                self.show_message("Yok", "Değerlendirilecek sınav yok", QMessageBox.Warning)
+                return
+            self.last_quality = schedule_quality.compute(scheduled, enrollment)
+        except Exception as e:
+            self.output_text.setText(f"❌ Hata: {e}")
+            return
+        self.output_text.append("")
+        for line in schedule_quality.format_report(self.last_quality):
+            self.output_text.append(line)
+        self.save_quality_btn.setEnabled(True)
+
+    def publish_selected(self):
+        """Seçili sürümü türü için yayına alır ve ogrenci_sinav'ı yeniler."""
+        v = self.version_combo.currentData()
+        if not v:
+            self.show_message("Seçim yok", "Önce bir takvim sürümü seçin.", QMessageBox.Warning)
+            return
+        if v["yayinda"]:
+            self.show_message("Yayında", "Bu sürüm zaten yayında.")
+            return
+        try:
+            changed = schedule_versions.publish(self.db, v["id"])
+        except Exception as e:
+            self.output_text.append(f"❌ Yayınlama hatası: {e}")
+            return
+        ok, msg = self.rebuild_ogrenci_sinav(v["id"], changed)
+        self.output_text.append(f"✅ #{v['id']} {v['ad']} yayınlandı ({v['tur'] or '-'})")
+        self.output_text.append(("✅ " if ok else "❌ ") + msg)
+        self.load_versions()
+
+    def compare_versions(self):
+        """Seçili sürümü aynı türün yayındaki sürümüyle ders bazında karşılaştırır."""
+        v = self.version_combo.currentData()
+        if not v:
+            self.show_message("Seçim yok", "Önce bir takvim sürümü seçin.", QMessageBox.Warning)
+            return
+        try:
+            base = schedule_versions.published_id(self.db, v["bolum"], v["tur"])
+            if base is None or base == v["id"]:
+                self.show_message("Yok", "Karşılaştırılacak başka bir yayındaki sürüm yok.")
+                return
+            changes = schedule_versions.diff(self.db, base, v["id"])
+        except Exception as e:
+            self.output_text.append(f"❌ Hata: {e}")
+            return
+        self.output_text.append(f"\n#{base} (yayında) -> #{v['id']} {v['ad']}")
+        for line in schedule_versions.format_diff(changes):
+            self.output_text.append(line)
 
-        # ad/soyad: son kelime soyad, geri kalanı ad
-        q_insert = """
-        WITH first_exam AS (
-            SELECT
-                s.ders_id,
-                l.kapasite,
-                ROW_NUMBER() OVER (PARTITION BY s.ders_id ORDER BY s.tarih, s.saat, s.id) AS rn
-            FROM sinavlar s
-            JOIN derslikler l ON l.id = s.derslik_id
-        ),
-        src AS (
-            SELECT
-                od.ogrenci_no,
-                od.ders_id,
-                ROW_NUMBER() OVER (PARTITION BY od.ders_id ORDER BY od.ogrenci_no) AS rnk
-            FROM ogrenci_ders od
-        )
-        INSERT INTO ogrenci_sinav (no, ad, soyad, ders_id)
-        SELECT
-            og.no,
-            TRIM(REGEXP_REPLACE(og.adsoyad, '\\s+\\S+$', '')) AS ad,
-            REGEXP_REPLACE(og.adsoyad, '.*\\s+', '') AS soyad,
-            s.ders_id
-        FROM src s
-        JOIN first_exam fe ON fe.ders_id = s.ders_id AND fe.rn = 1
-        JOIN ogrenciler og ON og.no = s.ogrenci_no
-        WHERE s.rnk <= fe.kapasite;
-        """
+    def save_quality_report(self):
+        if not self.last_quality:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Kalite Raporu Kaydet", "sinav_kalite_raporu.xlsx",
+                                              "Excel Files (*.xlsx)")
+        if not path:
+            return
+        schedule_quality.to_excel(self.last_quality, path)
+        self.show_message("Kaydedildi", f"Kalite raporu kaydedildi: {path}")
 
+    def rebuild_ogrenci_sinav(self, version_id, ders_ids=None, db=None):
+        """
+        ogrenci_sinav tablosunu yayına alınan sürüme göre günceller (bkz. schedule_versions.refresh_ogrenci_sinav).
+        ders_ids: yayında değişen dersler; None ise sürümdeki tüm dersler yeniden hesaplanır.
+        db: planlama iş parçacığından çağrılırken o iş parçacığının bağlantısı.
+        """
+        if ders_ids is not None and not ders_ids:
+            return True, "ogrenci_sinav değişmedi (yayında değişen ders yok)."
         try:
-            self.db.execute(q_drop)
-            self.db.execute(q_create)
-            self.db.execute(q_insert)
-            return True, "ogrenci_sinav tablosu kapasiteye göre oluşturuldu."
+            schedule_versions.refresh_ogrenci_sinav(db or self.db, version_id, ders_ids)
+            scope = "tüm dersler" if ders_ids is None else f"{len(ders_ids)} ders"
+            return True, f"ogrenci_sinav kapasiteye göre güncellendi ({scope})."
         except Exception as e:
             return False, f"ogrenci_sinav oluşturma hatası: {e}"
 
 
-# Basit Oturma Planlayıcı
-class SeatPlanner:
-    def __init__(self, db: Database):
-        self.db = db
-
-    def get_students_for_exam(self, sinav_id: int):
-        row = self.db.execute(
-            "SELECT ders_id, derslik_id, tarih, saat FROM sinavlar WHERE id=%s",
-            (sinav_id,), fetchone=True
-        )
-        if not row:
-            return []
-        ders_id = row[0]
-        studs = self.db.execute(
-            "SELECT ogrenci_no FROM ogrenci_ders WHERE ders_id=%s ORDER BY ogrenci_no",
-            (ders_id,), fetchall=True
-        )
-        return [s[0] for s in studs]
-
-    def get_room_info(self, derslik_id: int):
-        return self.db.execute(
-            "SELECT ad, enine_sira, boyuna_sira, sira_yapisi FROM derslikler WHERE id=%s",
-            (derslik_id,), fetchone=True
-        )
-
-    def assign_seats(self, sinav_id: int):
-        row = self.db.execute(
-            "SELECT ders_id, derslik_id FROM sinavlar WHERE id=%s",
-            (sinav_id,), fetchone=True
-        )
-        if not row:
-            raise RuntimeError("Sınav bulunamadı")
-        derslik_id = row[1]
-
-        students = self.get_students_for_exam(sinav_id)
-        room = self.get_room_info(derslik_id)
-        if not room:
-            raise RuntimeError("Derslik bilgisi yok")
-
-        _, enine, boyuna, _ = room
-        capacity = int(enine) * int(boyuna)
-        if len(students) > capacity:
-            raise RuntimeError(f"Kapasite yetersiz: {len(students)} öğrenci, kapasite {capacity}")
-
-        assignments = []
-        idx = 0
-        for r in range(int(boyuna)):
-            for c in range(int(enine)):
-                if idx >= len(students):
-                    break
-                assignments.append({
-                    "ogrenci_no": students[idx][0] if isinstance(students[idx], tuple) else students[idx],
-                    "row": r + 1,
-                    "col": c + 1
-                })
-                idx += 1
-            if idx >= len(students):
-                break
-
-        # DB'ye yaz (mevcutları temizle)
-        self.db.execute("DELETE FROM oturma WHERE sinav_id=%s", (sinav_id,))
-        for a in assignments:
-            self.db.execute(
-                "INSERT INTO oturma (sinav_id, ogrenci_no, sira, sutun) VALUES (%s, %s, %s, %s)",
-                (sinav_id, a['ogrenci_no'], a['row'], a['col'])
-            )
-        return assignments
-
-    def export_pdf(self, sinav_id: int, output_path: str):
-        info = self.db.execute(
-            """
-            SELECT s.id, d.kod, d.ad, s.tarih, s.saat, l.ad, l.enine_sira, l.boyuna_sira
-            FROM sinavlar s
-            JOIN dersler d ON s.ders_id = d.id
-            JOIN derslikler l ON s.derslik_id = l.id
-            WHERE s.id = %s
-            """,
-            (sinav_id,), fetchone=True
-        )
-        if not info:
-            raise RuntimeError("Sınav bulunamadı")
-
-        _, ders_kod, ders_ad, tarih, saat, room_ad, _, _ = info
-
-        assigns = self.db.execute(
-            """
-            SELECT o.ogrenci_no, ogr.adsoyad, o.sira, o.sutun
-            FROM oturma o
-            JOIN ogrenciler ogr ON o.ogrenci_no = ogr.no
-            WHERE o.sinav_id=%s
-            ORDER BY o.sira, o.sutun
-            """,
-            (sinav_id,), fetchall=True
-        )
-
-        c = canvas.Canvas(output_path, pagesize=A4)
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(40, 800, f"{ders_kod} - {ders_ad} Oturma Planı")
-
-        c.setFont("Helvetica", 10)
-        c.drawString(40, 785, f"Tarih: {tarih} Saat: {saat.strftime('%H:%M')} Derslik: {room_ad}")
-
-        y = 760
-        c.setFont("Helvetica", 9)
-        c.drawString(40, y, "No")
-        c.drawString(120, y, "Ad Soyad")
-        c.drawString(360, y, "Sıra")
-        c.drawString(420, y, "Sütun")
-        y -= 14
-
-        for a in assigns:
-            c.drawString(40, y, str(a[0]))
-            c.drawString(120, y, str(a[1]))
-            c.drawString(360, y, str(a[2]))
-            c.drawString(420, y, str(a[3]))
-            y -= 12
-            if y < 60:
-                c.showPage()
-                y = 800
-
-        c.save()
-        return output_path
-
-
 # Çalıştırma
 if __name__ == "__main__":
     db = Database()
@@ -0,0 +1,188 @@
+# enrollment_snapshot.py
+"""
+ogrenci_ders tablosunun diskte tutulan sıkıştırılmış (CSR) kopyası.
+
+Öğrenci numaraları tamsayı kodlara çevrilir; ders başına öğrenci listeleri
+    course_ids[k]                         -> k. dersin id'si
+    indices[offsets[k]:offsets[k + 1]]    -> o dersin öğrenci kodları (int32)
+    students[kod]                         -> öğrenci numarası
+biçiminde .npy dosyalarına yazılır ve np.load(mmap_mode="r") ile okunur. Böylece
+tekrarlanan planlama / what-if çalıştırmaları tabloyu yeniden okumadan başlar ve
+aynı makinedeki süreçler dosyanın tek sayfa önbelleği kopyasını paylaşır.
+
+Geçerlilik: ogrenci_ders'e yazan her ifadede tetikleyicinin artırdığı sayaç
+(degisiklik_sayaci, bkz. connection.create_change_counter). Sayaç tek satır okunarak
+karşılaştırılır; tablo taranmaz. Değişmişse görüntü yeniden kurulur.
+
+Planlayıcıya dersin öğrencileri CourseStudents olarak verilir: numaraları (ogrenci_no)
+veren, kodları kopyalamadan mmap'li diziye bakan hafif bir liste.
+"""
+import json
+import os
+import sys
+import tempfile
+from array import array
+
+import numpy as np
+
+FILES = ("course_ids", "offsets", "indices", "students")
+
+
+def default_cache_dir(db):
+    """
+    EXAM_ENROLLMENT_CACHE ortam değişkeni (boş ya da "0" ise kapalı), yoksa
+    veritabanına özgü geçici dizin.
+    """
+    env = os.environ.get("EXAM_ENROLLMENT_CACHE")
+    if env is not None:
+        return env if env not in ("", "0") else None
+    cfg = getattr(db, "config", None) or {}
+    name = f"exam_enrollment_{cfg.get('host', 'local')}_{cfg.get('port', '')}_{cfg.get('database', 'db')}"
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+def table_version(db):
+    """
+    ogrenci_ders'in değişiklik sayacı ve sayacın kurulduğu an (veritabanı yeniden kurulunca
+    sayaç sıfırdan başlar). Veriden önce okunur: arada yazılan satırlar sonraki yüklemede
+    sayaç farkıyla yeniden kurulur. Sayaç kurulu değilse None.
+    """
+    row = db.execute(
+        "SELECT sayac, kurulum FROM degisiklik_sayaci WHERE tablo='ogrenci_ders'",
+        fetchone=True
+    )
+    return f"{row[0]}-{row[1]:%Y%m%d%H%M%S%f}" if row else None
+
+
+class CourseStudents:
+    """
+    Bir dersin öğrenci listesi: öğrenci numaralarını (str) verir, codes ise görüntüdeki
+    int32 kodların kopyasız görünümüdür (memoryview). load_courses'ın akış yoluyla aynı
+    değerleri döndürür; planlayıcı aynı görüntüden gelen listelerde doğrudan kodları kullanır.
+    """
+    __slots__ = ("enrollment", "codes")
+
+    def __init__(self, enrollment, codes):
+        self.enrollment = enrollment
+        self.codes = codes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        numbers = self.enrollment.students
+        for code in self.codes:
+            yield str(numbers[code])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(self)[i]
+        return str(self.enrollment.students[self.codes[i]])
+
+
+class EnrollmentSnapshot:
+    def __init__(self, course_ids, offsets, indices, students, version=None):
+        self.course_ids = course_ids
+        self.offsets = offsets
+        self.indices = indices
+        self.students = students
+        self.version = version
+        self._pos = {int(cid): k for k, cid in enumerate(course_ids)}
+
+    @classmethod
+    def build(cls, rows, version=None):
+        """rows: ders_id'ye göre sıralı (ders_id, ogrenci_no) satırları (liste ya da akış)."""
+        code_of = {}
+        course_ids, offsets, indices = [], [0], array("i")
+        last = None
+        for cid, no in rows:
+            if cid != last:
+                if last is not None:
+                    offsets.append(len(indices))
+                course_ids.append(cid)
+                last = cid
+            code = code_of.get(no)
+            if code is None:
+                code = code_of[no] = len(code_of)
+            indices.append(code)
+        if last is not None:
+            offsets.append(len(indices))
+        students = np.array(list(code_of), dtype=str) if code_of else np.array([], dtype="<U1")
+        return cls(np.array(course_ids, dtype=np.int64), np.array(offsets, dtype=np.int64),
+                   np.frombuffer(indices, dtype=np.int32).copy(), students, version)
+
+    def students_of(self, course_id):
+        """Dersin öğrenci kodları (int32 görünüm); kaydı yoksa boş dizi."""
+        k = self._pos.get(int(course_id))
+        if k is None:
+            return self.indices[:0]
+        return self.indices[self.offsets[k]:self.offsets[k + 1]]
+
+    def course_students(self, course_id):
+        """Dersin öğrencileri CourseStudents olarak (numaralar istenince çözülür)."""
+        return CourseStudents(self, memoryview(self.students_of(course_id)))
+
+    def student_numbers(self, codes):
+        return [str(s) for s in self.students[np.asarray(codes, dtype=np.int64)]]
+
+    def save(self, cache_dir):
+        """
+        Dosyalar sayaç değeriyle etiketlenip yazılır, ardından current.json atomik
+        olarak güncellenir; okuyan süreçler yarım yazılmış bir görüntü görmez.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        tag = f"{self.version}-{os.getpid()}"
+        for name in FILES:
+            np.save(os.path.join(cache_dir, f"{tag}_{name}.npy"), getattr(self, name))
+        tmp = os.path.join(cache_dir, f"current.{os.getpid()}.json")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "tag": tag}, f)
+        os.replace(tmp, os.path.join(cache_dir, "current.json"))
+        # Eski görüntüleri temizle (açık mmap'ler POSIX'te silmeden etkilenmez)
+        for fname in os.listdir(cache_dir):
+            if fname.endswith(".npy") and not fname.startswith(f"{self.version}-"):
+                try:
+                    os.remove(os.path.join(cache_dir, fname))
+                except OSError:
+                    pass
+
+    @classmethod
+    def load(cls, cache_dir, version):
+        """Diskteki görüntü verilen sayaç değerine aitse mmap ile açar, değilse None."""
+        try:
+            with open(os.path.join(cache_dir, "current.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("version") != version:
+            return None
+        try:
+            arrays = [np.load(os.path.join(cache_dir, f"{meta['tag']}_{name}.npy"), mmap_mode="r")
+                      for name in FILES]
+        except OSError:
+            return None
+        return cls(*arrays, version=version)
+
+
+def load_or_build(db, cache_dir, current=None):
+    """
+    Güncel görüntüyü diskten açar; yoksa ogrenci_ders'i bir kez akıtıp kurar ve kaydeder.
+    current: elde tutulan görüntü; sayaç değişmemişse aynı nesne döner (aynı çalıştırmadaki
+    dersler tek görüntünün kodlarını paylaşır). Değişiklik sayacı yoksa geçerliliği
+    bilinemeyen görüntü diske yazılmaz.
+    """
+    version = table_version(db)
+    if version is not None and current is not None and current.version == version:
+        return current
+    snap = EnrollmentSnapshot.load(cache_dir, version) if version is not None else None
+    if snap is not None:
+        return snap
+    rows = db.stream("SELECT ders_id, ogrenci_no FROM ogrenci_ders ORDER BY ders_id, ogrenci_no")
+    snap = EnrollmentSnapshot.build(rows, version)
+    if version is None:
+        return snap
+    try:
+        snap.save(cache_dir)
+    except OSError as e:
+        print("⚠ Kayıt görüntüsü yazılamadı:", e, file=sys.stderr)
+    return snap
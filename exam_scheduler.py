@@ -1,7 +1,17 @@
 # exam_scheduler.py
+import threading
+from array import array
+from bisect import bisect_left
+from contextlib import nullcontext
+from time import perf_counter
 import pandas as pd
-from datetime import datetime, date, time, timedelta
+from datetime import date, time, timedelta
 from connection import Database
+from run_report import RunReport
+import ref_cache
+import enrollment_snapshot
+import invigilators
+import schedule_versions
 
 def generate_dates(start_date: date, end_date: date, skip_weekends=True, excluded_weekdays=None, excluded_dates=None):
     excluded_weekdays = set(excluded_weekdays or [])
@@ -20,63 +30,715 @@ def generate_dates(start_date: date, end_date: date, skip_weekends=True, exclude
 def time_from_str(s):
     h,m = s.split(":"); return time(int(h), int(m))
 
+def _minute(d, t):
+    """Gün + saat -> mutlak dakika; arama döngüsündeki karşılaştırmalar tamsayı üzerinden yapılır."""
+    return d.toordinal() * 1440 + t.hour * 60 + t.minute
+
+class _Course:
+    """
+    Planlayıcının iç ders kaydı. students: öğrenci kodlarının int32 dizisi (array ya da
+    kayıt görüntüsünün memoryview'ı); hoca: öğretim
+    elemanı kodu (-1: belirtilmemiş); src: giriş sözlüğü.
+    """
+    __slots__ = ("id", "kod", "ad", "sinif", "hoca", "students", "n_students", "src")
+
+    def __init__(self, src, students, hoca=-1):
+        self.id = src['id']
+        self.kod = src['kod']
+        self.ad = src['ad']
+        self.sinif = src['sinif']
+        self.hoca = hoca
+        self.students = students
+        self.n_students = src['n_students']
+        self.src = src
+
+class _Room:
+    """Planlayıcının iç derslik kaydı; idx derslik listesindeki sıra numarasıdır."""
+    __slots__ = ("idx", "id", "ad", "kapasite")
+
+    def __init__(self, idx, src):
+        self.idx = idx
+        self.id = src['id']
+        self.ad = src['ad']
+        self.kapasite = src['kapasite']
+
+class _CompactSnapshot:
+    """
+    load_snapshot çıktısının arama için derlenmiş hali. Öğrenci numaraları yoğun
+    tamsayı kodlara çevrilir; öğretim elemanları da (dersler.hoca) aynı şekilde kodlanır.
+    Tüm dersler aynı kayıt görüntüsünden geliyorsa (enrollment_snapshot.CourseStudents)
+    görüntünün kodları kopyalanmadan kullanılır. Aynı nesne what_if senaryoları arasında paylaşılır.
+    """
+    def __init__(self, snapshot):
+        self.codes = {}
+        self.instructors = {}
+        # Düz listelerde None; tek bir görüntü varsa kodları onunkiler olur
+        sources = {getattr(c['students'], "enrollment", None) for c in snapshot['courses']}
+        self.enrollment = sources.pop() if len(sources) == 1 else None
+        self._enrollment_codes = None
+        self.courses = self.compile_courses(snapshot['courses'])
+        self.rooms = [_Room(i, r) for i, r in enumerate(snapshot['rooms'])]
+        self.room_blocks = snapshot.get('room_blocks') or {}
+
+    @property
+    def n_students(self):
+        base = len(self.enrollment.students) if self.enrollment is not None else 0
+        return base + len(self.codes)
+
+    def compile_courses(self, courses):
+        return [_Course(c, self.student_codes(c['students']), self.instructor_code(c.get('hoca')))
+                for c in courses]
+
+    def student_codes(self, students):
+        """
+        Öğrenci listesinin kodları. Görüntüden gelen listede görüntü kodları (kopyasız);
+        diğerlerinde numara başına yoğun kod, görüntü varsa onun kodlarından sonra başlar.
+        """
+        enrollment = self.enrollment
+        if enrollment is None:
+            codes = self.codes
+            return array("i", [codes.setdefault(s, len(codes)) for s in students])
+        if getattr(students, "enrollment", None) is enrollment:
+            return students.codes
+        # Karışık girdi (ör. başka kaynaktan gelen ders): numaralar görüntünün kodlarına eşlenir
+        if self._enrollment_codes is None:
+            self._enrollment_codes = {str(no): k for k, no in enumerate(enrollment.students)}
+        known, codes, base = self._enrollment_codes, self.codes, len(enrollment.students)
+        out = array("i")
+        for s in students:
+            k = known.get(s)
+            out.append(k if k is not None else codes.setdefault(s, base + len(codes)))
+        return out
+
+    def instructor_code(self, hoca):
+        """Boş / eksik hoca alanı -1 (kısıt uygulanmaz); aynı isim büyük-küçük harf ve boşluktan bağımsızdır."""
+        name = " ".join(str(hoca or "").split()).casefold()
+        if not name:
+            return -1
+        return self.instructors.setdefault(name, len(self.instructors))
+
+def _exam_record(course, room, d, t, dur, n_students=None):
+    """İç kayıtlardan schedule() / export_to_excel'in beklediği sınav sözlüğünü üretir."""
+    return {
+        "ders_id": course.id,
+        "ders_kod": course.kod,
+        "ders_ad": course.ad,
+        "tarih": d,
+        "saat": t,
+        "sure": dur,
+        "derslik_id": room.id,
+        "derslik_ad": room.ad,
+        "kapasite": room.kapasite,
+        "n_students": course.n_students if n_students is None else n_students,
+        "sinif": course.sinif
+    }
+
+def _exam_records(course, rooms, d, t, dur):
+    """
+    Bir dersin bir oturumdaki sınav kayıtları. Birden fazla derslik varsa ders bölünür:
+    öğrenciler (numara sırasıyla) dersliklere verilen sırada kapasite kadar dağıtılır,
+    son derslik kalanı alır. Parça kayıtlarında parca, parca_sayisi ve ogrenci_baslangic bulunur.
+    """
+    if len(rooms) == 1:
+        return [_exam_record(course, rooms[0], d, t, dur)]
+    records = []
+    for k, (start, n) in enumerate(split_counts([r.kapasite for r in rooms], course.n_students)):
+        rec = _exam_record(course, rooms[k], d, t, dur, n_students=n)
+        rec.update(parca=k + 1, parca_sayisi=len(rooms), ogrenci_baslangic=start)
+        records.append(rec)
+    return records
+
+def _seating_slice(se):
+    """Bölünmüş sınav parçası için _create_seating_for_exam'e verilecek öğrenci aralığı."""
+    if 'parca' not in se:
+        return {}
+    return {"offset": se['ogrenci_baslangic'], "count": se['n_students']}
+
+def split_counts(capacities, n_students):
+    """
+    Bölünmüş sınavda her parçanın (başlangıç, öğrenci sayısı) çifti: parçalar sırayla
+    kapasiteleri kadar doldurulur. Planlayıcı, oturma ve ogrenci_sinav aynı kuralı kullanır.
+    """
+    out, offset = [], 0
+    for cap in capacities:
+        n = max(0, min(cap, n_students - offset))
+        out.append((offset, n))
+        offset += n
+    return out
+
+def room_block_bitmaps(rooms, blocks, date_list, times, max_duration):
+    """
+    Derslik takvimini oturum eksenine derler. Oturum k = gün sırası * len(times) + saat sırası;
+    sonuç derslik listesi sırasıyla birer tamsayı bit maskesidir (k. bit: derslik o oturumda kapalı).
+    blocks: derslik_id -> [(tarih, başlangıç, bitiş), ...]; başlangıç/bitiş None ise gün boyu.
+    Sınav süresi derse göre değiştiğinden oturum [saat, saat + max_duration) aralığı olarak alınır.
+    """
+    day_index = {d: i for i, d in enumerate(date_list)}
+    n_times = len(times)
+    starts = [t.hour * 60 + t.minute for t in times]
+    bitmaps = []
+    for room in rooms:
+        mask = 0
+        for d, bas, bit in blocks.get(room.id, ()):
+            di = day_index.get(d)
+            if di is None:
+                continue
+            lo = bas.hour * 60 + bas.minute if bas is not None else 0
+            hi = bit.hour * 60 + bit.minute if bit is not None else 1440
+            for ti, st in enumerate(starts):
+                if lo < st + max_duration and hi > st:
+                    mask |= 1 << (di * n_times + ti)
+        bitmaps.append(mask)
+    return bitmaps
+
+def schedule_metrics(scheduled, failed):
+    """Bir planın özet göstergeleri (senaryoları yan yana karşılaştırmak için)."""
+    per_day = {}
+    for se in scheduled:
+        per_day[se['tarih']] = per_day.get(se['tarih'], 0) + 1
+    util = [se['n_students'] / se['kapasite'] for se in scheduled if se.get('kapasite')]
+    return {
+        "n_scheduled": len({se['ders_id'] for se in scheduled}),
+        "n_split": len({se['ders_id'] for se in scheduled if se.get('parca_sayisi', 1) > 1}),
+        "n_failed": len(failed),
+        "days_used": len(per_day),
+        "max_exams_per_day": max(per_day.values()) if per_day else 0,
+        "slots_used": len({(se['tarih'], se['saat']) for se in scheduled}),
+        "seat_utilization": round(sum(util) / len(util), 3) if util else 0.0,
+    }
+
+class SchedulingCancelled(Exception):
+    """İptal belirteci tetiklendiği için planlama yarıda bırakıldı."""
+
+class CancelToken:
+    """Başka bir iş parçacığından planlamayı durdurmak için kullanılan belirteç."""
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+class RunMonitor:
+    """
+    Planlama ilerlemesini yayınlar ve iptal belirtecini kontrol eder.
+    progress: her olayda çağrılan fonksiyon; olay sözlüğü
+        {"phase", "placed", "failed", "total", "elapsed", ...ek alanlar}
+    Fazlar: load, search, write, seating, done
+    """
+    def __init__(self, progress=None, cancel_token=None):
+        self.progress = progress
+        self.cancel_token = cancel_token
+        self.started = perf_counter()
+        self.phase = None
+        self.placed = 0
+        self.failed = 0
+        self.total = 0
+
+    def check(self):
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            raise SchedulingCancelled("Planlama iptal edildi.")
+
+    def emit(self, phase=None, **extra):
+        if phase:
+            self.phase = phase
+        if self.progress is None:
+            return
+        event = {
+            "phase": self.phase,
+            "placed": self.placed,
+            "failed": self.failed,
+            "total": self.total,
+            "elapsed": round(perf_counter() - self.started, 3),
+        }
+        event.update(extra)
+        self.progress(event)
+
+def _group_by_slot(exams):
+    """Sınav kayıtlarını (tarih, saat) oturumlarına gruplar; sıra korunur."""
+    groups = {}
+    for ex in exams:
+        groups.setdefault((ex['tarih'], ex['saat']), []).append(ex)
+    return list(groups.items())
+
+class _PlacementState:
+    """
+    Yerleştirme sırasında öğrenci takvimi, sınıf/gün sayacı ve derslik doluluğu.
+    Zamanlar mutlak dakika (bkz. _minute), öğrenciler _CompactSnapshot kodlarıdır.
+
+    Öğrenci başına günlük sınır (max_per_day) ya da art arda oturum sınırı
+    (max_consecutive) verilirse öğrenci x gün boyutlu day_masks dizisi tutulur:
+    her eleman o gün öğrencinin girdiği oturumların (times_per_day sırası) bit maskesidir.
+    """
+    def __init__(self, bekleme: timedelta, n_students, n_rooms, date_list=(), times=(),
+                 max_per_day=None, max_consecutive=None, room_blocked=None, n_instructors=0):
+        self.bekleme = int(bekleme.total_seconds() // 60)
+        self.busy = [None] * n_students  # öğrenci kodu -> array('q') [başlangıç, bitiş, ...]
+        self.class_day_count = {}        # (sınıf, gün) -> count
+        self.n_rooms = n_rooms
+        self.room_busy = set()           # başlangıç * n_rooms + derslik idx
+        self.slot_busy = set()           # başlangıç
+        self.slot_rooms = {}             # başlangıç -> [[ders, [derslik]], ...]; dersliği yeniden atanabilen sınavlar
+        # Öğretim elemanı x oturum doluluğu: sınav sürdüğü her oturum başlangıcı için
+        # başlangıç * n_instructors + hoca; günlük oturum başlangıçları (dakika) day_starts'ta
+        self.n_instructors = n_instructors
+        self.instructor_busy = set()
+        self.day_starts = sorted(t.hour * 60 + t.minute for t in times)
+
+        self.max_per_day = max_per_day
+        self.max_consecutive = max_consecutive
+        self.day_masks = None
+        if max_per_day or max_consecutive:
+            self.day_index = {d: i for i, d in enumerate(date_list)}
+            self.slot_index = {t: i for i, t in enumerate(sorted(times))}
+            self.n_days = len(date_list)
+            self.day_masks = array("I", bytes(4 * n_students * self.n_days))  # öğrenci * n_days + gün
+
+        # Derslik takvimi (bkz. room_block_bitmaps): mutlak dakika -> oturum biti
+        self.room_blocked = None
+        if room_blocked and any(room_blocked):
+            self.room_blocked = room_blocked
+            self.slot_bit = {_minute(d, t): di * len(times) + ti
+                             for di, d in enumerate(date_list) for ti, t in enumerate(times)}
+
+    def student_conflict(self, students, cand_start, cand_end):
+        # Çakışma ya da bekleme ihlali: st < cand_end + bekleme ve en > cand_start - bekleme
+        lo = cand_start - self.bekleme
+        hi = cand_end + self.bekleme
+        busy = self.busy
+        for stu in students:
+            iv = busy[stu]
+            if iv is not None:
+                for k in range(0, len(iv), 2):
+                    if iv[k] < hi and iv[k + 1] > lo:
+                        return True
+        return False
+
+    def instructor_conflict(self, hoca, cand_start, dur):
+        """
+        Öğretim elemanının bu aralıkta başka sınavı var mı? Oturum başına küme araması:
+        aday başlangıcında süren bir sınav ya da aday süresince başlayan bir sınav çakışmadır.
+        """
+        if hoca < 0:
+            return False
+        n, busy = self.n_instructors, self.instructor_busy
+        if cand_start * n + hoca in busy:
+            return True
+        day0 = cand_start - cand_start % 1440
+        cand_end = cand_start + dur
+        for m in self.day_starts:
+            s = day0 + m
+            if cand_start < s < cand_end and s * n + hoca in busy:
+                return True
+        return False
+
+    def class_day_full(self, sinif, d):
+        return self.class_day_count.get((sinif, d), 0) >= 2
+
+    def student_day_full(self, students, d, t):
+        """Bu oturum eklenirse bir öğrencinin günlük ya da art arda sınav sınırı aşılır mı?"""
+        di = self.day_index.get(d)
+        si = self.slot_index.get(t)
+        if di is None or si is None:
+            return False
+        masks, n_days = self.day_masks, self.n_days
+        cap, run = self.max_per_day, self.max_consecutive
+        for stu in students:
+            m = masks[stu * n_days + di]
+            if not m:
+                continue
+            if cap and bin(m).count("1") >= cap:
+                return True
+            if run:
+                # si'yi içeren ardışık oturum dizisinin uzunluğu
+                length, j = 1, si - 1
+                while j >= 0 and m >> j & 1:
+                    length += 1
+                    j -= 1
+                j = si + 1
+                while m >> j & 1:
+                    length += 1
+                    j += 1
+                if length > run:
+                    return True
+        return False
+
+    def room_taken(self, start, room):
+        if start * self.n_rooms + room.idx in self.room_busy:
+            return True
+        if self.room_blocked is not None:
+            k = self.slot_bit.get(start)
+            return k is not None and self.room_blocked[room.idx] >> k & 1 == 1
+        return False
+
+    def open_capacity(self, rooms, k):
+        """k. oturumda takvime göre açık dersliklerin (en büyük kapasite, toplam kapasite) çifti."""
+        blocked = self.room_blocked
+        caps = [r.kapasite for r in rooms if blocked is None or not blocked[r.idx] >> k & 1]
+        return (max(caps), sum(caps)) if caps else (0, 0)
+
+    def best_fit_rooms(self, cand_start, course, rooms_by_cap):
+        """
+        Oturumun yeniden atanabilen sınavlarını yeni dersle birlikte dersliklere dağıtır
+        (best-fit decreasing): öğrenci sayısı büyükten küçüğe her sınav, kendisini alabilen
+        en küçük boş dersliği alır. "Kapasite >= öğrenci" eşik yapısında bu açgözlü seçim
+        hem uygunluk hem de toplam boş koltuk bakımından en küçük maliyetli eşleştirmedir.
+        Sabit atamalar (korunan, tohumdan gelen, bölünmüş sınavlar) yerinde kalır.
+        Dönüş: [(kayıt ya da yeni ders için None, derslik), ...]; sığmıyorsa None.
+        """
+        entries = self.slot_rooms.get(cand_start, ())
+        movable = {e[1][0].idx for e in entries}
+        free = [r for r in rooms_by_cap if r.idx in movable or not self.room_taken(cand_start, r)]
+        caps = [r.kapasite for r in free]
+        demand = [(e[0].n_students, e[0].id, e) for e in entries]
+        demand.append((course.n_students, course.id, None))
+        demand.sort(key=lambda x: (x[0], x[1]), reverse=True)
+        assignment = []
+        for n, _, entry in demand:
+            k = bisect_left(caps, n)
+            if k == len(free):
+                return None
+            assignment.append((entry, free.pop(k)))
+            caps.pop(k)
+        return assignment
+
+    def largest_free_room(self, cand_start, rooms_by_cap):
+        """Oturumda boş kalan en büyük dersliğin kapasitesi (hiç yoksa 0)."""
+        for room in reversed(rooms_by_cap):
+            if not self.room_taken(cand_start, room):
+                return room.kapasite
+        return 0
+
+    def free_capacity(self, cand_start, rooms_by_cap):
+        """Oturumda boş (dolu ya da takvimde kapalı olmayan) dersliklerin toplam kapasitesi."""
+        return sum(r.kapasite for r in rooms_by_cap if not self.room_taken(cand_start, r))
+
+    def reassign_rooms(self, cand_start, assignment):
+        """best_fit_rooms sonucunu mevcut sınavlara uygular; dersliği değişen sınav sayısını döndürür."""
+        moves = [(entry, room) for entry, room in assignment if entry is not None and entry[1][0] is not room]
+        for entry, _ in moves:
+            self.room_busy.discard(cand_start * self.n_rooms + entry[1][0].idx)
+        for entry, room in moves:
+            entry[1][0] = room
+            self.room_busy.add(cand_start * self.n_rooms + room.idx)
+        return len(moves)
+
+    def add(self, course, d, t, dur, rooms, movable=False):
+        """
+        rooms: dersin bu oturumdaki _Room'ları (derslik listesinde olmayan derslikler atlanır).
+        movable: tek derslikli atamanın sonraki best_fit_rooms çağrılarında değişebileceğini belirtir;
+        bu durumda güncel derslik listesini tutan kayıt döndürülür.
+        """
+        cand_start = _minute(d, t)
+        cand_end = cand_start + dur
+        # öğrenci takvimi güncelle
+        busy = self.busy
+        for stu in course.students:
+            iv = busy[stu]
+            if iv is None:
+                iv = busy[stu] = array("q")
+            iv.append(cand_start)
+            iv.append(cand_end)
+        if self.day_masks is not None:
+            di = self.day_index.get(d)
+            si = self.slot_index.get(t)
+            if di is not None and si is not None:
+                masks, n_days, bit = self.day_masks, self.n_days, 1 << si
+                for stu in course.students:
+                    masks[stu * n_days + di] |= bit
+        class_key = (course.sinif, d)
+        self.class_day_count[class_key] = self.class_day_count.get(class_key, 0) + 1
+        if course.hoca >= 0:
+            n = self.n_instructors
+            self.instructor_busy.add(cand_start * n + course.hoca)
+            day0 = cand_start - cand_start % 1440
+            for m in self.day_starts:
+                if cand_start < day0 + m < cand_end:
+                    self.instructor_busy.add((day0 + m) * n + course.hoca)
+        for room in rooms:
+            if room is not None:
+                self.room_busy.add(cand_start * self.n_rooms + room.idx)
+        self.slot_busy.add(cand_start)
+        if movable:
+            entry = [course, list(rooms)]
+            self.slot_rooms.setdefault(cand_start, []).append(entry)
+            return entry
+        return None
+
 class ExamScheduler:
-    def __init__(self, db: Database, times_per_day=None, bekleme_suresi_minutes=15, no_simultaneous_exams=False):
+    def __init__(self, db: Database, times_per_day=None, bekleme_suresi_minutes=15, no_simultaneous_exams=False,
+                 enrollment_cache_dir="default", version_id=None):
         self.db = db
+        # Yazılacak takvim sürümü (bkz. schedule_versions); None ise schedule() her çağrıda
+        # yazmaya başlarken yeni taslak açar. Yazılan sürüm last_version_id'dedir.
+        self.version_id = version_id
+        self.last_version_id = None
+        # ogrenci_ders'in diskteki CSR görüntüsü (bkz. enrollment_snapshot); None ise her seferinde DB'den okunur
+        if enrollment_cache_dir == "default":
+            enrollment_cache_dir = enrollment_snapshot.default_cache_dir(db) if db is not None else None
+        self.enrollment_cache_dir = enrollment_cache_dir
+        self._enrollment = None
         self.times_per_day = [time_from_str(t) for t in (times_per_day or ["09:00","13:30","17:00"])]
         self.bekleme = timedelta(minutes=bekleme_suresi_minutes)
         self.no_simultaneous = no_simultaneous_exams
+        self._report = None          # çalışma sırasında RunReport (bkz. schedule)
+        self.last_report = None
+
+    def _phase(self, name):
+        """Profil raporu açıksa verilen fazı ölçen context manager döndürür."""
+        return self._report.phase(name) if self._report is not None else nullcontext()
 
     def load_courses(self, filter_ids=None):
-        q = "SELECT id, kod, ad, sinif FROM dersler"
+        q = "SELECT id, kod, ad, sinif, hoca FROM dersler"
         params = ()
         if filter_ids:
             placeholders = ",".join(["%s"]*len(filter_ids))
             q += f" WHERE id IN ({placeholders})"
             params = tuple(filter_ids)
         rows = self.db.execute(q, params, fetchall=True)
+        students_by_course = {r[0]: [] for r in rows}
+        if students_by_course and self.enrollment_cache_dir:
+            # Akış yoluyla aynı öğrenci numaraları; listeler mmap'li görüntüye bakar, kopyalanmaz
+            snap = self._enrollment = enrollment_snapshot.load_or_build(
+                self.db, self.enrollment_cache_dir, current=self._enrollment)
+            for cid in students_by_course:
+                students_by_course[cid] = snap.course_students(cid)
+        elif students_by_course:
+            # Tüm öğrenci listeleri tek sorguda okunur (ders başına ayrı sorgu yerine)
+            # Fakülte genelinde milyonlarca satır olabilir: sunucu taraflı cursor ile akıt
+            studs = self.db.stream(
+                "SELECT ders_id, ogrenci_no FROM ogrenci_ders WHERE ders_id = ANY(%s)",
+                (list(students_by_course),)
+            )
+            for cid, no in studs:
+                students_by_course[cid].append(no)
         courses = []
-        for cid,kod,ad,sinif in rows:
-            studs = self.db.execute("SELECT ogrenci_no FROM ogrenci_ders WHERE ders_id=%s", (cid,), fetchall=True)
-            students = [r[0] for r in studs] if studs else []
-            courses.append({"id":cid,"kod":kod,"ad":ad,"sinif": sinif or 0,"students":students,"n_students":len(students)})
+        for cid,kod,ad,sinif,hoca in rows:
+            students = students_by_course[cid]
+            courses.append({"id":cid,"kod":kod,"ad":ad,"sinif": sinif or 0,"hoca":hoca,"students":students,"n_students":len(students)})
         return courses
 
     def load_rooms(self, bolum=None):
         # Load rooms ordered by capacity DESC so larger rooms are tried first
-        if bolum:
-            rows = self.db.execute("SELECT id, kod, ad, kapasite, enine_sira, boyuna_sira, sira_yapisi FROM derslikler WHERE bolum=%s ORDER BY kapasite DESC", (bolum,), fetchall=True)
-        else:
-            rows = self.db.execute("SELECT id, kod, ad, kapasite, enine_sira, boyuna_sira, sira_yapisi FROM derslikler ORDER BY kapasite DESC", fetchall=True)
-        rooms=[]
-        for r in rows:
-            rooms.append({"id":r[0],"kod":r[1],"ad":r[2],"kapasite":r[3],"enine":r[4],"boyuna":r[5],"sira":r[6]})
+        rooms = [dict(r) for r in ref_cache.for_db(self.db).rooms(bolum)]
+        rooms.sort(key=lambda r: r["kapasite"], reverse=True)
+        for r in rooms:
+            del r["bolum"]
         return rooms
 
+    def load_room_blocks(self, room_ids):
+        """derslik_takvim'deki kapalı zamanlar: derslik_id -> [(tarih, başlangıç, bitiş), ...]."""
+        if not room_ids:
+            return {}
+        rows = self.db.execute(
+            "SELECT derslik_id, tarih, baslangic, bitis FROM derslik_takvim WHERE derslik_id = ANY(%s)",
+            (list(room_ids),), fetchall=True
+        )
+        blocks = {}
+        for rid, d, bas, bit in rows or []:
+            blocks.setdefault(rid, []).append((d, bas, bit))
+        return blocks
+
+    def load_existing_exams(self, version_id):
+        """Sürümün sınavlarını ders_id -> [sınav kaydı] olarak döndürür (sürüm yoksa boş)."""
+        if version_id is None:
+            return {}
+        rows = self.db.execute(
+            "SELECT id, ders_id, tarih, saat, sure, derslik_id FROM sinavlar WHERE surum_id=%s "
+            "ORDER BY tarih, saat, id",
+            (version_id,), fetchall=True
+        )
+        existing = {}
+        for sid, cid, d, t, sure, rid in rows or []:
+            existing.setdefault(cid, []).append({
+                "sinav_id": sid, "ders_id": cid, "tarih": d, "saat": t, "sure": sure, "derslik_id": rid
+            })
+        return existing
+
     def schedule(self, start_date: date, end_date: date, selected_course_ids=None,
                 duration_default=75, per_course_durations=None, bolum=None,
                 skip_weekends=True, excluded_weekdays=None, excluded_dates=None,
-                no_simultaneous_exams=False):
+                no_simultaneous_exams=False, incremental=False, seed=None, seed_align_dates=False,
+                dry_run=False, progress=None, cancel_token=None, with_report=False,
+                max_exams_per_student_day=None, max_consecutive_exams=None, split_rooms=True,
+                exam_type="", version_name=None, source_version_id=None):
         """
         per_course_durations: dict course_id -> duration_minutes
         excluded_weekdays: iterable of weekday numbers to skip (0=Mon...6=Sun)
+        incremental: True ise mevcut plan silinmez; sürümdeki kayıtlar sabit kabul edilir,
+            yalnızca değişen (per_course_durations ile açıkça verilen yeni süre, kapasite), yeni
+            çakışan ya da hiç planlanmamış dersler yeniden yerleştirilir ve veritabanına sadece
+            fark yazılır. Süresi verilmeyen planlı dersler kayıtlı sürelerini korur.
+        Plan self.version_id sürümüne yazılır; None ise yazma başlarken yeni bir taslak
+        (version_name, exam_type) açılır, artımlı modda kaynak sürüm kopyalanarak. Kaynak:
+        source_version_id, verilmezse bölümün exam_type için yayındaki planı; kuru çalıştırma
+        da aynı kaynağı okur. İptal edilen ya da hata veren çalıştırma taslak bırakmaz.
+        Yazılan sürümün id'si self.last_version_id'dedir (kuru çalıştırmada None).
+        Tam planlama yalnızca bu sürümün satırlarını siler, yayındaki plan değişmez
+        (yayınlamak için schedule_versions.publish).
+        seed: warm-start tohumu (load_seed_from_db / load_seed_from_excel çıktısı); hâlâ
+            uygulanabilir atamalar korunur, yalnızca kalan dersler için arama yapılır.
+        seed_align_dates: tohumdaki sınav günlerini sırayla yeni tarih aralığına eşler.
+        dry_run: True ise veritabanına hiçbir şey yazılmaz (oturma/sinavlar dahil);
+            plan yalnızca bellekte üretilip döndürülür.
+        progress: ilerleme olaylarını alan fonksiyon (bkz. RunMonitor).
+        cancel_token: CancelToken; yükleme ve arama sırasında iptal edilirse
+            SchedulingCancelled fırlatılır. Yazma başladıktan sonra iptal dikkate alınmaz,
+            böylece veritabanında yarım plan kalmaz.
+        with_report: True ise (scheduled, failed, RunReport) döndürülür; rapor her durumda
+            self.last_report içinde de tutulur (faz süreleri, sorgu/yazılan satır sayıları,
+            arama sayaçları).
+        max_exams_per_student_day / max_consecutive_exams: öğrenci başına sınırlar (bkz. plan).
+        split_rooms: büyük derslerin birden fazla dersliğe bölünmesi (bkz. plan).
         """
         self.no_simultaneous = no_simultaneous_exams
+        monitor = RunMonitor(progress, cancel_token)
+        report = self._report = self.last_report = RunReport(self.db)
+        self.last_version_id = None
+        try:
+            #  Dersleri ve sınıfları yüklüyoruz
+            monitor.emit("load")
+            snapshot = self.load_snapshot(selected_course_ids=selected_course_ids, bolum=bolum)
+
+            existing = other_courses = source = None
+            if incremental:
+                # Hedef taslak varsa yerinde güncellenir; yoksa kaynak sürüm (commit'te kopyalanır)
+                source = source_version_id
+                if source is None and self.version_id is None:
+                    source = schedule_versions.published_id(self.db, bolum or "", exam_type or "")
+                with self._phase("load_existing"):
+                    existing = self.load_existing_exams(
+                        self.version_id if self.version_id is not None else source)
+                selected = {c['id'] for c in snapshot['courses']}
+                other_ids = [cid for cid in existing if cid not in selected]
+                other_courses = self.load_courses(filter_ids=other_ids) if other_ids else []
+
+            with self._phase("search"):
+                result = self.plan(snapshot, start_date, end_date,
+                                   duration_default=duration_default, per_course_durations=per_course_durations,
+                                   skip_weekends=skip_weekends, excluded_weekdays=excluded_weekdays,
+                                   excluded_dates=excluded_dates, no_simultaneous_exams=no_simultaneous_exams,
+                                   seed=seed, seed_align_dates=seed_align_dates,
+                                   existing=existing, other_courses=other_courses, monitor=monitor,
+                                   max_exams_per_student_day=max_exams_per_student_day,
+                                   max_consecutive_exams=max_consecutive_exams, split_rooms=split_rooms)
+            kept, stale = result['kept'], result['stale']
+            scheduled, failed = result['scheduled'], result['failed']
+            monitor.check()
+            if dry_run:
+                monitor.emit("done")
+                return (kept + scheduled, failed, report) if with_report else (kept + scheduled, failed)
+
+            #  Veritabanına yaz 
+            monitor.emit("write")
+            version_id = self.version_id
+            if version_id is None:
+                version_id = schedule_versions.create(self.db, ad=version_name, tur=exam_type or "",
+                                                      bolum=bolum or "", source_id=source)
+            try:
+                if incremental:
+                    if self.version_id is None and source is not None:
+                        # Korunan / silinecek kayıtlar kaynağın satırlarıydı: kopyalarına yönlendir
+                        self._adopt_copies(version_id, kept + stale)
+                    with self._phase("drop_stale"):
+                        self._drop_stale_exams(stale)
+                elif self.version_id is not None:
+                    with self._phase("clear_version"):
+                        self._reset_schedule_tables(version_id)
+                with self._phase("insert_sinavlar"):
+                    self._insert_exams(scheduled, failed, version_id)
+            except Exception:
+                if self.version_id is None:
+                    schedule_versions.delete(self.db, version_id)
+                raise
+            self.last_version_id = version_id
+
+            # Oturma planlarını otomatik oluştur
+            monitor.emit("seating")
+            seating_errors = []
+            with self._phase("seating"):
+                for se in scheduled:
+                    if 'sinav_id' in se:
+                        try:
+                            self._create_seating_for_exam(se['sinav_id'], se['ders_id'], se['derslik_id'],
+                                                          **_seating_slice(se))
+                        except Exception as e:
+                            seating_errors.append(f"{se['ders_kod']}: {e}")
+                # Korunan sınavlarda yalnızca eklenen / bırakılan öğrencilerin koltukları güncellenir;
+                # bölünmüş sınavlarda parça sınırları kayabileceği için parça baştan oturtulur
+                for se in kept:
+                    try:
+                        if 'parca' in se:
+                            self._create_seating_for_exam(se['sinav_id'], se['ders_id'], se['derslik_id'],
+                                                          **_seating_slice(se))
+                        else:
+                            self._sync_seating_for_exam(se['sinav_id'], se['ders_id'], se['derslik_id'])
+                    except Exception as e:
+                        seating_errors.append(f"{se['ders_kod']}: {e}")
+
+            if seating_errors:
+                for err in seating_errors:
+                    failed.append({"course": {"kod": "OTURMA"}, "reason": err})
+
+            monitor.emit("done")
+            return (kept + scheduled, failed, report) if with_report else (kept + scheduled, failed)
+        finally:
+            self._report = None
+
+    def load_snapshot(self, selected_course_ids=None, bolum=None):
+        """
+        Planlama girdilerini (öğrenci listeleriyle dersler ve derslikler) bir kez okur.
+        plan() ve what_if() bu anlık görüntü üzerinde veritabanına dokunmadan çalışır.
+        """
+        with self._phase("load_courses"):
+            courses = self.load_courses(filter_ids=selected_course_ids)
+        with self._phase("load_rooms"):
+            rooms = self.load_rooms(bolum=bolum)
+            room_blocks = self.load_room_blocks([r["id"] for r in rooms])
+        return {"courses": courses, "rooms": rooms, "room_blocks": room_blocks}
+
+    def plan(self, snapshot, start_date: date, end_date: date, duration_default=75,
+             per_course_durations=None, skip_weekends=True, excluded_weekdays=None,
+             excluded_dates=None, no_simultaneous_exams=False, seed=None, seed_align_dates=False,
+             existing=None, other_courses=None, monitor=None, report=None,
+             max_exams_per_student_day=None, max_consecutive_exams=None, split_rooms=True):
+        """
+        Yan etkisiz planlama: snapshot üzerinde arama yapar, veritabanını kullanmaz.
+        existing / other_courses: artımlı mod için load_existing_exams çıktısı ve seçim
+            dışındaki derslerin kayıtları.
+        monitor: ilerleme olayları ve iptal için RunMonitor (isteğe bağlı).
+        report: arama sayaçlarının yazılacağı RunReport (isteğe bağlı; schedule() kendi raporunu kullanır).
+        max_exams_per_student_day: bir öğrencinin aynı gün girebileceği en fazla sınav (None: sınırsız).
+        max_consecutive_exams: bir öğrencinin aynı gün art arda oturumlarda (times_per_day sırası)
+            girebileceği en fazla sınav (None: sınırsız).
+        split_rooms: hiçbir boş derslik yetmediğinde dersin aynı oturumda birden fazla dersliğe
+            bölünmesine izin verir (her parça ayrı sinavlar satırıdır).
+        Dönüş: {"scheduled", "failed", "kept", "stale", "metrics"}
+        """
+        if report is not None:
+            previous, self._report = self._report, report
+            try:
+                return self.plan(snapshot, start_date, end_date, duration_default=duration_default,
+                                 per_course_durations=per_course_durations, skip_weekends=skip_weekends,
+                                 excluded_weekdays=excluded_weekdays, excluded_dates=excluded_dates,
+                                 no_simultaneous_exams=no_simultaneous_exams, seed=seed,
+                                 seed_align_dates=seed_align_dates, existing=existing,
+                                 other_courses=other_courses, monitor=monitor,
+                                 max_exams_per_student_day=max_exams_per_student_day,
+                                 max_consecutive_exams=max_consecutive_exams, split_rooms=split_rooms)
+            finally:
+                self._report = previous
+        monitor = monitor or RunMonitor()
+        self.no_simultaneous = no_simultaneous_exams
         per_course_durations = per_course_durations or {}
-        bekleme = getattr(self, "bekleme_suresi_minutes", 15)
 
-        # Eski oturma kayıtlarını temizle
-        try:
-            self.db.execute("TRUNCATE TABLE oturma RESTART IDENTITY CASCADE;")
-            
-        except Exception as e:
-            # Eğer TRUNCATE desteklenmiyorsa DELETE kullan
-            self.db.execute("DELETE FROM oturma;")
-
-        #  Dersleri ve sınıfları yüklüyoruz
-        courses = self.load_courses(filter_ids=selected_course_ids)
-        courses.sort(key=lambda c: (c['sinif'], -c['n_students']))
-        rooms = self.load_rooms(bolum=bolum)
+        if not isinstance(snapshot, _CompactSnapshot):
+            snapshot = _CompactSnapshot(snapshot)
+        courses = sorted(snapshot.courses, key=lambda c: (c.sinif, -c.n_students))
+        rooms = snapshot.rooms
         if not rooms:
             raise RuntimeError("Derslik bulunamadı!")
 
@@ -86,100 +748,419 @@ class ExamScheduler:
         if not date_list:
             raise RuntimeError("Verilen tarih aralığında kullanılabilir gün yok.")
 
-        #  Hazırlık 
-        scheduled = []
+        durations = {c.id: per_course_durations.get(c.id, duration_default) for c in courses}
+        if existing:
+            # Süreler kaydedilmez (panel / config her çalıştırmada yeniden verir): planlı bir dersin
+            # süresi, bu çalıştırmada açıkça verilmedikçe sinavlar'daki kayıtlı süresidir
+            for c in courses:
+                if c.id in existing and c.id not in per_course_durations:
+                    durations[c.id] = existing[c.id][0]['sure']
+        # Seçim dışındaki dersler aynı öğrenci kodlarıyla derlenir (state boyutu buna göre)
+        other_courses = snapshot.compile_courses(other_courses) if existing is not None and other_courses else []
+        # Derslik takvimi oturum eksenine bit maskesi olarak derlenir
+        room_blocked = None
+        if snapshot.room_blocks:
+            room_blocked = room_block_bitmaps(rooms, snapshot.room_blocks, date_list, self.times_per_day,
+                                              max(durations.values(), default=duration_default))
+        state = _PlacementState(self.bekleme, snapshot.n_students, len(rooms), date_list, self.times_per_day,
+                                max_per_day=max_exams_per_student_day, max_consecutive=max_consecutive_exams,
+                                room_blocked=room_blocked, n_instructors=len(snapshot.instructors))
+        monitor.total = len(courses)
+        monitor.emit("search")
+
+        kept, stale = [], []
+        if existing is not None:
+            kept, stale, courses = self._fix_existing(courses, rooms, date_list, durations, state,
+                                                      existing, other_courses)
+
+        seeded = []
+        if seed:
+            seeded, courses = self._apply_seed(seed, courses, rooms, date_list, durations, state,
+                                               align_dates=seed_align_dates)
+        monitor.placed = len(kept) + len(seeded)
+
+        scheduled, failed = self._place_courses(courses, rooms, date_list, durations, state,
+                                                no_simultaneous_exams, monitor, split_rooms=split_rooms)
+        scheduled = seeded + scheduled
+        return {
+            "scheduled": scheduled,
+            "failed": failed,
+            "kept": kept,
+            "stale": stale,
+            "metrics": schedule_metrics(kept + scheduled, failed),
+        }
+
+    def what_if(self, start_date: date, end_date: date, variants, selected_course_ids=None,
+                bolum=None, **common):
+        """
+        Birden fazla parametre setini aynı anlık görüntü üzerinde kuru çalıştırır.
+        variants: [{"name": ..., "times_per_day": [...], "bekleme_suresi_minutes": ...,
+                    "start_date": ..., "end_date": ..., <plan() parametreleri>}, ...]
+        common: tüm senaryolarda ortak plan() parametreleri.
+        Dönüş: her senaryo için {"name", "params", "scheduled", "failed", "metrics"} ya da {"name", "error"}
+        """
+        # Arama kayıtları bir kez derlenir, tüm senaryolar paylaşır
+        snapshot = _CompactSnapshot(self.load_snapshot(selected_course_ids=selected_course_ids, bolum=bolum))
+        default_times = [t.strftime("%H:%M") for t in self.times_per_day]
+        default_bekleme = int(self.bekleme.total_seconds() // 60)
+
+        results = []
+        for i, variant in enumerate(variants):
+            params = {**common, **variant}
+            name = params.pop("name", f"Senaryo {i + 1}")
+            runner = ExamScheduler(
+                None,
+                times_per_day=params.pop("times_per_day", None) or default_times,
+                bekleme_suresi_minutes=params.pop("bekleme_suresi_minutes", default_bekleme),
+            )
+            s_date = params.pop("start_date", start_date)
+            e_date = params.pop("end_date", end_date)
+            try:
+                res = runner.plan(snapshot, s_date, e_date, **params)
+            except RuntimeError as e:
+                results.append({"name": name, "params": variant, "error": str(e)})
+                continue
+            results.append({
+                "name": name,
+                "params": variant,
+                "scheduled": res['scheduled'],
+                "failed": res['failed'],
+                "metrics": res['metrics'],
+            })
+        return results
+
+    def _place_courses(self, courses, rooms, date_list, durations, state, no_simultaneous_exams,
+                       monitor, split_rooms=True):
+        """
+        Dersleri sırayla ilk uygun (gün, saat) oturumuna yerleştirir. Derslikler oturum
+        bazında atanır: ders eklendikçe oturumdaki tüm tek derslikli sınavlar en az boş
+        koltukla yeniden dağıtılır (bkz. _PlacementState.best_fit_rooms). Sığmıyorsa ve
+        split_rooms açıksa ders kalan boş dersliklere bölünür (bkz. _split_rooms).
+        Derslikler sonradan değişebildiği için sınav kayıtları arama bitince üretilir.
+        Derslik takvimine göre hiçbir dersliği açık olmayan oturumlar aramadan önce
+        çıkarılır; açık kapasitesi dersi almaya yetmeyen oturumlar da erkenden elenir.
+        """
+        placements = []         # (ders, gün, saat, süre, derslik listesi) yerleştirme sırasıyla
         failed = []
-        student_schedule = {}   # öğrenci_no -> [(start, end)]
-        class_day_count = {}    # (sınıf, gün) -> count
-        room_index = 0          # round-robin için oda göstergesi
+        # Boş derslikler kapasiteye göre artan sırada taranır
+        rooms_by_cap = sorted(rooms, key=lambda r: r.kapasite)
+        # Profil sayaçları: denenen aday (gün, saat), çakışma kontrolü ve nedene göre ret
+        candidates = conflict_checks = n_split = n_moved = 0
+        rejected = {"simultaneous": 0, "capacity": 0, "instructor": 0, "student_conflict": 0,
+                    "class_day": 0, "student_day": 0}
+        student_limits = state.day_masks is not None
+
+        # Aday oturumlar bir kez hazırlanır; takvime göre tüm derslikleri kapalı olanlar aramaya girmez
+        slots = []
+        n_times = len(self.times_per_day)
+        for di, d in enumerate(date_list):
+            for ti, t in enumerate(self.times_per_day):
+                max_cap, total_cap = state.open_capacity(rooms, di * n_times + ti)
+                if total_cap:
+                    slots.append((d, t, _minute(d, t), max_cap, total_cap))
+        slots_blocked = len(date_list) * n_times - len(slots)
 
         for course in courses:
+            monitor.check()
             placed = False
-            dur = per_course_durations.get(course['id'], duration_default)
-            
-            # Her ders için farklı oda başlangıcı
-            start_room_index = room_index
-
-            for d in date_list:
-                for t in self.times_per_day:
-                    # aynı anda başka sınav varsa ve kısıt aktifse geç
-                    if no_simultaneous_exams and any(s['tarih'] == d and s['saat'] == t for s in scheduled):
-                        continue
+            dur = durations[course.id]
+            need = course.n_students
 
-                    for i in range(len(rooms)):
-                        room = rooms[(start_room_index + i) % len(rooms)]
-
-                        # aynı saat ve günde o oda dolu mu?
-                        if any(s['tarih'] == d and s['saat'] == t and s['derslik_id'] == room['id'] for s in scheduled):
-                            continue
-                        # Odanın kapasitesi yetersizse atla
-                        if room['kapasite'] < course['n_students']:
-                            continue
-
-                        # öğrenci çakışması kontrolü
-                        cand_start = datetime.combine(d, t)
-                        cand_end = cand_start + timedelta(minutes=dur)
-                        conflict = False
-                        for stu in course['students']:
-                            for (st, en) in student_schedule.get(stu, []):
-                                overlap = not (cand_end <= st or en <= cand_start)
-                                if overlap or 0 <= (cand_start - en).total_seconds()/60.0 < bekleme or \
-                                0 <= (st - cand_end).total_seconds()/60.0 < bekleme:
-                                    conflict = True
-                                    break
-                            if conflict:
-                                break
-                        if conflict:
-                            continue
-
-                        # aynı sınıftan aynı güne fazla sınav olmasın
-                        class_key = (course['sinif'], d)
-                        if class_day_count.get(class_key, 0) >= 2:
-                            continue
-
-                        # Planı oluştur
-                        rec = {
-                            "ders_id": course['id'],
-                            "ders_kod": course['kod'],
-                            "ders_ad": course['ad'],
-                            "tarih": d,
-                            "saat": t,
-                            "sure": dur,
-                            "derslik_id": room['id'],
-                            "derslik_ad": room['ad'],
-                            "kapasite": room['kapasite'],
-                            "n_students": course['n_students'],
-                            "sinif": course['sinif']
-                        }
-                        scheduled.append(rec)
-
-                        # öğrenci takvimi güncelle
-                        for stu in course['students']:
-                            student_schedule.setdefault(stu, []).append((cand_start, cand_end))
-
-                        class_day_count[class_key] = class_day_count.get(class_key, 0) + 1
-
-                        placed = True
-                        break  # bu oda seçildi
-                    if placed:
-                        break
-                if placed:
-                    break
+            for d, t, cand_start, max_cap, total_cap in slots:
+                candidates += 1
+                # Oturumda açık derslikler dersi (bölünerek bile) alamıyorsa erkenden ele
+                if need > (total_cap if split_rooms else max_cap):
+                    rejected["capacity"] += 1
+                    continue
+                # aynı anda başka sınav varsa ve kısıt aktifse geç
+                if no_simultaneous_exams and cand_start in state.slot_busy:
+                    rejected["simultaneous"] += 1
+                    continue
 
-            # Her dersten sonra oda indexini artır
-            room_index = (room_index + 1) % len(rooms)
+                # Oturumdaki sınavlarla birlikte tek derslikli atama mümkün mü? Yeterli boş
+                # derslik varsa evet; yoksa yeniden dağıtım denenir. Asıl atama kabulden sonra.
+                fits = (state.largest_free_room(cand_start, rooms_by_cap) >= need
+                        or state.best_fit_rooms(cand_start, course, rooms_by_cap) is not None)
+                if not fits and (not split_rooms or state.free_capacity(cand_start, rooms_by_cap) < need):
+                    rejected["capacity"] += 1
+                    continue
+
+                # Öğretim elemanı aynı anda iki sınavda olamaz (sabit zamanlı küme araması)
+                if state.instructor_conflict(course.hoca, cand_start, dur):
+                    rejected["instructor"] += 1
+                    continue
+
+                # Öğrenci ve sınıf kısıtları dersliğe bağlı değildir: oturum başına bir kez
+                conflict_checks += 1
+                if state.student_conflict(course.students, cand_start, cand_start + dur):
+                    rejected["student_conflict"] += 1
+                    continue
+
+                # aynı sınıftan aynı güne fazla sınav olmasın
+                if state.class_day_full(course.sinif, d):
+                    rejected["class_day"] += 1
+                    continue
+
+                # öğrenci başına günlük / art arda sınav sınırı
+                if student_limits and state.student_day_full(course.students, d, t):
+                    rejected["student_day"] += 1
+                    continue
+
+                if fits:
+                    assignment = state.best_fit_rooms(cand_start, course, rooms_by_cap)
+                    n_moved += state.reassign_rooms(cand_start, assignment)
+                    room = next(r for entry, r in assignment if entry is None)
+                    entry = state.add(course, d, t, dur, [room], movable=True)
+                    placements.append((course, d, t, dur, entry[1]))
+                else:
+                    chosen = self._split_rooms(course, rooms_by_cap, cand_start, state)
+                    if chosen is None:
+                        rejected["capacity"] += 1
+                        continue
+                    n_split += 1
+                    state.add(course, d, t, dur, chosen)
+                    placements.append((course, d, t, dur, chosen))
+                placed = True
+                break
 
             if not placed:
-                failed.append({"course": course, "reason": "Uygun slot / derslik bulunamadı"})
+                failed.append({"course": course.src, "reason": "Uygun slot / derslik bulunamadı"})
+                monitor.failed += 1
+            else:
+                monitor.placed += 1
+            monitor.emit(course=course.kod, ok=placed)
+
+        scheduled = []
+        for course, d, t, dur, chosen in placements:
+            scheduled.extend(_exam_records(course, chosen, d, t, dur))
+
+        if self._report is not None:
+            self._report.count("candidates_tried", candidates)
+            self._report.count("conflict_checks", conflict_checks)
+            for reason, n in rejected.items():
+                self._report.count(f"rejected_{reason}", n)
+            self._report.count("courses_placed", len(courses) - len(failed))
+            self._report.count("courses_split", n_split)
+            self._report.count("rooms_reassigned", n_moved)
+            self._report.count("slots_blocked", slots_blocked)
+            self._report.count("courses_failed", len(failed))
+        return scheduled, failed
+
+    @staticmethod
+    def _split_rooms(course, rooms_by_cap, cand_start, state):
+        """
+        Dersi bu oturumdaki boş dersliklere böler (best-fit): kalan öğrencileri tek başına
+        alabilen en küçük boş derslik varsa o seçilir ve biter; yoksa en büyük boş derslik
+        alınıp kalan azaltılır. Yetmezse None.
+        """
+        free = [r for r in rooms_by_cap if not state.room_taken(cand_start, r)]
+        caps = [r.kapasite for r in free]
+        remaining, chosen = course.n_students, []
+        while free:
+            k = bisect_left(caps, remaining)
+            if k < len(free):
+                chosen.append(free[k])
+                return chosen
+            big = free.pop()
+            caps.pop()
+            chosen.append(big)
+            remaining -= big.kapasite
+        return None
+
+    def _fix_existing(self, courses, rooms, date_list, durations, state, existing, other_courses):
+        """
+        Artımlı mod: sinavlar'daki mevcut sınavları sabit atama olarak state'e işler.
+        Seçim dışındaki derslerin sınavları koşulsuz korunur; seçili derslerin sınavları
+        hâlâ geçerliyse korunur. Dönüş: (korunan kayıtlar, silinecek sınavlar, yeniden planlanacak dersler)
+        """
+        rooms_by_id = {r.id: r for r in rooms}
+        date_set = set(date_list)
+        times = set(self.times_per_day)
+
+        # Seçim dışındaki dersler yalnızca kısıt olarak kullanılır
+        for course in other_courses:
+            for (d, t), exs in _group_by_slot(existing[course.id]):
+                state.add(course, d, t, exs[0]['sure'], [rooms_by_id.get(ex['derslik_id']) for ex in exs])
+
+        kept, stale, to_place = [], [], []
+        # Mevcut sınavlar kronolojik sırada denenir; sonradan çakışan ders yeniden planlanır
+        ordered = sorted((c for c in courses if c.id in existing),
+                         key=lambda c: (existing[c.id][0]['tarih'], existing[c.id][0]['saat']))
+        for course in ordered:
+            exs = existing[course.id]
+            # Bölünmüş sınavın parçaları aynı oturumdadır (id sırasıyla)
+            d, t, dur = exs[0]['tarih'], exs[0]['saat'], durations[course.id]
+            parts = [rooms_by_id.get(ex['derslik_id']) for ex in exs]
+            valid = (
+                all(ex['tarih'] == d and ex['saat'] == t and ex['sure'] == dur for ex in exs)
+                and d in date_set and t in times
+                and self._fits(course, parts, d, t, dur, state)
+            )
+            if valid:
+                for rec, ex in zip(_exam_records(course, parts, d, t, dur), exs):
+                    rec['sinav_id'] = ex['sinav_id']
+                    rec['fixed'] = True
+                    kept.append(rec)
+                state.add(course, d, t, dur, parts)
+            else:
+                stale.extend(exs)
+                to_place.append(course)
+
+        # Hiç planlanmamış (yeni ya da önceden başarısız) dersler; orijinal sıra korunur
+        pending = {c.id for c in to_place}
+        to_place = [c for c in courses if c.id in pending or c.id not in existing]
+        return kept, stale, to_place
+
+    def _fits(self, course, rooms, d, t, dur, state):
+        """
+        Dersin verilen gün/saat ve derslik(ler)de tüm kısıtları sağlayıp sağlamadığını döndürür.
+        Birden fazla derslik bölünmüş sınavdır: toplam kapasite yetmeli ve her parçaya öğrenci düşmelidir.
+        """
+        if not rooms or None in rooms or len({r.id for r in rooms}) != len(rooms):
+            return False
+        if len(rooms) > 1 and any(n == 0 for _, n in split_counts([r.kapasite for r in rooms], course.n_students)):
+            return False
+        if sum(r.kapasite for r in rooms) < course.n_students:
+            return False
+        cand_start = _minute(d, t)
+        if any(state.room_taken(cand_start, r) for r in rooms):
+            return False
+        if self.no_simultaneous and cand_start in state.slot_busy:
+            return False
+        if state.instructor_conflict(course.hoca, cand_start, dur):
+            return False
+        if state.student_conflict(course.students, cand_start, cand_start + dur):
+            return False
+        if state.day_masks is not None and state.student_day_full(course.students, d, t):
+            return False
+        return not state.class_day_full(course.sinif, d)
+
+    def _apply_seed(self, seed, courses, rooms, date_list, durations, state, align_dates=False):
+        """
+        Warm-start: tohum plandaki atamalardan hâlâ uygulanabilir olanları state'e işler.
+        Dönüş: (tohumdan gelen sınav kayıtları, aramaya kalan dersler)
+        align_dates: True ise tohumdaki farklı sınav günleri sırasıyla date_list'e eşlenir
+            (önceki dönemin takvimini yeni tarih aralığına taşımak için).
+        """
+        by_id = {c.id: c for c in courses}
+        by_kod = {c.kod: c for c in courses}
+        rooms_by_id = {r.id: r for r in rooms}
+        times = set(self.times_per_day)
+        date_set = set(date_list)
+        day_map = {}
+        if align_dates:
+            seed_days = sorted({s['tarih'] for s in seed})
+            day_map = dict(zip(seed_days, date_list))
+
+        # Ders başına tohum satırları; bölünmüş sınavın parçaları ilk satırın oturumundadır
+        rows_by_course, order = {}, []
+        for s in sorted(seed, key=lambda s: (s['tarih'], s['saat'])):
+            # Ders kodu dönemler arasında kalıcıdır; id yalnızca aynı dönemde güvenilir
+            course = by_kod.get(s.get('ders_kod')) or by_id.get(s.get('ders_id'))
+            if course is None:
+                continue
+            if course.id not in rows_by_course:
+                rows_by_course[course.id] = []
+                order.append(course)
+            first = rows_by_course[course.id][:1]
+            if not first or (first[0]['tarih'], first[0]['saat']) == (s['tarih'], s['saat']):
+                rows_by_course[course.id].append(s)
+
+        seeded, done = [], set()
+        for course in order:
+            rows = rows_by_course[course.id]
+            d = day_map.get(rows[0]['tarih'], rows[0]['tarih'])
+            t = rows[0]['saat']
+            dur = durations[course.id]
+            parts = [rooms_by_id.get(s.get('derslik_id')) for s in rows]
+            if d in date_set and t in times and self._fits(course, parts, d, t, dur, state):
+                seeded.extend(_exam_records(course, parts, d, t, dur))
+                state.add(course, d, t, dur, parts)
+                done.add(course.id)
+        return seeded, [c for c in courses if c.id not in done]
+
+    def load_seed_from_db(self, version_id=None):
+        """
+        Kayıtlı bir sürümün (None ise yayındaki planların) sınavlarını warm-start tohumu
+        olarak döndürür.
+        """
+        if version_id is not None:
+            source, params = "sinavlar s", (version_id,)
+            where = "WHERE s.surum_id=%s"
+        else:
+            source, params, where = "yayindaki_sinavlar s", (), ""
+        rows = self.db.execute(
+            f"""
+            SELECT s.ders_id, d.kod, s.tarih, s.saat, s.derslik_id
+            FROM {source}
+            JOIN dersler d ON d.id = s.ders_id
+            {where}
+            ORDER BY s.tarih, s.saat, s.id
+            """,
+            params, fetchall=True
+        )
+        return [{"ders_id": r[0], "ders_kod": r[1], "tarih": r[2], "saat": r[3], "derslik_id": r[4]}
+                for r in rows or []]
+
+    @staticmethod
+    def load_seed_from_excel(file_path):
+        """export_to_excel ile kaydedilmiş bir takvimi warm-start tohumu olarak okur."""
+        df = pd.read_excel(file_path)
+        required_cols = ["Ders ID", "Ders Kodu", "Tarih", "Saat", "Derslik ID"]
+        for c in required_cols:
+            if c not in df.columns:
+                raise ValueError(f"Excel'de '{c}' sütunu eksik!")
+        seed = []
+        for _, row in df.iterrows():
+            if pd.isna(row["Tarih"]) or pd.isna(row["Saat"]):
+                continue
+            seed.append({
+                "ders_id": int(row["Ders ID"]),
+                "ders_kod": str(row["Ders Kodu"]).strip(),
+                "tarih": pd.to_datetime(row["Tarih"]).date(),
+                "saat": time_from_str(str(row["Saat"]).strip()[:5]),
+                "derslik_id": int(row["Derslik ID"]) if pd.notna(row["Derslik ID"]) else None,
+            })
+        return seed
+
+    def _reset_schedule_tables(self, version_id):
+        """
+        Tam planlamada hedef sürümün eski sınavlarını siler (oturma ve gözetmen atamaları
+        cascade ile). Satır bazlı DELETE diğer sürümlere dokunmaz ve okuyucuları kilitlemez;
+        ogrenci_sinav yayın sırasında yenilenir.
+        """
+        self.db.execute("DELETE FROM sinavlar WHERE surum_id=%s", (version_id,))
+
+    def _adopt_copies(self, version_id, records):
+        """
+        Kaynak sürümden taslağa kopyalanan sınavların yeni id'lerini kayıtlara işler.
+        Bir sürümde (ders, gün, saat, derslik) tek satırdır; eşleme bunun üzerinden yapılır.
+        """
+        rows = self.db.execute(
+            "SELECT id, ders_id, tarih, saat, derslik_id FROM sinavlar WHERE surum_id=%s",
+            (version_id,), fetchall=True
+        ) or []
+        new_ids = {(cid, d, t, rid): sid for sid, cid, d, t, rid in rows}
+        for rec in records:
+            rec['sinav_id'] = new_ids[(rec['ders_id'], rec['tarih'], rec['saat'], rec['derslik_id'])]
+
+    def _drop_stale_exams(self, stale):
+        """Artımlı modda yeniden planlanan derslerin eski sınav ve oturma kayıtlarını siler."""
+        ids = [ex['sinav_id'] for ex in stale]
+        if not ids:
+            return
+        self.db.execute("DELETE FROM oturma WHERE sinav_id = ANY(%s)", (ids,))
+        self.db.execute("DELETE FROM sinavlar WHERE id = ANY(%s)", (ids,))
 
-        #  Veritabanına yaz 
+    def _insert_exams(self, scheduled, failed, version_id):
         sinav_id_map = {}  # ders_id -> sinav_id mapping
         for se in scheduled:
             try:
                 # Insert ve oluşturulan sinav_id'yi al
                 result = self.db.execute(
-                    "INSERT INTO sinavlar (ders_id, tarih, saat, sure, derslik_id) VALUES (%s,%s,%s,%s,%s) RETURNING id",
-                    (se['ders_id'], se['tarih'], se['saat'], se['sure'], se['derslik_id']),
+                    "INSERT INTO sinavlar (ders_id, tarih, saat, sure, derslik_id, surum_id) "
+                    "VALUES (%s,%s,%s,%s,%s,%s) RETURNING id",
+                    (se['ders_id'], se['tarih'], se['saat'], se['sure'], se['derslik_id'], version_id),
                     fetchone=True
                 )
                 if result:
@@ -188,40 +1169,28 @@ class ExamScheduler:
                     se['sinav_id'] = sinav_id  # scheduled listesine de ekle
             except Exception as e:
                 failed.append({"course": se, "reason": f"DB insert hatası: {e}"})
+        return sinav_id_map
 
-        # Oturma planlarını otomatik oluştur
-        seating_errors = []
-        for se in scheduled:
-            if 'sinav_id' in se:
-                try:
-                    self._create_seating_for_exam(se['sinav_id'], se['ders_id'], se['derslik_id'])
-                except Exception as e:
-                    seating_errors.append(f"{se['ders_kod']}: {e}")
-        
-        if seating_errors:
-            for err in seating_errors:
-                failed.append({"course": {"kod": "OTURMA"}, "reason": err})
-
-        return scheduled, failed
-
-    def _create_seating_for_exam(self, sinav_id: int, ders_id: int, derslik_id: int):
-        """Belirli bir sınav için oturma planı oluşturur."""
+    def _create_seating_for_exam(self, sinav_id: int, ders_id: int, derslik_id: int, offset=0, count=None):
+        """
+        Belirli bir sınav için oturma planı oluşturur. offset/count verilirse (bölünmüş sınav
+        parçası) numara sırasındaki öğrencilerin yalnızca o aralığı oturtulur.
+        """
         # Öğrencileri al
         studs = self.db.execute(
             "SELECT ogrenci_no FROM ogrenci_ders WHERE ders_id=%s ORDER BY ogrenci_no",
             (ders_id,), fetchall=True
         )
         students = [s[0] for s in studs] if studs else []
+        if count is not None:
+            students = students[offset:offset + count]
         
-        # Derslik bilgisini al
-        room = self.db.execute(
-            "SELECT enine_sira, boyuna_sira FROM derslikler WHERE id=%s",
-            (derslik_id,), fetchone=True
-        )
+        # Derslik bilgisi (referans önbelleğinden)
+        room = ref_cache.for_db(self.db).room(derslik_id)
         if not room:
             raise RuntimeError(f"Derslik bulunamadı (ID: {derslik_id})")
         
-        enine, boyuna = room
+        enine, boyuna = room["enine"], room["boyuna"]
         capacity = int(enine) * int(boyuna)
         
         if len(students) > capacity:
@@ -244,6 +1213,68 @@ class ExamScheduler:
             if idx >= len(students):
                 break
 
+    def _sync_seating_for_exam(self, sinav_id: int, ders_id: int, derslik_id: int):
+        """
+        Korunan bir sınavın oturma planını yerinde günceller: dersi bırakanların koltuğu
+        silinir, yeni kayıtlı öğrenciler boş koltuklara eklenir, diğerlerinin yeri değişmez.
+        """
+        rows = self.db.execute(
+            "SELECT ogrenci_no, sira, sutun FROM oturma WHERE sinav_id=%s",
+            (sinav_id,), fetchall=True
+        )
+        if not rows:
+            return self._create_seating_for_exam(sinav_id, ders_id, derslik_id)
+
+        studs = self.db.execute(
+            "SELECT ogrenci_no FROM ogrenci_ders WHERE ders_id=%s ORDER BY ogrenci_no",
+            (ders_id,), fetchall=True
+        )
+        students = [s[0] for s in studs] if studs else []
+        seats = {no: (sira, sutun) for no, sira, sutun in rows}
+        wanted = set(students)
+        dropped = [no for no in seats if no not in wanted]
+        added = [no for no in students if no not in seats]
+        if not dropped and not added:
+            return
+
+        room = ref_cache.for_db(self.db).room(derslik_id)
+        if not room:
+            raise RuntimeError(f"Derslik bulunamadı (ID: {derslik_id})")
+        enine, boyuna = int(room["enine"]), int(room["boyuna"])
+        if len(students) > enine * boyuna:
+            raise RuntimeError(f"Kapasite yetersiz: {len(students)} öğrenci, kapasite {enine * boyuna}")
+
+        if dropped:
+            self.db.execute(
+                "DELETE FROM oturma WHERE sinav_id=%s AND ogrenci_no = ANY(%s)",
+                (sinav_id, dropped)
+            )
+        taken = {seats[no] for no in seats if no in wanted}
+        free = ((r, c) for r in range(1, boyuna + 1) for c in range(1, enine + 1) if (r, c) not in taken)
+        for no in added:
+            r, c = next(free)
+            self.db.execute(
+                "INSERT INTO oturma (sinav_id, ogrenci_no, sira, sutun) VALUES (%s, %s, %s, %s)",
+                (sinav_id, no, r, c)
+            )
+
+    def assign_invigilators(self, scheduled, bolum=None, students_per_proctor=None):
+        """
+        Planlama sonrası aşama: her (sınav, derslik) kaydına gözetmen atar (bkz. invigilators),
+        atamaları toplu yazar ve kayıtlara "gozetmenler" (ad listesi) ekler.
+        Dönüş: invigilators.assign sonucu ve "staff" (gözetmen listesi).
+        """
+        staff, unavailable = invigilators.load_staff(self.db, bolum)
+        cache = ref_cache.for_db(self.db)
+        exams = [{**se, "hoca": (cache.course(se['ders_id']) or {}).get("hoca")} for se in scheduled]
+        result = invigilators.assign(exams, staff, unavailable, students_per_proctor=students_per_proctor)
+        invigilators.save_assignments(self.db, scheduled, result["assignments"])
+        names = {s["id"]: s["ad"] for s in staff}
+        for se, proctors in zip(scheduled, result["assignments"]):
+            se["gozetmenler"] = [names[g] for g in proctors]
+        result["staff"] = staff
+        return result
+
     def export_to_excel(self, scheduled_exams, filename="sinav_takvimi.xlsx", exam_type=None):
         rows = []
         for se in scheduled_exams:
@@ -251,15 +1282,11 @@ class ExamScheduler:
             saat_str = se["saat"].strftime("%H:%M") if hasattr(se["saat"], "strftime") else str(se["saat"])
 
             kapasite = se.get("kapasite")
-            if kapasite is None and hasattr(self, "db"):
+            if kapasite is None and self.db is not None:
                 try:
-                    cap_row = self.db.execute(
-                        "SELECT kapasite FROM derslikler WHERE id=%s",
-                        (se["derslik_id"],),
-                        fetchone=True
-                    )
-                    if cap_row:
-                        kapasite = cap_row[0]
+                    room = ref_cache.for_db(self.db).room(se["derslik_id"])
+                    if room:
+                        kapasite = room["kapasite"]
                 except Exception:
                     kapasite = None
 
@@ -276,6 +1303,8 @@ class ExamScheduler:
                 "Derslik Adı": se.get("derslik_ad", ""),
                 "Derslik Kapasitesi": kapasite if kapasite is not None else "",
             })
+            if "gozetmenler" in se:
+                rows[-1]["Gözetmenler"] = ", ".join(se["gozetmenler"])
 
         df = pd.DataFrame(rows)
         with pd.ExcelWriter(filename, engine="openpyxl", datetime_format="YYYY-MM-DD", date_format="YYYY-MM-DD") as writer:
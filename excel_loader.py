@@ -1,6 +1,7 @@
 # excel_loader.py
 import pandas as pd
 from connection import Database
+import ref_cache
 
 class ExcelLoader:
     def __init__(self, db: Database):
@@ -48,9 +49,36 @@ class ExcelLoader:
                 except Exception as e:
                     print(f"Hata ({ders_kodu}):", e)
 
+        ref_cache.for_db(self.db).invalidate("dersler")
         print("✅ Ders listesi başarıyla yüklendi.")
 
 
+    def load_gozetmenler(self, file_path, bolum):
+        """
+        Gözetmen listesi: "Ad Soyad" zorunlu, "En Fazla Görev" isteğe bağlı sütun.
+        Bölümün mevcut listesi yenisiyle değiştirilir (eski atamalar da silinir).
+        """
+        df = pd.read_excel(file_path)
+        if "Ad Soyad" not in df.columns:
+            raise ValueError("Excel'de 'Ad Soyad' sütunu eksik!")
+
+        rows = []
+        for _, row in df.iterrows():
+            ad = str(row["Ad Soyad"]).strip() if pd.notna(row["Ad Soyad"]) else ""
+            if not ad:
+                continue
+            limit = row.get("En Fazla Görev")
+            rows.append((ad, int(limit) if pd.notna(limit) else None))
+
+        self.db.execute("DELETE FROM gozetmenler WHERE bolum=%s", (bolum,))
+        if rows:
+            self.db.execute(
+                "INSERT INTO gozetmenler (bolum, ad, max_gorev) SELECT %s, * FROM unnest(%s::text[], %s::int[])",
+                (bolum, [r[0] for r in rows], [r[1] for r in rows])
+            )
+        print(f"✅ {len(rows)} gözetmen yüklendi.")
+        return len(rows)
+
     def load_ogrenciler(self, file_path):
         df = pd.read_excel(file_path)
         required_cols = ["Öğrenci No", "Ad Soyad", "Sınıf", "Ders"]
@@ -0,0 +1,235 @@
+# invigilators.py
+"""
+Gözetmen atama: planlanan her (sınav, derslik) kaydına gözetmen seçer.
+
+Aynı gün zaman aralıkları kesişen sınavlar bir "blok" oluşturur; bir gözetmen bir
+blokta en fazla bir dersliğe gidebilir (çift görev yok). Problem bir akış ağıdır:
+
+    kaynak -> gözetmen (kapasite: yük sınırı) -> blok (müsaitse, kapasite 1) -> hedef (blok ihtiyacı)
+
+Dengeli yük için sınır L kademeli artırılır (parametrik maksimum akış): her gözetmenin
+kapasitesi min(L, max_gorev) olur, akış önceki L'nin akışından artırılarak devam eder.
+İhtiyacın tamamını karşılayan en küçük L, en yüklü gözetmenin görev sayısını en aza indirir.
+Başlangıç akışı en az yüklü gözetmeni seçen açgözlü dolumdur; eksik kalan bloklar için
+artırıcı yollar (bir gözetmeni başka bloktan kaydırıp yerine boşta olanı koyma zinciri)
+genişlik öncelikli aranır.
+"""
+import math
+from collections import deque
+
+
+def proctors_needed(n_students, students_per_proctor=None):
+    """Derslik başına gözetmen sayısı; students_per_proctor verilmezse her dersliğe bir gözetmen."""
+    if not students_per_proctor:
+        return 1
+    return max(1, math.ceil((n_students or 0) / students_per_proctor))
+
+
+def _normalize(name):
+    return " ".join(str(name or "").split()).casefold()
+
+
+def _interval(exam):
+    """Sınavın gün içi [başlangıç, bitiş) dakikası."""
+    t = exam["saat"]
+    start = t.hour * 60 + t.minute
+    return start, start + exam["sure"]
+
+
+def time_blocks(exams):
+    """
+    Sınav indekslerini gün içinde zaman aralığı kesişenler aynı blokta olacak şekilde gruplar.
+    Dönüş: [(tarih, başlangıç dk, bitiş dk, [sınav indeksi, ...]), ...] kronolojik sırada.
+    """
+    order = sorted(range(len(exams)), key=lambda i: (exams[i]["tarih"], _interval(exams[i])))
+    blocks = []
+    for i in order:
+        d = exams[i]["tarih"]
+        start, end = _interval(exams[i])
+        if blocks and blocks[-1][0] == d and start < blocks[-1][2]:
+            last = blocks[-1]
+            last[2] = max(last[2], end)
+            last[3].append(i)
+        else:
+            blocks.append([d, start, end, [i]])
+    return [tuple(b) for b in blocks]
+
+
+def _available(blocked, d, start, end):
+    """blocked: [(tarih, başlangıç, bitiş)]; başlangıç/bitiş None ise gün boyu müsait değil."""
+    for bd, bas, bit in blocked:
+        if bd != d:
+            continue
+        lo = bas.hour * 60 + bas.minute if bas is not None else 0
+        hi = bit.hour * 60 + bit.minute if bit is not None else 1440
+        if lo < end and hi > start:
+            return False
+    return True
+
+
+def assign(exams, staff, unavailable=None, students_per_proctor=None):
+    """
+    exams: sınav kayıtları (tarih, saat, sure, n_students; isteğe bağlı hoca).
+    staff: [{"id", "ad", "max_gorev"}]; max_gorev None ise sınırsız.
+    unavailable: gözetmen id -> [(tarih, başlangıç, bitiş)] müsait olmadığı zamanlar.
+    Dönüş: {"assignments": [[gözetmen id, ...] her sınav için], "loads": {id: görev},
+            "max_load": en yüksek görev sayısı, "unfilled": [(sınav indeksi, eksik sayı)]}
+    """
+    unavailable = unavailable or {}
+    blocks = time_blocks(exams)
+    need = [proctors_needed(ex.get("n_students"), students_per_proctor) for ex in exams]
+    demand = [sum(need[i] for i in b[3]) for b in blocks]
+
+    n_staff = len(staff)
+    cap = [s.get("max_gorev") if s.get("max_gorev") is not None else len(blocks) for s in staff]
+    avail = [
+        [j for j in range(n_staff) if _available(unavailable.get(staff[j]["id"], ()), d, start, end)]
+        for d, start, end, _ in blocks
+    ]
+    assigned = [set() for _ in blocks]    # blok -> gözetmenler
+    where = [set() for _ in staff]        # gözetmen -> bloklar
+    load = [0] * n_staff
+
+    def augment(root, limit):
+        """root bloğuna bir gözetmen daha kazandıran artırıcı yol; bulunursa uygular."""
+        prev = {root: None}
+        queue = deque([root])
+        while queue:
+            x = queue.popleft()
+            for j in avail[x]:
+                if j in assigned[x]:
+                    continue
+                if load[j] < min(limit, cap[j]):
+                    assigned[x].add(j)
+                    where[j].add(x)
+                    load[j] += 1
+                    # Zinciri geri sar: x'e gelen her gözetmen bir üst bloğa kayar
+                    while prev[x] is not None:
+                        parent, k = prev[x]
+                        assigned[x].discard(k)
+                        where[k].discard(x)
+                        assigned[parent].add(k)
+                        where[k].add(parent)
+                        x = parent
+                    return True
+                for y in where[j]:
+                    if y not in prev:
+                        prev[y] = (x, j)
+                        queue.append(y)
+        return False
+
+    total = sum(demand)
+    limit = max(1, math.ceil(total / n_staff)) if n_staff else 0
+    max_limit = max(cap, default=0)
+    # Açgözlü başlangıç: her blokta en az yüklü müsait gözetmenler
+    for b in range(len(blocks)):
+        for j in sorted(avail[b], key=lambda j: (load[j], j)):
+            if len(assigned[b]) >= demand[b]:
+                break
+            if load[j] < min(limit, cap[j]):
+                assigned[b].add(j)
+                where[j].add(b)
+                load[j] += 1
+
+    while n_staff:
+        for b in range(len(blocks)):
+            while len(assigned[b]) < demand[b] and augment(b, limit):
+                pass
+        if all(len(assigned[b]) >= demand[b] for b in range(len(blocks))) or limit >= max_limit:
+            break
+        limit += 1
+
+    # Blok içinde dağıtım: önce dersin hocası kendi sınavına, kalanlar sırayla
+    assignments = [[] for _ in exams]
+    unfilled = []
+    for b, (_, _, _, idxs) in enumerate(blocks):
+        pool = sorted(assigned[b], key=lambda j: staff[j]["id"])
+        by_name = {_normalize(staff[j]["ad"]): j for j in pool}
+        for i in idxs:
+            j = by_name.get(_normalize(exams[i].get("hoca")))
+            if j is not None and j in pool:
+                assignments[i].append(staff[j]["id"])
+                pool.remove(j)
+        for i in idxs:
+            while len(assignments[i]) < need[i] and pool:
+                assignments[i].append(staff[pool.pop(0)]["id"])
+            if len(assignments[i]) < need[i]:
+                unfilled.append((i, need[i] - len(assignments[i])))
+
+    loads = {s["id"]: load[j] for j, s in enumerate(staff)}
+    return {
+        "assignments": assignments,
+        "loads": loads,
+        "max_load": max(load, default=0),
+        "unfilled": unfilled,
+    }
+
+
+def load_staff(db, bolum=None):
+    """gozetmenler ve gozetmen_takvim tablolarını okur: (gözetmenler, müsait olmama kayıtları)."""
+    q = "SELECT id, ad, max_gorev FROM gozetmenler"
+    params = ()
+    if bolum:
+        q += " WHERE bolum=%s"
+        params = (bolum,)
+    rows = db.execute(q + " ORDER BY id", params, fetchall=True) or []
+    staff = [{"id": r[0], "ad": r[1], "max_gorev": r[2]} for r in rows]
+    unavailable = {}
+    if staff:
+        for gid, d, bas, bit in db.execute(
+            "SELECT gozetmen_id, tarih, baslangic, bitis FROM gozetmen_takvim WHERE gozetmen_id = ANY(%s)",
+            ([s["id"] for s in staff],), fetchall=True
+        ) or []:
+            unavailable.setdefault(gid, []).append((d, bas, bit))
+    return staff, unavailable
+
+
+def save_assignments(db, exams, assignments):
+    """
+    Atamaları toplu yazar: ilgili sınavların eski kayıtları tek sorguda silinir,
+    yenileri unnest ile tek INSERT'te eklenir.
+    """
+    ids = [ex["sinav_id"] for ex in exams if ex.get("sinav_id") is not None]
+    if not ids:
+        return 0
+    db.execute("DELETE FROM gozetmen_atama WHERE sinav_id = ANY(%s)", (ids,))
+    sinav_ids, gozetmen_ids = [], []
+    for ex, proctors in zip(exams, assignments):
+        if ex.get("sinav_id") is None:
+            continue
+        for gid in proctors:
+            sinav_ids.append(ex["sinav_id"])
+            gozetmen_ids.append(gid)
+    if sinav_ids:
+        db.execute(
+            "INSERT INTO gozetmen_atama (sinav_id, gozetmen_id) SELECT * FROM unnest(%s::int[], %s::int[])",
+            (sinav_ids, gozetmen_ids)
+        )
+    return len(sinav_ids)
+
+
+def proctor_names(db, sinav_id):
+    """Bir sınav için atanmış gözetmenlerin adları."""
+    rows = db.execute(
+        """
+        SELECT g.ad FROM gozetmen_atama a
+        JOIN gozetmenler g ON g.id = a.gozetmen_id
+        WHERE a.sinav_id=%s ORDER BY g.ad
+        """,
+        (sinav_id,), fetchall=True
+    )
+    return [r[0] for r in rows or []]
+
+
+def summary(result, staff):
+    """Atama sonucunun kısa metin özeti (panel çıktısı için)."""
+    loads = list(result["loads"].values())
+    used = sum(1 for n in loads if n)
+    lines = [f"Gözetmen ataması: {sum(loads)} görev, {used}/{len(staff)} gözetmen, "
+             f"en yüksek yük {result['max_load']}, en düşük yük {min(loads) if loads else 0}"]
+    if result["unfilled"]:
+        missing = sum(n for _, n in result["unfilled"])
+        lines.append(f"⚠ {len(result['unfilled'])} derslikte toplam {missing} gözetmen eksik "
+                     "(müsaitlik / görev sınırı yetersiz)")
+    return lines
+
@@ -0,0 +1,441 @@
+# job_service.py
+"""
+Yerel planlama iş servisi (HTTP/JSON, yalnızca standart kütüphane).
+
+Planlama, oturma planı ve Excel dışa aktarma işleri kuyruğa alınır ve sınırlı sayıda
+işçi süreçte (ProcessPoolExecutor) çalıştırılır. Aynı bölümün işleri sırayla yürür:
+dağıtıcı, bölümü çalışan bir iş varken o bölümün sıradaki işini başlatmaz; işçi ayrıca
+schedule_versions.department_lock ile panel / komut satırından yazanlarla da sıraya girer.
+Her işçi sürecin kendi veritabanı bağlantısı vardır; yalnızca yerel PostgreSQL gerekir.
+
+Uç noktalar:
+    POST   /jobs        {"type": "schedule" | "seating" | "export", "bolum": ..., ...} -> 202 iş kaydı
+    GET    /jobs        işler (sonuçsuz)
+    GET    /jobs/<id>   durum (queued / running / done / failed / cancelled) ve sonuç
+    DELETE /jobs/<id>   kuyruktaki işi iptal eder (çalışan iş iptal edilemez; bkz. timeout)
+    GET    /health      işçi ve kuyruk durumu
+
+İş gövdeleri:
+    schedule: settings (run_scheduler ayarları; start_date / end_date dahil), commit, publish,
+              version_id (yeniden yazılacak taslak), version_name, excel_dir, seating_dir, timeout
+    seating:  version_id (yoksa bölümün yayındaki planı; exam_type ile seçilir), output_dir;
+              ya da tek sınav için sinav_id, assign (oturmayı yeniden yap), output_path (PDF)
+    export:   version_id / exam_type, path
+Çıktı yolları (excel_dir, seating_dir, output_dir, output_path, path) --output-root altında
+göreli olmalıdır; sonuçta mutlak yollar döner.
+
+Kullanım:
+    python job_service.py --config scheduler_config.example.json --workers 2 --port 8765
+İstemciler servis adresini EXAM_JOB_SERVICE ortam değişkeninden alır (varsayılan
+http://127.0.0.1:8765).
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import ref_cache
+import run_scheduler
+import schedule_quality
+import schedule_versions
+from connection import Database
+from exam_scheduler import ExamScheduler, SchedulingCancelled
+from seat_planner import SeatPlanner
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+JOB_TYPES = ("schedule", "seating", "export")
+# İstemcinin verdiği çıktı yolları; servis bunları output_root altına çözer
+OUTPUT_KEYS = ("excel_dir", "seating_dir", "output_dir", "output_path", "path")
+
+
+# --- İşçi süreç tarafı ---
+
+_worker_db = None
+
+
+def _db(db_config):
+    """İşçi sürecin (tek) bağlantısı; her işte referans önbelleği tazelenir."""
+    global _worker_db
+    if _worker_db is None:
+        db = Database(**db_config)
+        try:
+            db.connect()
+        except SystemExit:
+            raise RuntimeError("Veritabanına bağlanılamadı")
+        _worker_db = db
+    else:
+        # Dersler / derslikler işler arasında başka istemcilerce değişmiş olabilir
+        cache = ref_cache.for_db(_worker_db)
+        for table in ref_cache.TABLES:
+            cache.invalidate(table, notify=False)
+    return _worker_db
+
+
+def _version_for(db, p):
+    version_id = p.get("version_id") or schedule_versions.published_id(db, p["bolum"], p.get("exam_type"))
+    if version_id is None:
+        raise ValueError(f"{p['bolum']}: yayındaki takvim sürümü yok")
+    return version_id
+
+
+def _run_schedule(db, p):
+    return run_scheduler.run_department(
+        db, p["job"], dry_run=not p.get("commit"), publish=bool(p.get("publish")),
+        excel_dir=p.get("excel_dir"), seating_dir=p.get("seating_dir"), timeout=p.get("timeout"),
+        version_id=p.get("version_id"), version_name=p.get("version_name"))
+
+
+def _run_seating(db, p):
+    planner = SeatPlanner(db)
+    if p.get("sinav_id") is not None:
+        # Panelin tek sınav düğmeleri (oturma planı oluştur / PDF indir)
+        sinav_id = int(p["sinav_id"])
+        out = {"sinav_id": sinav_id}
+        if p.get("assign"):
+            out["n_students"] = len(planner.assign_seats(sinav_id))
+        if p.get("output_path"):
+            os.makedirs(os.path.dirname(p["output_path"]) or ".", exist_ok=True)
+            out["pdf"] = planner.export_pdf(sinav_id, p["output_path"])
+        return out
+
+    version_id = _version_for(db, p)
+    rows = db.execute(
+        """
+        SELECT s.id, d.kod FROM sinavlar s JOIN dersler d ON d.id = s.ders_id
+        WHERE s.surum_id=%s AND d.bolum=%s ORDER BY s.tarih, s.saat, s.id
+        """,
+        (version_id, p["bolum"]), fetchall=True
+    ) or []
+    out_dir = p.get("output_dir") or "."
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for sinav_id, kod in rows:
+        path = os.path.join(out_dir, f"{run_scheduler._slug(p['bolum'])}_{run_scheduler._slug(kod)}_{sinav_id}.pdf")
+        planner.export_pdf(sinav_id, path)
+        paths.append(path)
+    return {"version_id": version_id, "seating_pdfs": len(paths), "output_dir": out_dir}
+
+
+def _run_export(db, p):
+    version_id = _version_for(db, p)
+    scheduled, _ = schedule_quality.from_db(db, version_id=version_id)
+    own = {c["id"] for c in ref_cache.for_db(db).courses(p["bolum"])}
+    scheduled = [se for se in scheduled if se["ders_id"] in own]
+    path = p.get("path") or f"sinav_takvimi_{run_scheduler._slug(p['bolum'])}.xlsx"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fname = ExamScheduler(db).export_to_excel(scheduled, filename=path, exam_type=p.get("exam_type"))
+    return {"version_id": version_id, "excel": fname, "n_exams": len(scheduled)}
+
+
+_HANDLERS = {"schedule": _run_schedule, "seating": _run_seating, "export": _run_export}
+
+
+def run_job(db_config, kind, payload):
+    """İşçi süreçte çalışan giriş noktası; JSON'a yazılabilir sonuç döndürür."""
+    db = _db(db_config)
+    if kind == "schedule" and not payload.get("commit"):
+        return _HANDLERS[kind](db, payload)
+    with schedule_versions.department_lock(db, payload["bolum"], timeout=payload.get("timeout")):
+        return _HANDLERS[kind](db, payload)
+
+
+# --- Servis tarafı ---
+
+class JobService:
+    """
+    İş kuyruğu ve dağıtıcı. jobs: id -> iş kaydı (son keep iş tutulur).
+    Bölüm başına en fazla bir iş çalışır; toplam eşzamanlılık workers ile sınırlıdır.
+    İşler dosyaları yalnızca output_root altına yazar (bkz. output_path).
+    """
+    def __init__(self, db_config, defaults=None, workers=2, keep=200, output_root=None):
+        self.db_config = db_config
+        self.output_root = os.path.realpath(output_root or os.getcwd())
+        self.defaults = defaults if defaults is not None else dict(run_scheduler.DEFAULTS)
+        self.workers = workers
+        self.keep = keep
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.jobs = OrderedDict()
+        self.pending = deque()
+        self.busy = set()
+        self._lock = threading.RLock()
+        self._seq = 0
+
+    def submit(self, body):
+        """İşi doğrulayıp kuyruğa ekler; geçersizse run_scheduler.ConfigError fırlatır."""
+        kind = body.get("type")
+        if kind not in JOB_TYPES:
+            raise run_scheduler.ConfigError(f"Bilinmeyen iş türü: {kind!r} ({', '.join(JOB_TYPES)})")
+        bolum = body.get("bolum")
+        if not bolum:
+            raise run_scheduler.ConfigError("Bölüm adı ('bolum') eksik")
+        payload = dict(body)
+        for key in OUTPUT_KEYS:
+            if payload.get(key) is not None:
+                payload[key] = self.output_path(key, payload[key])
+        if kind == "seating" and payload.get("sinav_id") is None and payload.get("output_dir") is None:
+            payload["output_dir"] = self.output_root
+        if kind == "export" and payload.get("path") is None:
+            payload["path"] = os.path.join(self.output_root, f"sinav_takvimi_{run_scheduler._slug(bolum)}.xlsx")
+        if kind == "schedule":
+            payload["job"] = run_scheduler.build_job({**body.get("settings", {}), "bolum": bolum}, self.defaults)
+        with self._lock:
+            self._seq += 1
+            job = {"id": self._seq, "type": kind, "bolum": bolum, "status": "queued",
+                   "submitted": _now(), "started": None, "finished": None,
+                   "result": None, "error": None, "payload": payload}
+            self.jobs[job["id"]] = job
+            self.pending.append(job)
+            self._dispatch()
+            return job
+
+    def output_path(self, key, value):
+        """
+        İstemcinin verdiği çıktı yolunu output_root altında mutlak yola çevirir. Mutlak yollar,
+        '..' içerenler ve kökün dışına (ör. sembolik bağla) çıkanlar ConfigError ile reddedilir.
+        """
+        if not isinstance(value, str) or not value.strip():
+            raise run_scheduler.ConfigError(f"'{key}' geçerli bir yol değil")
+        if (os.path.isabs(value) or os.path.splitdrive(value)[0]
+                or ".." in value.replace("\\", "/").split("/")):
+            raise run_scheduler.ConfigError(f"'{key}' çıktı dizini altında göreli bir yol olmalı: {value!r}")
+        full = os.path.realpath(os.path.join(self.output_root, value))
+        if os.path.commonpath([full, self.output_root]) != self.output_root:
+            raise run_scheduler.ConfigError(f"'{key}' çıktı dizininin dışına çıkıyor: {value!r}")
+        return full
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] != "queued":
+                return False
+            self.pending.remove(job)
+            job["status"], job["finished"] = "cancelled", _now()
+            return True
+
+    def _dispatch(self):
+        """Bölümü boşta olan ilk kuyruk işlerini işçi sınırına kadar başlatır (sıra korunur)."""
+        with self._lock:
+            for job in list(self.pending):
+                if len(self.busy) >= self.workers:
+                    break
+                # Hemen biten işin geri çağrısı bu döngüye yeniden girebilir: durumu tekrar kontrol et
+                if job["status"] != "queued" or job["bolum"] in self.busy:
+                    continue
+                self.pending.remove(job)
+                self.busy.add(job["bolum"])
+                job["status"], job["started"] = "running", _now()
+                future = self.pool.submit(run_job, self.db_config, job["type"], job["payload"])
+                future.add_done_callback(partial(self._finished, job))
+
+    def _finished(self, job, future):
+        with self._lock:
+            error = future.exception()
+            if error is None:
+                job["status"], job["result"] = "done", future.result()
+            elif isinstance(error, SchedulingCancelled):
+                job["status"], job["error"] = "cancelled", str(error)
+            else:
+                # Süre sınırı (TimeoutError) dahil: hatanın kendi mesajı
+                job["status"], job["error"] = "failed", str(error)
+            job["finished"] = _now()
+            self.busy.discard(job["bolum"])
+            self._trim()
+            self._dispatch()
+
+    def _trim(self):
+        done = [i for i, j in self.jobs.items() if j["status"] in ("done", "failed", "cancelled")]
+        for i in done[:max(0, len(self.jobs) - self.keep)]:
+            del self.jobs[i]
+
+    def describe(self, job, with_result=True):
+        out = {k: v for k, v in job.items() if k not in ("payload", "result")}
+        if with_result:
+            out["result"] = job["result"]
+        return out
+
+    def health(self):
+        with self._lock:
+            return {"workers": self.workers, "running": sorted(self.busy), "queued": len(self.pending)}
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "ExamJobService/1"
+
+    def log_message(self, fmt, *args):
+        if not self.server.quiet:
+            sys.stderr.write(f"{self.address_string()} {fmt % args}\n")
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _job_id(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "jobs" and parts[1].isdigit():
+            return int(parts[1])
+        return None
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            return self._send(200, service.health())
+        if self.path == "/jobs":
+            with service._lock:
+                return self._send(200, [service.describe(j, with_result=False) for j in service.jobs.values()])
+        # _trim geri çağrı iş parçacığında jobs'u değiştirir: arama da kilit altında
+        with service._lock:
+            job = service.jobs.get(self._job_id())
+            if job is None:
+                return self._send(404, {"error": "İş bulunamadı"})
+            return self._send(200, service.describe(job))
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            return self._send(404, {"error": "Bilinmeyen adres"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            job = self.server.service.submit(body)
+        except (ValueError, AttributeError) as e:
+            # ConfigError da ValueError'dır
+            return self._send(400, {"error": str(e)})
+        self._send(202, self.server.service.describe(job))
+
+    def do_DELETE(self):
+        job_id = self._job_id()
+        if job_id not in self.server.service.jobs:
+            return self._send(404, {"error": "İş bulunamadı"})
+        if not self.server.service.cancel(job_id):
+            return self._send(409, {"error": "Yalnızca kuyruktaki iş iptal edilebilir"})
+        self._send(200, {"id": job_id, "status": "cancelled"})
+
+
+def serve(service, host="127.0.0.1", port=8765, quiet=False):
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.service = service
+    server.quiet = quiet
+    return server
+
+
+# --- İstemci tarafı (paneller) ---
+
+def service_url():
+    return os.environ.get("EXAM_JOB_SERVICE", DEFAULT_URL).rstrip("/")
+
+
+def _request(method, path, body=None, url=None, timeout=10):
+    data = json.dumps(body, default=str).encode("utf-8") if body is not None else None
+    req = urllib.request.Request((url or service_url()) + path, data=data, method=method,
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read()).get("error")
+        except ValueError:
+            message = None
+        raise RuntimeError(message or f"İş servisi hatası: HTTP {e.code}")
+
+
+def is_available(url=None, timeout=0.5):
+    """Servis çalışıyor mu (panel, yoksa planlamayı kendi içinde yürütür)."""
+    try:
+        _request("GET", "/health", url=url, timeout=timeout)
+        return True
+    except (OSError, RuntimeError, ValueError):
+        return False
+
+
+def submit(body, url=None):
+    return _request("POST", "/jobs", body, url=url)
+
+
+def status(job_id, url=None):
+    return _request("GET", f"/jobs/{job_id}", url=url)
+
+
+def cancel(job_id, url=None):
+    return _request("DELETE", f"/jobs/{job_id}", url=url)
+
+
+def wait(job_id, progress=None, cancel_token=None, url=None, poll=0.5):
+    """
+    İş bitene kadar durumu yoklar ve sonucu döndürür. progress her durum değişiminde
+    {"phase": durum} ile çağrılır. cancel_token iptal edilirse kuyruktaki iş iptal edilir ve
+    SchedulingCancelled fırlatılır; çalışmaya başlamış iş serviste tamamlanır.
+    """
+    last = None
+    while True:
+        job = status(job_id, url=url)
+        if job["status"] != last:
+            last = job["status"]
+            if progress is not None:
+                progress({"phase": last})
+        if last == "done":
+            return job["result"]
+        if last == "failed":
+            raise RuntimeError(job["error"])
+        if last == "cancelled":
+            raise SchedulingCancelled("İş iptal edildi.")
+        if cancel_token is not None and cancel_token.cancelled:
+            try:
+                cancel(job_id, url=url)
+            except RuntimeError:
+                pass
+            raise SchedulingCancelled("İş iptal edildi; çalışmaya başladıysa serviste tamamlanır.")
+        time.sleep(poll)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Yerel sınav planlama iş servisi (HTTP/JSON)")
+    parser.add_argument("--config", help="run_scheduler yapılandırması (database ve defaults kullanılır)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=max(1, min(4, (os.cpu_count() or 2) - 1)),
+                        help="işçi süreç sayısı")
+    parser.add_argument("--output-root", default=os.getcwd(),
+                        help="işlerin dosya yazabileceği dizin; istemci yolları buna göre görelidir")
+    parser.add_argument("--quiet", action="store_true", help="istek kayıtlarını yazma")
+    args = parser.parse_args(argv)
+    try:
+        db_config, defaults, _ = run_scheduler.read_config(args.config)
+    except run_scheduler.ConfigError as e:
+        print(f"Hata: {e}", file=sys.stderr)
+        return run_scheduler.EXIT_CONFIG
+
+    service = JobService(db_config, defaults, workers=args.workers, output_root=args.output_root)
+    server = serve(service, args.host, args.port, quiet=args.quiet)
+    print(f"İş servisi http://{args.host}:{args.port} adresinde, {args.workers} işçi", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
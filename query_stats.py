@@ -0,0 +1,169 @@
+# query_stats.py
+"""
+Database.execute için isteğe bağlı sorgu istatistikleri.
+
+Sorgular normalize edilmiş metne göre gruplanır (sabitler '?' olur, boşluklar
+sadeleşir); her grup için çağrı sayısı, toplam/maksimum süre, satır sayısı ve
+gecikme histogramı tutulur. Ayrıca çağıran fonksiyon başına round-trip sayısı
+ve eşik üstündeki sorgular için yavaş sorgu kaydı vardır.
+
+Etkinleştirme:
+    db.enable_stats(slow_ms=200)                 # uygulama içinden
+    EXAM_DB_STATS=200 EXAM_DB_STATS_FILE=q.json  # ortam değişkeniyle (çıkışta dosyaya yazar)
+
+Rapor:
+    python query_stats.py q.json --top 15 --by total
+"""
+import argparse
+import json
+import re
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+
+# Histogram kova üst sınırları (ms); son kova sınırsız
+BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+# Yalnızca yer tutuculardan oluşan liste, tek elemanlısı dahil: IN (%s) ile IN (%s, %s) aynı kalıp
+_LIST_RE = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Aynı kalıptaki sorguları tek anahtarda toplamak için metni sadeleştirir."""
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    elif not isinstance(query, str):
+        query = str(query)
+    q = _STRING_RE.sub("?", query)
+    q = _NUMBER_RE.sub("?", q)
+    q = _LIST_RE.sub("(...)", q)
+    return _SPACE_RE.sub(" ", q).strip()
+
+
+def _bucket_labels():
+    labels, prev = [], 0
+    for b in BUCKETS_MS:
+        labels.append(f"{prev}-{b}ms")
+        prev = b
+    labels.append(f">{prev}ms")
+    return labels
+
+
+class QueryStats:
+    """
+    entries: normalize sorgu -> {"calls", "total_ms", "max_ms", "rows", "errors", "hist"}
+    callers: "dosya:fonksiyon" -> round-trip sayısı
+    slow: eşik üstü sorgular (en yeni max_slow kayıt)
+    """
+    def __init__(self, slow_ms=200, slow_log_path=None, max_slow=200):
+        self.slow_ms = slow_ms
+        self.slow_log_path = slow_log_path
+        self.entries = {}
+        self.callers = {}
+        self.slow = deque(maxlen=max_slow)
+        self._lock = threading.Lock()
+
+    def record(self, query, elapsed_ms, rows, caller, error=None):
+        key = normalize_query(query)
+        idx = len(BUCKETS_MS)
+        for i, b in enumerate(BUCKETS_MS):
+            if elapsed_ms <= b:
+                idx = i
+                break
+        with self._lock:
+            e = self.entries.get(key)
+            if e is None:
+                e = self.entries[key] = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0,
+                                         "errors": 0, "hist": [0] * (len(BUCKETS_MS) + 1)}
+            e["calls"] += 1
+            e["total_ms"] += elapsed_ms
+            e["max_ms"] = max(e["max_ms"], elapsed_ms)
+            e["rows"] += max(rows, 0)
+            e["hist"][idx] += 1
+            if error is not None:
+                e["errors"] += 1
+            self.callers[caller] = self.callers.get(caller, 0) + 1
+
+            if self.slow_ms is not None and elapsed_ms >= self.slow_ms:
+                item = {"at": datetime.now().isoformat(timespec="seconds"), "ms": round(elapsed_ms, 2),
+                        "rows": rows, "caller": caller, "query": key}
+                self.slow.append(item)
+                if self.slow_log_path:
+                    with open(self.slow_log_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    def reset(self):
+        with self._lock:
+            self.entries.clear()
+            self.callers.clear()
+            self.slow.clear()
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "slow_ms": self.slow_ms,
+                "buckets_ms": list(BUCKETS_MS),
+                "queries": {k: {**v, "hist": list(v["hist"])} for k, v in self.entries.items()},
+                "callers": dict(self.callers),
+                "slow": list(self.slow),
+            }
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=2, ensure_ascii=False)
+
+    def format(self, top=10, by="total"):
+        return format_report(self.as_dict(), top=top, by=by)
+
+
+SORT_KEYS = {
+    "total": lambda v: v["total_ms"],
+    "calls": lambda v: v["calls"],
+    "max": lambda v: v["max_ms"],
+    "rows": lambda v: v["rows"],
+}
+
+
+def format_report(data, top=10, by="total"):
+    """as_dict() çıktısını en çok maliyetli sorgular / çağıranlar tablosuna çevirir."""
+    queries = data["queries"]
+    lines = [f"Sorgu istatistikleri: {len(queries)} kalıp, "
+             f"{sum(v['calls'] for v in queries.values())} çağrı "
+             f"(sıralama: {by})"]
+    lines.append("  çağrı   toplam ms    maks ms     satır  sorgu")
+    ranked = sorted(queries.items(), key=lambda kv: SORT_KEYS[by](kv[1]), reverse=True)
+    for q, v in ranked[:top]:
+        err = f" [{v['errors']} hata]" if v["errors"] else ""
+        text = q if len(q) <= 90 else q[:87] + "..."
+        lines.append(f"  {v['calls']:>6} {v['total_ms']:>11.1f} {v['max_ms']:>10.1f} {v['rows']:>9}  {text}{err}")
+
+    lines.append("Çağıran başına round-trip:")
+    for caller, n in sorted(data["callers"].items(), key=lambda kv: kv[1], reverse=True)[:top]:
+        lines.append(f"  {n:>6}  {caller}")
+
+    if data["slow"]:
+        lines.append(f"Yavaş sorgular (>= {data['slow_ms']} ms), son {min(top, len(data['slow']))}:")
+        for s in data["slow"][-top:]:
+            lines.append(f"  {s['ms']:>9.1f} ms  {s['caller']}  {s['query'][:80]}")
+
+    # En çok çağrılan kalıbın gecikme dağılımı
+    if ranked:
+        q, v = ranked[0]
+        hist = ", ".join(f"{lab}: {n}" for lab, n in zip(_bucket_labels(), v["hist"]) if n)
+        lines.append(f"İlk sıradaki sorgunun gecikme dağılımı: {hist}")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kaydedilmiş sorgu istatistiklerini raporlar")
+    parser.add_argument("path", help="EXAM_DB_STATS_FILE / QueryStats.dump ile yazılan JSON")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--by", choices=sorted(SORT_KEYS), default="total")
+    args = parser.parse_args()
+    with open(args.path, encoding="utf-8") as f:
+        print("\n".join(format_report(json.load(f), top=args.top, by=args.by)))
+    sys.exit(0)
@@ -0,0 +1,128 @@
+# ref_cache.py
+"""
+Az değişen referans tabloları (derslikler, dersler) için süreç içi önbellek.
+
+Her tablo ilk erişimde tek sorguyla okunur ve bölüme göre indekslenir; sonraki
+okumalar veritabanına gitmez. Yazma yapan kod (derslik ekleme/silme, ders
+yükleyicileri) invalidate() çağırır; tablo sürümü artar ve bir sonraki okuma
+yeniden yükler.
+
+Birden fazla istemci çalışıyorsa EXAM_REF_CACHE_LISTEN=1 ile PostgreSQL
+LISTEN/NOTIFY kanalı açılır: invalidate() diğer istemcilere NOTIFY gönderir,
+onlar da her okumadan önce bildirimleri kontrol eder.
+"""
+import os
+import select
+import threading
+
+CHANNEL = "exam_ref_cache"
+TABLES = ("derslikler", "dersler")
+
+
+class ReferenceCache:
+    def __init__(self, db):
+        self.db = db
+        self.version = {t: 0 for t in TABLES}
+        self._rooms = None       # id -> derslik kaydı
+        self._courses = None     # id -> ders kaydı
+        self._lock = threading.RLock()
+        self._listen_conn = None
+
+    # --- LISTEN/NOTIFY ---
+    def listen(self):
+        """Diğer istemcilerin invalidate bildirimlerini almak için ayrı bir bağlantı açar."""
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+        conn = psycopg2.connect(**self.db.config)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        conn.cursor().execute(f"LISTEN {CHANNEL}")
+        self._listen_conn = conn
+
+    def poll(self):
+        """Bekleyen bildirimleri okuyup ilgili tabloları geçersiz kılar (bloklamaz)."""
+        conn = self._listen_conn
+        if conn is None:
+            return
+        if select.select([conn], [], [], 0) == ([], [], []):
+            return
+        conn.poll()
+        own_pid = self.db.conn.get_backend_pid() if getattr(self.db, "conn", None) else None
+        while conn.notifies:
+            n = conn.notifies.pop(0)
+            # Kendi gönderdiğimiz bildirim: invalidate() zaten uyguladı
+            if n.payload in TABLES and n.pid != own_pid:
+                self._drop(n.payload)
+
+    # --- Geçersiz kılma ---
+    def _drop(self, table):
+        with self._lock:
+            self.version[table] += 1
+            if table == "derslikler":
+                self._rooms = None
+            else:
+                self._courses = None
+
+    def invalidate(self, table, notify=True):
+        """Yazma sonrası çağrılır; dinleyen diğer istemcilere de haber verilir."""
+        self._drop(table)
+        if notify and self._listen_conn is not None:
+            # NOTIFY commit ile birlikte gönderilir (execute sorgu sonrası commit eder)
+            self.db.execute("SELECT pg_notify(%s, %s)", (CHANNEL, table))
+
+    # --- Okuma ---
+    def _room_map(self):
+        self.poll()
+        with self._lock:
+            if self._rooms is None:
+                rows = self.db.execute(
+                    "SELECT id, bolum, kod, ad, kapasite, enine_sira, boyuna_sira, sira_yapisi FROM derslikler ORDER BY id",
+                    fetchall=True
+                )
+                self._rooms = {
+                    r[0]: {"id": r[0], "bolum": r[1], "kod": r[2], "ad": r[3], "kapasite": r[4],
+                           "enine": r[5], "boyuna": r[6], "sira": r[7]}
+                    for r in rows or []
+                }
+            return self._rooms
+
+    def _course_map(self):
+        self.poll()
+        with self._lock:
+            if self._courses is None:
+                rows = self.db.execute(
+                    "SELECT id, bolum, kod, ad, hoca, sinif, zorunlu FROM dersler ORDER BY id",
+                    fetchall=True
+                )
+                self._courses = {
+                    r[0]: {"id": r[0], "bolum": r[1], "kod": r[2], "ad": r[3], "hoca": r[4],
+                           "sinif": r[5], "zorunlu": r[6]}
+                    for r in rows or []
+                }
+            return self._courses
+
+    def rooms(self, bolum=None):
+        """Derslik kayıtları (id sırasıyla); bolum verilirse yalnızca o bölümünkiler."""
+        return [r for r in self._room_map().values() if bolum is None or r["bolum"] == bolum]
+
+    def room(self, room_id):
+        return self._room_map().get(int(room_id))
+
+    def course(self, course_id):
+        return self._course_map().get(int(course_id))
+
+    def courses(self, bolum=None):
+        """Ders kayıtları (sınıf, kod sırasıyla); bolum verilirse yalnızca o bölümünkiler."""
+        rows = [c for c in self._course_map().values() if bolum is None or c["bolum"] == bolum]
+        rows.sort(key=lambda c: (c["sinif"] or 0, c["kod"]))
+        return rows
+
+
+def for_db(db):
+    """db nesnesine bağlı (tek) önbelleği döndürür; yoksa oluşturur."""
+    cache = getattr(db, "_ref_cache", None)
+    if cache is None:
+        cache = ReferenceCache(db)
+        if os.environ.get("EXAM_REF_CACHE_LISTEN") and hasattr(db, "config"):
+            cache.listen()
+        db._ref_cache = cache
+    return cache
@@ -0,0 +1,74 @@
+# run_report.py
+from contextlib import contextmanager
+from time import perf_counter
+
+
+class RunReport:
+    """
+    Bir planlama çalıştırmasının faz bazlı ölçümleri.
+    phases: faz adı -> {"wall", "round_trips", "rows_written", "calls"}
+    counters: arama sayaçları (denenen aday, çakışma kontrolü, nedene göre ret ...)
+    """
+    def __init__(self, db=None):
+        self.db = db
+        self.phases = {}
+        self.counters = {}
+        self.started = perf_counter()
+        self._total_wall = None      # from_dict ile kurulan raporda kaydedilmiş toplam süre
+
+    @property
+    def total_wall(self):
+        """Toplam süre: yeniden kurulan raporda kaydedilen değer, canlı raporda başlangıçtan beri geçen."""
+        if self._total_wall is not None:
+            return self._total_wall
+        return perf_counter() - self.started
+
+    def _db_counts(self):
+        if self.db is None:
+            return 0, 0
+        return getattr(self.db, "round_trips", 0), getattr(self.db, "rows_written", 0)
+
+    @contextmanager
+    def phase(self, name):
+        t0 = perf_counter()
+        rt0, rw0 = self._db_counts()
+        try:
+            yield
+        finally:
+            rt1, rw1 = self._db_counts()
+            p = self.phases.setdefault(name, {"wall": 0.0, "round_trips": 0, "rows_written": 0, "calls": 0})
+            p["wall"] += perf_counter() - t0
+            p["round_trips"] += rt1 - rt0
+            p["rows_written"] += rw1 - rw0
+            p["calls"] += 1
+
+    def count(self, key, n=1):
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    @classmethod
+    def from_dict(cls, d):
+        """as_dict() çıktısından (ör. iş servisinden gelen JSON) raporu yeniden kurar."""
+        report = cls()
+        report.phases = {k: dict(v) for k, v in d.get("phases", {}).items()}
+        report.counters = dict(d.get("counters", {}))
+        report._total_wall = d.get("total_wall")
+        return report
+
+    def as_dict(self):
+        return {
+            "total_wall": round(self.total_wall, 4),
+            "phases": {k: {**v, "wall": round(v["wall"], 4)} for k, v in self.phases.items()},
+            "counters": dict(self.counters),
+        }
+
+    def format(self):
+        """Raporu ayar diyaloğunda / konsolda gösterilecek satırlara çevirir."""
+        lines = ["Faz                      süre (sn)   sorgu    yazılan"]
+        for name, p in self.phases.items():
+            lines.append(f"{name:<24} {p['wall']:>9.3f} {p['round_trips']:>7} {p['rows_written']:>10}")
+        lines.append(f"{'toplam':<24} {self.total_wall:>9.3f}")
+        if self.counters:
+            lines.append("Arama sayaçları:")
+            for key in sorted(self.counters):
+                lines.append(f"  {key}: {self.counters[key]}")
+        return lines
@@ -1,30 +1,372 @@
 # run_scheduler.py
-from exam_scheduler import ExamScheduler
+"""
+Sınav planlamasının komut satırı (GUI'siz) girişi: gece sunucuda toplu çalıştırma için.
+
+Yapılandırma dosyasındaki (JSON) her bölüm için sırayla ExamScheduler çalıştırılır;
+istenirse gözetmen ataması, yayınlama, Excel ve oturma planı PDF'leri üretilir. Sonuçlar
+ve faz süreleri (RunReport) JSON olarak stdout'a ya da --output dosyasına yazılır,
+ilerleme stderr'e gider.
+
+Kullanım:
+    python run_scheduler.py takvim.json --dry-run
+    python run_scheduler.py takvim.json --commit --publish --excel-dir out --seating-dir out/pdf
+    python run_scheduler.py takvim.json --commit --departments "Bilgisayar Mühendisliği" --output sonuc.json
+
+Yapılandırma (bkz. scheduler_config.example.json):
+    {"database": {...Database argümanları...},
+     "defaults": {...aşağıdaki ayarlar...},
+     "departments": [{"bolum": "...", ...bölüme özel ayarlar...}, ...]}
+Ayarlar: start_date, end_date (YYYY-MM-DD), times_per_day, duration_default,
+bekleme_suresi_minutes, skip_weekends, excluded_weekdays, excluded_dates, no_simultaneous_exams,
+max_exams_per_student_day, max_consecutive_exams, split_rooms, incremental, warm_start,
+exam_type, proctors, students_per_proctor, courses (ders kodları; yoksa bölümün tüm dersleri),
+per_course_durations (ders kodu -> dk), seed_excel (warm-start tohumu olarak önceki takvim).
+Veritabanı ayarları EXAM_DB_HOST, EXAM_DB_NAME, EXAM_DB_USER, EXAM_DB_PASSWORD, EXAM_DB_PORT
+ortam değişkenleriyle ezilebilir.
+
+Çıkış kodları: 0 tüm dersler planlandı, 1 en az bir ders planlanamadı, 2 yapılandırma /
+kullanım hatası, 3 veritabanı ya da çalışma hatası (zaman aşımı dahil).
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+from contextlib import nullcontext, redirect_stdout
+from datetime import date, datetime
+from time import perf_counter
+
+import invigilators
+import ref_cache
+import schedule_versions
 from connection import Database
-from datetime import date
+from exam_scheduler import ExamScheduler, CancelToken, SchedulingCancelled, time_from_str
+from seat_planner import SeatPlanner
+
+EXIT_OK, EXIT_PARTIAL, EXIT_CONFIG, EXIT_ERROR = 0, 1, 2, 3
+
+DEFAULTS = {
+    "times_per_day": ["09:00", "13:30", "17:00"],
+    "duration_default": 75,
+    "bekleme_suresi_minutes": 15,
+    "skip_weekends": True,
+    "excluded_weekdays": [],
+    "excluded_dates": [],
+    "no_simultaneous_exams": False,
+    "max_exams_per_student_day": None,
+    "max_consecutive_exams": None,
+    "split_rooms": True,
+    "incremental": False,
+    "warm_start": False,
+    "exam_type": "Final",
+    "proctors": True,
+    "students_per_proctor": None,
+    "courses": None,
+    "per_course_durations": {},
+    "seed_excel": None,
+}
+
+_DB_ENV = {"host": "EXAM_DB_HOST", "database": "EXAM_DB_NAME", "user": "EXAM_DB_USER",
+           "password": "EXAM_DB_PASSWORD", "port": "EXAM_DB_PORT"}
+
+
+class ConfigError(ValueError):
+    """Yapılandırma dosyası ya da bölüm ayarları geçersiz."""
+
+
+def read_config(path=None):
+    """
+    Yapılandırma dosyasını okur: (veritabanı ayarları, ortak ayarlar, bölüm girdileri).
+    path None ise yalnızca varsayılanlar ve EXAM_DB_* ortam değişkenleri kullanılır.
+    """
+    cfg = {}
+    if path:
+        try:
+            with open(path, encoding="utf-8") as f:
+                cfg = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ConfigError(f"Yapılandırma okunamadı: {e}")
+    db_config = dict(cfg.get("database", {}))
+    for key, env in _DB_ENV.items():
+        if os.environ.get(env):
+            db_config[key] = int(os.environ[env]) if key == "port" else os.environ[env]
+    return db_config, {**DEFAULTS, **cfg.get("defaults", {})}, cfg.get("departments") or []
+
+
+def build_job(entry, base):
+    """Bir bölüm girdisini (ad ya da ayar sözlüğü) ortak ayarlarla birleştirir ve doğrular."""
+    job = {**base, **({"bolum": entry} if isinstance(entry, str) else entry)}
+    bolum = job.get("bolum")
+    if not bolum:
+        raise ConfigError("Bölüm adı ('bolum') eksik")
+    unknown = set(job) - set(DEFAULTS) - {"bolum", "start_date", "end_date"}
+    if unknown:
+        raise ConfigError(f"{bolum}: bilinmeyen ayar(lar): {', '.join(sorted(unknown))}")
+    try:
+        job["start_date"] = date.fromisoformat(str(job["start_date"]))
+        job["end_date"] = date.fromisoformat(str(job["end_date"]))
+        job["excluded_dates"] = [date.fromisoformat(str(x)) for x in job["excluded_dates"]]
+        for t in job["times_per_day"]:
+            time_from_str(t)
+    except KeyError as e:
+        raise ConfigError(f"{bolum}: '{e.args[0]}' ayarı eksik")
+    except (TypeError, ValueError) as e:
+        raise ConfigError(f"{bolum}: geçersiz tarih/saat: {e}")
+    if job["end_date"] < job["start_date"]:
+        raise ConfigError(f"{bolum}: end_date, start_date'ten önce")
+    return job
+
+
+def load_config(path):
+    """Yapılandırmayı okur ve doğrular: (veritabanı ayarları, [bölüm işi, ...])."""
+    db_config, base, departments = read_config(path)
+    if not departments:
+        raise ConfigError("'departments' listesi boş")
+    return db_config, [build_job(d, base) for d in departments]
+
+
+def _slug(text):
+    return re.sub(r"\W+", "_", text).strip("_") or "bolum"
+
+
+def _course_ids(db, job):
+    """Bölümün seçili ders id'leri ve ders kodu -> süre eşlemesinin id'li hali."""
+    by_code = {c["kod"]: c["id"] for c in ref_cache.for_db(db).courses(job["bolum"])}
+    codes = job["courses"] if job["courses"] is not None else list(by_code)
+    missing = [k for k in list(codes) + list(job["per_course_durations"]) if k not in by_code]
+    if missing:
+        raise ConfigError(f"{job['bolum']}: bilinmeyen ders kodu: {', '.join(sorted(set(missing)))}")
+    if not codes:
+        raise ConfigError(f"{job['bolum']}: planlanacak ders yok")
+    durations = {by_code[k]: int(v) for k, v in job["per_course_durations"].items()}
+    return [by_code[k] for k in codes], durations
+
+
+def _exam_json(se):
+    out = {
+        "ders_id": se["ders_id"], "ders_kod": se["ders_kod"], "ders_ad": se.get("ders_ad"),
+        "tarih": se["tarih"].isoformat(), "saat": se["saat"].strftime("%H:%M"), "sure": se["sure"],
+        "derslik_id": se["derslik_id"], "derslik_ad": se.get("derslik_ad"),
+        "kapasite": se.get("kapasite"), "sinif": se.get("sinif"),
+        "n_students": se.get("n_students", 0),
+    }
+    for key in ("sinav_id", "parca", "parca_sayisi", "fixed", "gozetmenler"):
+        if key in se:
+            out[key] = se[key]
+    return out
+
+
+def _failed_json(f):
+    c = f.get("course")
+    kod = (c.get("kod") or c.get("ders_kod")) if isinstance(c, dict) else str(c)
+    return {"kod": kod, "reason": f.get("reason")}
+
+
+def run_department(db, job, dry_run=True, publish=False, excel_dir=None, seating_dir=None,
+                   timeout=None, log=None, version_id=None, version_name=None):
+    """
+    Tek bölümü planlar. dry_run değilse plan yeni bir taslak sürüme (version_name) ya da
+    verilen taslağa (version_id) yazılır, publish ile yayına alınır.
+    Dönüş: JSON'a yazılacak sonuç sözlüğü ("status": ok / partial). timeout aşılırsa TimeoutError.
+    """
+    bolum = job["bolum"]
+    selected, durations = _course_ids(db, job)
+    scheduler = ExamScheduler(db, times_per_day=job["times_per_day"],
+                              bekleme_suresi_minutes=job["bekleme_suresi_minutes"],
+                              no_simultaneous_exams=job["no_simultaneous_exams"],
+                              version_id=version_id)
+    source = version_id or schedule_versions.published_id(db, bolum, job["exam_type"])
+    # Excel tohumu önceki döneme aittir: günleri yeni aralığa eşle
+    seed, align = None, False
+    if job["seed_excel"]:
+        seed, align = ExamScheduler.load_seed_from_excel(job["seed_excel"]), True
+    elif job["warm_start"] and not job["incremental"] and source is not None:
+        seed = scheduler.load_seed_from_db(source)
+
+    last_phase = None
+
+    def progress(event):
+        nonlocal last_phase
+        if log is not None and event.get("phase") != last_phase:
+            last_phase = event.get("phase")
+            log(f"[{bolum}] {last_phase} ({event.get('elapsed', 0):.1f} sn)")
+
+    token = CancelToken()
+    timer = threading.Timer(timeout, token.cancel) if timeout else None
+    if timer is not None:
+        timer.daemon = True
+        timer.start()
+    try:
+        scheduled, failed, report = scheduler.schedule(
+            job["start_date"], job["end_date"],
+            selected_course_ids=selected,
+            duration_default=job["duration_default"],
+            per_course_durations=durations,
+            bolum=bolum,
+            skip_weekends=job["skip_weekends"],
+            excluded_weekdays=job["excluded_weekdays"],
+            excluded_dates=job["excluded_dates"],
+            no_simultaneous_exams=job["no_simultaneous_exams"],
+            incremental=job["incremental"],
+            seed=seed,
+            seed_align_dates=align,
+            dry_run=dry_run,
+            progress=progress,
+            cancel_token=token,
+            with_report=True,
+            max_exams_per_student_day=job["max_exams_per_student_day"],
+            max_consecutive_exams=job["max_consecutive_exams"],
+            split_rooms=job["split_rooms"],
+            exam_type=job["exam_type"],
+            version_name=version_name,
+        )
+    except SchedulingCancelled as e:
+        # Belirteci yalnızca süre sınırı tetikler
+        raise TimeoutError(f"{bolum}: {timeout} sn içinde bitmedi, planlama iptal edildi") from e
+    finally:
+        if timer is not None:
+            timer.cancel()
+
+    result = {"bolum": bolum, "version_id": scheduler.last_version_id, "published": False}
+    if not dry_run and job["proctors"] and scheduled:
+        with report.phase("invigilators"):
+            proctors = scheduler.assign_invigilators(scheduled, bolum=bolum,
+                                                     students_per_proctor=job["students_per_proctor"])
+        result["proctors"] = {"staff": len(proctors["staff"]), "max_load": proctors["max_load"],
+                              "unfilled": sum(n for _, n in proctors["unfilled"]),
+                              "summary": invigilators.summary(proctors, proctors["staff"])
+                              if proctors["staff"] else []}
+    if not dry_run and publish:
+        with report.phase("publish"):
+            changed = schedule_versions.publish(db, scheduler.last_version_id)
+            schedule_versions.refresh_ogrenci_sinav(db, scheduler.last_version_id, changed)
+        result["published"] = True
+        result["changed_courses"] = len(changed)
+    if excel_dir and scheduled:
+        os.makedirs(excel_dir, exist_ok=True)
+        with report.phase("excel_export"):
+            result["excel"] = scheduler.export_to_excel(
+                scheduled, filename=os.path.join(excel_dir, f"sinav_takvimi_{_slug(bolum)}.xlsx"),
+                exam_type=job["exam_type"])
+    if seating_dir and not dry_run and scheduled:
+        os.makedirs(seating_dir, exist_ok=True)
+        planner = SeatPlanner(db)
+        pdfs = []
+        with report.phase("seating_pdf"):
+            for se in scheduled:
+                if "sinav_id" in se:
+                    path = os.path.join(seating_dir, f"{_slug(bolum)}_{_slug(se['ders_kod'])}_{se['sinav_id']}.pdf")
+                    planner.export_pdf(se["sinav_id"], path)
+                    pdfs.append(path)
+        result["seating_pdfs"] = len(pdfs)
+
+    result.update({
+        "status": "partial" if failed else "ok",
+        "n_courses": len({se["ders_id"] for se in scheduled}),
+        "n_exams": len(scheduled),
+        "scheduled": [_exam_json(se) for se in scheduled],
+        "failed": [_failed_json(f) for f in failed],
+        "timings": report.as_dict(),
+    })
+    return result
+
+
+def _run_jobs(args, out, log):
+    """main() gövdesi: bölümleri sırayla çalıştırır, sonuçları out'a ekler, çıkış kodunu döndürür."""
+    exit_code = EXIT_OK
+    db = None
+    try:
+        db_config, jobs = load_config(args.config)
+        if args.departments:
+            unknown = set(args.departments) - {j["bolum"] for j in jobs}
+            if unknown:
+                raise ConfigError(f"Yapılandırmada olmayan bölüm: {', '.join(sorted(unknown))}")
+            jobs = [j for j in jobs if j["bolum"] in args.departments]
+        db = Database(**db_config)
+        try:
+            db.connect()
+        except SystemExit:
+            raise RuntimeError("Veritabanına bağlanılamadı")
+
+        for job in jobs:
+            log(f"[{job['bolum']}] başlıyor")
+            t0 = perf_counter()
+            try:
+                # Yazan çalıştırmalar aynı bölümü yazan panel / iş servisiyle sıraya girer
+                lock = (schedule_versions.department_lock(db, job["bolum"], timeout=args.timeout)
+                        if args.commit else nullcontext())
+                with lock:
+                    res = run_department(db, job, dry_run=not args.commit, publish=args.publish,
+                                         excel_dir=args.excel_dir, seating_dir=args.seating_dir,
+                                         timeout=args.timeout, log=log)
+                code = EXIT_PARTIAL if res["failed"] else EXIT_OK
+            except ConfigError as e:
+                res, code = {"bolum": job["bolum"], "status": "config_error", "error": str(e)}, EXIT_CONFIG
+            except TimeoutError as e:
+                res, code = {"bolum": job["bolum"], "status": "timeout", "error": str(e)}, EXIT_ERROR
+            except Exception as e:
+                res, code = {"bolum": job["bolum"], "status": "error", "error": str(e)}, EXIT_ERROR
+            res["wall"] = round(perf_counter() - t0, 3)
+            out["departments"].append(res)
+            exit_code = max(exit_code, code)
+            log(f"[{job['bolum']}] {res['status']}: {res.get('n_courses', 0)} ders planlandı, "
+                f"{len(res.get('failed', []))} başarısız ({res['wall']:.1f} sn)"
+                + (f" — {res['error']}" if "error" in res else ""))
+            if code >= EXIT_CONFIG and args.fail_fast:
+                break
+    except ConfigError as e:
+        out["error"], exit_code = str(e), EXIT_CONFIG
+    except Exception as e:
+        out["error"], exit_code = str(e), EXIT_ERROR
+    finally:
+        if db is not None and db.conn is not None:
+            db.close()
+    return exit_code
+
 
-db = Database(host="localhost", database="exam_schedule_db", user="postgres", password="thisisapassword")
-db.connect()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sınav programını komut satırından oluşturur (toplu çalıştırma)")
+    parser.add_argument("config", help="JSON yapılandırma dosyası")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--dry-run", action="store_true", help="yalnızca planla, veritabanına yazma (varsayılan)")
+    mode.add_argument("--commit", action="store_true", help="planı yeni bir taslak sürüme yaz")
+    parser.add_argument("--publish", action="store_true", help="--commit ile: yazılan sürümü yayına al")
+    parser.add_argument("--departments", nargs="+", help="yalnızca bu bölümler (varsayılan: hepsi)")
+    parser.add_argument("--excel-dir", help="bölüm başına Excel takviminin yazılacağı dizin")
+    parser.add_argument("--seating-dir", help="--commit ile: oturma planı PDF'lerinin yazılacağı dizin")
+    parser.add_argument("--timeout", type=float,
+                        help="bölüm başına süre sınırı (sn); kilit beklemesine ve planlamaya ayrı ayrı uygulanır")
+    parser.add_argument("--fail-fast", action="store_true", help="ilk hatalı bölümde dur")
+    parser.add_argument("--output", help="JSON sonucun yazılacağı dosya (varsayılan: stdout)")
+    parser.add_argument("--quiet", action="store_true", help="stderr'e ilerleme yazma")
+    args = parser.parse_args(argv)
+    if args.publish and not args.commit:
+        parser.error("--publish yalnızca --commit ile kullanılabilir")
 
-scheduler = ExamScheduler(db,
-                          times_per_day=["09:00","13:30","17:00"],
-                          bekleme_suresi_minutes=15,
-                          no_simultaneous_exams=False)
+    def log(msg):
+        if not args.quiet:
+            print(msg, file=sys.stderr)
 
-start = date(2025, 6, 1)
-end = date(2025, 6, 14)
-scheduled, failed = scheduler.schedule(start, end, duration_minutes=75, bolum=None,
-                                       skip_weekends=True, excluded_dates=None,
-                                       no_simultaneous_exams=False)
+    started = perf_counter()
+    out = {"mode": "commit" if args.commit else "dry-run", "config": args.config,
+           "started": datetime.now().isoformat(timespec="seconds"), "departments": []}
+    # Kütüphanelerin stdout'a yazdıkları (bağlantı mesajı vb.) JSON sonuca karışmasın
+    with redirect_stdout(sys.stderr):
+        exit_code = _run_jobs(args, out, log)
 
-print("Planlanan sınav sayısı:", len(scheduled))
-print("Planlanamayan ders sayısı:", len(failed))
-for f in failed:
-    print("FAILED:", f["course"]["kod"] if "course" in f and "kod" in f["course"] else f, "->", f["reason"])
+    out["exit_code"] = exit_code
+    out["wall"] = round(perf_counter() - started, 3)
+    text = json.dumps(out, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if "error" in out:
+        log(f"Hata: {out['error']}")
+    return exit_code
 
-# Excel export
-if scheduled:
-    fname = scheduler.export_to_excel(scheduled, filename="outputs/exam_schedule.xlsx")
-    print("Excel çıktı:", fname)
 
-db.close()
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+# schedule_quality.py
+"""
+Sınav takviminin kalite göstergeleri.
+
+Kayıtlar (ogrenci_ders) CSR biçiminde (bkz. enrollment_snapshot) tutulur; her öğrenci-sınav
+çifti tek bir numpy olay dizisine açılır ve göstergeler öğrenci/zaman sıralı bu dizi
+üzerinde vektörel hesaplanır:
+    - öğrenci başına günlük sınav sayısı dağılımı,
+    - art arda sınavlar (aynı gün, aralarında back_to_back_minutes veya daha az),
+    - öğrenci başına en kısa ara dağılımı ve çakışmalar,
+    - oturum başına derslik doluluğu, sınıf-gün yükü,
+    - en çok etkilenen öğrenciler.
+
+Girdi herhangi bir scheduled listesi (ExamScheduler.schedule / plan çıktısı) ya da
+from_db() ile okunan kayıtlı sinavlar olabilir.
+"""
+import numpy as np
+import pandas as pd
+
+import enrollment_snapshot
+from exam_scheduler import split_counts
+
+# En kısa ara dağılımının kova sınırları (saat); son kova sınırsız
+GAP_BUCKETS_H = (1, 3, 12, 24, 48)
+
+
+def _gap_labels():
+    labels, prev = [], 0
+    for b in GAP_BUCKETS_H:
+        labels.append(f"{prev}-{b} sa")
+        prev = b
+    labels.append(f">{prev} sa")
+    return labels
+
+
+def enrollment_from_courses(courses):
+    """load_snapshot() / synthetic.to_snapshot() ders listesinden CSR kayıt görüntüsü."""
+    rows = sorted((c["id"], s) for c in courses for s in c["students"])
+    return enrollment_snapshot.EnrollmentSnapshot.build(rows)
+
+
+def compute(scheduled, enrollment, back_to_back_minutes=60, top=20):
+    """
+    scheduled: sınav kayıtları (ders_id, tarih, saat, sure; doluluk için n_students, kapasite, sinif).
+    enrollment: EnrollmentSnapshot (ya da course_ids / offsets / indices / students dizileri olan nesne).
+    Bölünmüş sınavın parçaları aynı oturumda olduğundan öğrenci takvimi ders başına ilk kayıttan kurulur.
+    """
+    first = {}
+    for se in scheduled:
+        first.setdefault(se["ders_id"], se)
+    exams = list(first.values())
+    n_exams = len(exams)
+
+    course_ids = np.fromiter((se["ders_id"] for se in exams), dtype=np.int64, count=n_exams)
+    day_ord = np.fromiter((se["tarih"].toordinal() for se in exams), dtype=np.int64, count=n_exams)
+    starts = day_ord * 1440 + np.fromiter((se["saat"].hour * 60 + se["saat"].minute for se in exams),
+                                          dtype=np.int64, count=n_exams)
+    ends = starts + np.fromiter((se["sure"] for se in exams), dtype=np.int64, count=n_exams)
+
+    # Ders -> CSR aralığı (course_ids sıralıdır)
+    cids = np.asarray(enrollment.course_ids, dtype=np.int64)
+    offsets = np.asarray(enrollment.offsets, dtype=np.int64)
+    if len(cids):
+        pos = np.minimum(np.searchsorted(cids, course_ids), len(cids) - 1)
+        found = cids[pos] == course_ids
+        lo = np.where(found, offsets[pos], 0)
+        lengths = np.where(found, offsets[pos + 1], 0) - lo
+    else:
+        lo = lengths = np.zeros(n_exams, dtype=np.int64)
+
+    # Öğrenci-sınav olayları
+    total = int(lengths.sum())
+    ev_exam = np.repeat(np.arange(n_exams), lengths)
+    within = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    stu = np.asarray(enrollment.indices)[np.repeat(lo, lengths) + within].astype(np.int64)
+    order = np.lexsort((starts[ev_exam], stu))
+    stu, ev_exam = stu[order], ev_exam[order]
+    ev_start, ev_end, ev_day = starts[ev_exam], ends[ev_exam], day_ord[ev_exam]
+
+    n_codes = int(stu.max()) + 1 if total else 0
+    has_exam = np.zeros(n_codes, dtype=bool)
+    has_exam[stu] = True
+
+    # Öğrenci-gün sınav sayıları
+    if total:
+        first_day = int(day_ord.min())
+        n_days = int(day_ord.max()) - first_day + 1
+        keys, per_day = np.unique(stu * n_days + (ev_day - first_day), return_counts=True)
+        max_per_day = np.zeros(n_codes, dtype=np.int64)
+        np.maximum.at(max_per_day, keys // n_days, per_day)
+        extra_per_day = np.zeros(n_codes, dtype=np.int64)
+        np.add.at(extra_per_day, keys // n_days, per_day - 1)
+    else:
+        per_day = max_per_day = extra_per_day = np.zeros(0, dtype=np.int64)
+    day_hist = np.bincount(per_day) if len(per_day) else np.zeros(1, dtype=np.int64)
+
+    # Ardışık sınav çiftleri (aynı öğrenci)
+    same = stu[1:] == stu[:-1]
+    gap = ev_start[1:] - ev_end[:-1]
+    overlap = same & (gap < 0)
+    b2b = same & ~overlap & (ev_day[1:] == ev_day[:-1]) & (gap <= back_to_back_minutes)
+    b2b_count = np.bincount(stu[1:][b2b], minlength=n_codes)
+    conflict_count = np.bincount(stu[1:][overlap], minlength=n_codes)
+
+    min_gap = np.full(n_codes, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(min_gap, stu[1:][same], gap[same])
+    has_gap = min_gap != np.iinfo(np.int64).max
+    gap_hours = min_gap[has_gap & (min_gap >= 0)] / 60.0
+    gap_hist = np.bincount(np.searchsorted(np.array(GAP_BUCKETS_H), gap_hours, side="right"),
+                           minlength=len(GAP_BUCKETS_H) + 1)
+
+    # En çok etkilenenler: çakışma > art arda > aynı güne düşen fazladan sınav
+    score = conflict_count * 5 + b2b_count * 2 + extra_per_day
+    worst = np.argsort(-score, kind="stable")[:top]
+    worst = worst[score[worst] > 0]
+    numbers = enrollment.students
+    worst_rows = [{
+        "ogrenci_no": str(numbers[k]) if len(numbers) > k else str(k),
+        "skor": int(score[k]),
+        "en_yogun_gun": int(max_per_day[k]),
+        "art_arda": int(b2b_count[k]),
+        "cakisma": int(conflict_count[k]),
+        "en_kisa_ara_dk": int(min_gap[k]) if has_gap[k] else None,
+    } for k in worst]
+
+    return {
+        "n_exams": n_exams,
+        "n_students": int(has_exam.sum()),
+        "exams_per_day_hist": {int(n): int(c) for n, c in enumerate(day_hist) if n and c},
+        "max_exams_per_day": int(max_per_day.max()) if len(max_per_day) else 0,
+        "students_multi_exam_days": int((max_per_day >= 2).sum()),
+        "back_to_back": int(b2b.sum()),
+        "students_back_to_back": int((b2b_count > 0).sum()),
+        "conflicts": int(overlap.sum()),
+        "min_gap_hist": dict(zip(_gap_labels(), (int(c) for c in gap_hist))),
+        "room_utilization": room_utilization(scheduled),
+        "class_day_load": class_day_load(exams),
+        "worst_students": worst_rows,
+    }
+
+
+def room_utilization(scheduled):
+    """Oturum başına kullanılan dersliklerin doluluğu (öğrenci / kapasite)."""
+    slots = {}
+    for se in scheduled:
+        row = slots.setdefault((se["tarih"], se["saat"]), {"tarih": se["tarih"], "saat": se["saat"],
+                                                           "derslik": 0, "ogrenci": 0, "kapasite": 0})
+        row["derslik"] += 1
+        row["ogrenci"] += se.get("n_students") or 0
+        row["kapasite"] += se.get("kapasite") or 0
+    rows = [slots[k] for k in sorted(slots)]
+    for row in rows:
+        row["oran"] = round(row["ogrenci"] / row["kapasite"], 3) if row["kapasite"] else 0.0
+    return rows
+
+
+def class_day_load(exams):
+    """Sınıf (yıl) ve gün başına sınav sayısı."""
+    counts = {}
+    for se in exams:
+        key = (se.get("sinif") or 0, se["tarih"])
+        counts[key] = counts.get(key, 0) + 1
+    return [{"sinif": k[0], "tarih": k[1], "sinav": n} for k, n in sorted(counts.items())]
+
+
+def load_enrollment(db, cache_dir="default"):
+    """Kayıt görüntüsü: önbellek açıksa diskteki CSR kopyası, değilse tablo bir kez akıtılır."""
+    if cache_dir == "default":
+        cache_dir = enrollment_snapshot.default_cache_dir(db)
+    if cache_dir:
+        return enrollment_snapshot.load_or_build(db, cache_dir)
+    return enrollment_snapshot.EnrollmentSnapshot.build(
+        db.stream("SELECT ders_id, ogrenci_no FROM ogrenci_ders ORDER BY ders_id, ogrenci_no"))
+
+
+def from_db(db, cache_dir="default", version_id=None):
+    """
+    Kayıtlı bir takvim sürümünü (None ise yayındaki planları) ve kayıt görüntüsünü okur:
+    (scheduled, enrollment). Bölünmüş sınav parçalarının öğrenci sayıları split_counts
+    kuralıyla hesaplanır.
+    """
+    enrollment = load_enrollment(db, cache_dir)
+    if version_id is not None:
+        source, where, params = "sinavlar s", "WHERE s.surum_id=%s", (version_id,)
+    else:
+        source, where, params = "yayindaki_sinavlar s", "", ()
+    rows = db.execute(
+        f"""
+        SELECT s.id, s.ders_id, d.kod, d.ad, d.sinif, s.tarih, s.saat, s.sure, s.derslik_id, l.ad, l.kapasite
+        FROM {source}
+        JOIN dersler d ON d.id = s.ders_id
+        LEFT JOIN derslikler l ON l.id = s.derslik_id
+        {where}
+        ORDER BY s.tarih, s.saat, s.id
+        """,
+        params, fetchall=True
+    ) or []
+    scheduled = [{"sinav_id": r[0], "ders_id": r[1], "ders_kod": r[2], "ders_ad": r[3], "sinif": r[4],
+                  "tarih": r[5], "saat": r[6], "sure": r[7], "derslik_id": r[8], "derslik_ad": r[9],
+                  "kapasite": r[10]} for r in rows]
+    groups = {}
+    for se in scheduled:
+        groups.setdefault((se["ders_id"], se["tarih"], se["saat"]), []).append(se)
+    for (cid, _, _), parts in groups.items():
+        n = len(enrollment.students_of(cid))
+        for se, (_, count) in zip(parts, split_counts([p["kapasite"] or 0 for p in parts], n)):
+            se["n_students"] = count if len(parts) > 1 else n
+    return scheduled, enrollment
+
+
+def format_report(m):
+    """compute() çıktısının panelde gösterilecek özet satırları."""
+    lines = [f"Kalite raporu: {m['n_exams']} sınav, {m['n_students']} öğrenci"]
+    hist = ", ".join(f"{n} sınav: {c}" for n, c in sorted(m["exams_per_day_hist"].items()))
+    lines.append(f"  Öğrenci-gün dağılımı: {hist or '-'} (en fazla {m['max_exams_per_day']})")
+    lines.append(f"  Aynı gün birden fazla sınavı olan öğrenci: {m['students_multi_exam_days']}")
+    lines.append(f"  Art arda sınav: {m['back_to_back']} ({m['students_back_to_back']} öğrenci), "
+                 f"çakışma: {m['conflicts']}")
+    lines.append("  En kısa ara: " + ", ".join(f"{k}: {v}" for k, v in m["min_gap_hist"].items()))
+    util = [r["oran"] for r in m["room_utilization"]]
+    if util:
+        lines.append(f"  Oturum doluluğu: ort. {sum(util) / len(util):.2f}, en düşük {min(util):.2f}, "
+                     f"en yüksek {max(util):.2f} ({len(util)} oturum)")
+    if m["class_day_load"]:
+        peak = max(m["class_day_load"], key=lambda r: r["sinav"])
+        lines.append(f"  En yoğun sınıf-gün: {peak['sinif']}. sınıf, {peak['tarih']} ({peak['sinav']} sınav)")
+    if m["worst_students"]:
+        lines.append("  En çok etkilenen öğrenciler:")
+        for w in m["worst_students"][:10]:
+            lines.append(f"    {w['ogrenci_no']}: skor {w['skor']}, en yoğun gün {w['en_yogun_gun']}, "
+                         f"art arda {w['art_arda']}, çakışma {w['cakisma']}")
+    return lines
+
+
+def to_excel(m, filename="sinav_kalite_raporu.xlsx"):
+    """Göstergeleri sayfalara ayrılmış Excel dosyasına yazar."""
+    summary = [
+        ("Sınav sayısı", m["n_exams"]),
+        ("Öğrenci sayısı", m["n_students"]),
+        ("Öğrenci başına günlük en fazla sınav", m["max_exams_per_day"]),
+        ("Aynı gün birden fazla sınavı olan öğrenci", m["students_multi_exam_days"]),
+        ("Art arda sınav", m["back_to_back"]),
+        ("Art arda sınavı olan öğrenci", m["students_back_to_back"]),
+        ("Çakışma", m["conflicts"]),
+    ]
+    summary += [(f"Günde {n} sınav (öğrenci-gün)", c) for n, c in sorted(m["exams_per_day_hist"].items())]
+    summary += [(f"En kısa ara {k}", v) for k, v in m["min_gap_hist"].items()]
+    with pd.ExcelWriter(filename, engine="openpyxl") as writer:
+        pd.DataFrame(summary, columns=["Gösterge", "Değer"]).to_excel(writer, index=False, sheet_name="Özet")
+        pd.DataFrame(m["room_utilization"]).to_excel(writer, index=False, sheet_name="Oturum Doluluğu")
+        pd.DataFrame(m["class_day_load"]).to_excel(writer, index=False, sheet_name="Sınıf-Gün Yükü")
+        pd.DataFrame(m["worst_students"]).to_excel(writer, index=False, sheet_name="Etkilenen Öğrenciler")
+    return filename
@@ -0,0 +1,293 @@
+# schedule_versions.py
+"""
+Sınav takvimi sürümleri (vize / final / bütünleme, taslaklar).
+
+Her planlama çalıştırması takvim_surumleri'nde bir sürüme yazılır; sinavlar satırları
+surum_id taşır. Yayındaki plan yayindaki_takvim tablosunda (bolum, tur) başına tek satırlık
+bir işaretçidir: yayınlamak bu satırı tek UPDATE/INSERT ile değiştirmektir, okuyucular
+(yayindaki_sinavlar görünümü) eski ya da yeni planı bütün olarak görür. Taslak yazımı yalnızca
+kendi surum_id satırlarını siler/ekler; yayındaki plana kilit ya da TRUNCATE uygulanmaz.
+
+ogrenci_sinav yayındaki plandan türetilen tablodur; yayına alınan sürümde değişen dersler
+için refresh_ogrenci_sinav ile yalnızca farkı yazarak güncellenir (ders başına son yayın geçerli).
+
+Sürümlerden önce kaydedilmiş sınavlar ilk kurulumda bölüm başına "Önceki plan" sürümüne
+devralınır ve tur'u boş olarak yayına alınır: bölümün sürüm listesinde görünür, kaynak / tohum
+olarak seçilebilir, ancak published_id(bolum, tur) belirli bir tür için onu bulmaz.
+
+Aynı bölüm için yazan çalıştırmalar (panel, komut satırı, iş servisi) department_lock ile
+PostgreSQL danışma kilidi üzerinden sıraya girer.
+"""
+import time
+from contextlib import contextmanager
+
+# pg_advisory_lock(anahtar1, anahtar2) için uygulamaya ait ad alanı
+_LOCK_NAMESPACE = 7301
+
+
+@contextmanager
+def department_lock(db, bolum, cancel_token=None, timeout=None, poll=0.5):
+    """
+    Bölüm başına oturum düzeyinde danışma kilidi: aynı bölümü yazan başka bir bağlantı
+    bitirene kadar bekler. Kilit satırlara değil ada konur; okuyucular etkilenmez.
+    Bekleme pg_try_advisory_lock ile poll saniyede bir denenir (engelleyen pg_advisory_lock
+    iptal edilemez): cancel_token iptal edilirse SchedulingCancelled, timeout saniye içinde
+    alınamazsa TimeoutError fırlatılır.
+    """
+    key = (_LOCK_NAMESPACE, bolum or "")
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while not db.execute("SELECT pg_try_advisory_lock(%s, hashtext(%s))", key, fetchone=True)[0]:
+        if cancel_token is not None and cancel_token.cancelled:
+            # exam_scheduler bu modülü içe aktarır; döngüsel içe aktarmayı önlemek için burada
+            from exam_scheduler import SchedulingCancelled
+            raise SchedulingCancelled("Bölüm kilidi beklenirken iptal edildi.")
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeoutError(f"{bolum}: bölüm kilidi {timeout} sn içinde alınamadı (başka bir çalıştırma yazıyor)")
+        time.sleep(poll)
+    try:
+        yield
+    finally:
+        db.execute("SELECT pg_advisory_unlock(%s, hashtext(%s))", key)
+
+
+def create(db, ad=None, tur="", bolum="", source_id=None):
+    """
+    Yeni taslak sürüm açar ve id'sini döndürür. source_id verilirse o sürümün sınavları,
+    oturma planları ve gözetmen atamaları tek sorguda taslağa kopyalanır (artımlı planlama için).
+    """
+    vid = db.execute("SELECT nextval('takvim_surumleri_id_seq')", fetchone=True)[0]
+    db.execute(
+        "INSERT INTO takvim_surumleri (id, ad, tur, bolum, kaynak_id) VALUES (%s, %s, %s, %s, %s)",
+        (vid, ad or f"Taslak {vid}", tur or "", bolum or "", source_id)
+    )
+    if source_id is not None:
+        # Yeni sinav id'leri önceden alınır; oturma ve gozetmen_atama aynı eşlemeyle kopyalanır
+        db.execute(
+            """
+            WITH src AS (
+                SELECT id, nextval('sinavlar_id_seq') AS new_id, ders_id, tarih, saat, sure, derslik_id
+                FROM sinavlar WHERE surum_id=%s
+            ),
+            ins AS (
+                INSERT INTO sinavlar (id, ders_id, tarih, saat, sure, derslik_id, surum_id)
+                SELECT new_id, ders_id, tarih, saat, sure, derslik_id, %s FROM src
+            ),
+            seats AS (
+                INSERT INTO oturma (sinav_id, ogrenci_no, sira, sutun)
+                SELECT src.new_id, o.ogrenci_no, o.sira, o.sutun
+                FROM oturma o JOIN src ON src.id = o.sinav_id
+            )
+            INSERT INTO gozetmen_atama (sinav_id, gozetmen_id)
+            SELECT src.new_id, a.gozetmen_id
+            FROM gozetmen_atama a JOIN src ON src.id = a.sinav_id
+            """,
+            (source_id, vid)
+        )
+    return vid
+
+
+def list_versions(db, bolum=None):
+    """Sürümler (yeniden eskiye): [{"id", "ad", "tur", "bolum", "olusturma", "n_sinav", "yayinda"}]."""
+    q = """
+        SELECT v.id, v.ad, v.tur, v.bolum, v.olusturma,
+               (SELECT count(*) FROM sinavlar s WHERE s.surum_id = v.id),
+               y.surum_id IS NOT NULL
+        FROM takvim_surumleri v
+        LEFT JOIN yayindaki_takvim y ON y.surum_id = v.id
+    """
+    params = ()
+    if bolum is not None:
+        q += " WHERE v.bolum=%s"
+        params = (bolum,)
+    rows = db.execute(q + " ORDER BY v.id DESC", params, fetchall=True) or []
+    return [{"id": r[0], "ad": r[1], "tur": r[2], "bolum": r[3], "olusturma": r[4],
+             "n_sinav": r[5], "yayinda": r[6]} for r in rows]
+
+
+def published_id(db, bolum="", tur=None):
+    """Bölümün yayındaki sürümü; tur verilmezse en son yayınlanan. Yoksa None."""
+    q = "SELECT surum_id FROM yayindaki_takvim WHERE bolum=%s"
+    params = (bolum or "",)
+    if tur is not None:
+        q += " AND tur=%s"
+        params += (tur,)
+    row = db.execute(q + " ORDER BY yayin_zamani DESC LIMIT 1", params, fetchone=True)
+    return row[0] if row else None
+
+
+def publish(db, version_id):
+    """
+    Sürümü kendi (bolum, tur) anahtarı için yayına alır. Tek ifadelik upsert: önceki yayındaki
+    sürüm aynı anda yayından kalkar, ara durum oluşmaz.
+    Dönüş: yayındaki planı değişen ders id'leri (refresh_ogrenci_sinav için).
+    """
+    row = db.execute(
+        """
+        SELECT y.surum_id FROM takvim_surumleri v
+        JOIN yayindaki_takvim y ON y.bolum = v.bolum AND y.tur = v.tur
+        WHERE v.id=%s
+        """,
+        (version_id,), fetchone=True
+    )
+    previous = row[0] if row else None
+    db.execute(
+        """
+        INSERT INTO yayindaki_takvim (bolum, tur, surum_id, yayin_zamani)
+        SELECT bolum, tur, id, now() FROM takvim_surumleri WHERE id=%s
+        ON CONFLICT (bolum, tur) DO UPDATE
+        SET surum_id = EXCLUDED.surum_id, yayin_zamani = EXCLUDED.yayin_zamani
+        """,
+        (version_id,)
+    )
+    if previous == version_id:
+        return []
+    if previous is None:
+        rows = db.execute("SELECT DISTINCT ders_id FROM sinavlar WHERE surum_id=%s", (version_id,), fetchall=True)
+        return [r[0] for r in rows or []]
+    return [ch["ders_id"] for ch in diff(db, previous, version_id)]
+
+
+def refresh_ogrenci_sinav(db, version_id, ders_ids=None):
+    """
+    ogrenci_sinav'ı (no, ad, soyad, ders_id) yayına alınan sürümün planına göre günceller: her
+    ders için ilk oturumdaki derslik(ler)in kapasitesi kadar öğrenci, ogrenci_no sırasıyla.
+    Tablonun anahtarı (no, ders_id) sınav türünü ayırt etmez; bir ders birden fazla türde
+    yayındaysa en son yayınlanan sürümün satırları geçerlidir. Bu yüzden yalnızca verilen
+    sürüm okunur (yayindaki_sinavlar tüm bölüm ve türleri karıştırır).
+    ders_ids verilirse yalnızca o dersler (sürümden kaldırılanlar dahil) yeniden hesaplanır;
+    None ise sürümdeki tüm dersler. Yalnızca fark yazılır (çıkan satırlar silinir, yeni
+    satırlar eklenir); tek ifade olduğu için okuyucular commit'e kadar eski içeriği görür ve
+    tablo kilitlenmez. Ad/soyad ogrenciler'de hazırdır.
+    """
+    if ders_ids is not None and not ders_ids:
+        return
+    if ders_ids is None:
+        scope, params = "SELECT DISTINCT ders_id FROM sinavlar WHERE surum_id=%s", (version_id,)
+    else:
+        scope, params = "SELECT unnest(%s::int[]) AS ders_id", (list(ders_ids),)
+    db.execute(
+        f"""
+        WITH scope AS ({scope}),
+        first_slot AS (
+            SELECT s.ders_id, s.tarih, s.saat,
+                   ROW_NUMBER() OVER (PARTITION BY s.ders_id ORDER BY s.tarih, s.saat, s.id) AS rn
+            FROM sinavlar s
+            WHERE s.surum_id = %s AND s.ders_id IN (SELECT ders_id FROM scope)
+        ),
+        first_exam AS (
+            -- Bölünmüş sınavda ilk oturumdaki tüm parçaların kapasitesi toplanır
+            SELECT s.ders_id, SUM(l.kapasite) AS kapasite
+            FROM sinavlar s
+            JOIN first_slot f ON f.ders_id = s.ders_id AND f.rn = 1
+                             AND f.tarih = s.tarih AND f.saat = s.saat
+            JOIN derslikler l ON l.id = s.derslik_id
+            WHERE s.surum_id = %s
+            GROUP BY s.ders_id
+        ),
+        src AS (
+            SELECT od.ogrenci_no, od.ders_id,
+                   ROW_NUMBER() OVER (PARTITION BY od.ders_id ORDER BY od.ogrenci_no) AS rnk
+            FROM ogrenci_ders od
+            WHERE od.ders_id IN (SELECT ders_id FROM scope)
+        ),
+        want AS (
+            SELECT og.no, og.ad, og.soyad, s.ders_id
+            FROM src s
+            JOIN first_exam fe ON fe.ders_id = s.ders_id
+            JOIN ogrenciler og ON og.no = s.ogrenci_no
+            WHERE s.rnk <= fe.kapasite
+        ),
+        dropped AS (
+            DELETE FROM ogrenci_sinav o
+            WHERE o.ders_id IN (SELECT ders_id FROM scope)
+              AND NOT EXISTS (SELECT 1 FROM want w WHERE w.no = o.no AND w.ders_id = o.ders_id)
+        )
+        INSERT INTO ogrenci_sinav (no, ad, soyad, ders_id)
+        SELECT no, ad, soyad, ders_id FROM want
+        ON CONFLICT (no, ders_id) DO UPDATE SET ad = EXCLUDED.ad, soyad = EXCLUDED.soyad
+        WHERE (ogrenci_sinav.ad, ogrenci_sinav.soyad) IS DISTINCT FROM (EXCLUDED.ad, EXCLUDED.soyad)
+        """,
+        params + (version_id, version_id)
+    )
+
+
+def refresh_all_ogrenci_sinav(db):
+    """
+    Öğrenci kayıtları değişince tüm yayındaki sürümler için refresh_ogrenci_sinav; en eski
+    yayından en yeniye, böylece birden fazla türde yayındaki derste yine son yayın geçerlidir.
+    """
+    rows = db.execute("SELECT surum_id FROM yayindaki_takvim ORDER BY yayin_zamani", fetchall=True) or []
+    for (version_id,) in rows:
+        refresh_ogrenci_sinav(db, version_id)
+
+
+def delete(db, version_id):
+    """Taslağı siler (sınavlar, oturma ve gözetmen atamaları cascade ile). Yayındaki sürüm silinmez."""
+    db.execute(
+        "DELETE FROM takvim_surumleri WHERE id=%s "
+        "AND NOT EXISTS (SELECT 1 FROM yayindaki_takvim WHERE surum_id=%s)",
+        (version_id, version_id)
+    )
+
+
+def diff(db, old_id, new_id):
+    """
+    İki sürüm arasındaki farklar, ders başına tek satır (bölünmüş sınavın derslikleri dizi olarak).
+    Dönüş: [{"ders_id", "ders_kod", "degisim": eklendi/kaldirildi/tasindi/derslik,
+             "eski": (tarih, saat, sure, [derslik_id]) | None, "yeni": ... | None}]
+    """
+    rows = db.execute(
+        """
+        WITH a AS (
+            SELECT ders_id, min(tarih) AS tarih, min(saat) AS saat, max(sure) AS sure,
+                   array_agg(derslik_id ORDER BY derslik_id) AS rooms
+            FROM sinavlar WHERE surum_id=%s GROUP BY ders_id
+        ),
+        b AS (
+            SELECT ders_id, min(tarih) AS tarih, min(saat) AS saat, max(sure) AS sure,
+                   array_agg(derslik_id ORDER BY derslik_id) AS rooms
+            FROM sinavlar WHERE surum_id=%s GROUP BY ders_id
+        )
+        SELECT coalesce(a.ders_id, b.ders_id) AS ders_id, d.kod,
+               a.tarih, a.saat, a.sure, a.rooms, b.tarih, b.saat, b.sure, b.rooms
+        FROM a FULL JOIN b ON b.ders_id = a.ders_id
+        LEFT JOIN dersler d ON d.id = coalesce(a.ders_id, b.ders_id)
+        WHERE a.ders_id IS NULL OR b.ders_id IS NULL
+           OR (a.tarih, a.saat, a.sure, a.rooms) IS DISTINCT FROM (b.tarih, b.saat, b.sure, b.rooms)
+        ORDER BY coalesce(b.tarih, a.tarih), coalesce(b.saat, a.saat), d.kod
+        """,
+        (old_id, new_id), fetchall=True
+    ) or []
+    changes = []
+    for cid, kod, *rest in rows:
+        old = tuple(rest[:4]) if rest[0] is not None else None
+        new = tuple(rest[4:]) if rest[4] is not None else None
+        if old is None:
+            kind = "eklendi"
+        elif new is None:
+            kind = "kaldirildi"
+        elif old[:3] != new[:3]:
+            kind = "tasindi"
+        else:
+            kind = "derslik"
+        changes.append({"ders_id": cid, "ders_kod": kod, "degisim": kind, "eski": old, "yeni": new})
+    return changes
+
+
+def format_diff(changes):
+    """diff() çıktısının panelde gösterilecek satırları."""
+    def when(x):
+        return f"{x[0]} {x[1].strftime('%H:%M')} ({x[2]} dk, derslik {', '.join(map(str, x[3]))})"
+
+    labels = {"eklendi": "+", "kaldirildi": "-", "tasindi": "~", "derslik": "~"}
+    lines = [f"Fark: {len(changes)} ders"]
+    for ch in changes:
+        old, new = ch["eski"], ch["yeni"]
+        if old is None:
+            text = when(new)
+        elif new is None:
+            text = when(old)
+        else:
+            text = f"{when(old)} -> {when(new)}"
+        lines.append(f"  {labels[ch['degisim']]} {ch['ders_kod'] or ch['ders_id']}: {text}")
+    return lines
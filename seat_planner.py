@@ -0,0 +1,159 @@
+# seat_planner.py
+"""
+Oturma planı ve oturma PDF'i. Qt'ye bağlı değildir: panel, komut satırı (run_scheduler) ve iş
+servisi (job_service) aynı sınıfı kullanır; başsız süreçler arayüz kütüphanesini yüklemez.
+"""
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from connection import Database
+import ref_cache
+import invigilators
+from exam_scheduler import split_counts
+
+
+# Basit Oturma Planlayıcı
+class SeatPlanner:
+    def __init__(self, db: Database):
+        self.db = db
+
+    def get_students_for_exam(self, sinav_id: int):
+        row = self.db.execute(
+            "SELECT ders_id, derslik_id, tarih, saat, surum_id FROM sinavlar WHERE id=%s",
+            (sinav_id,), fetchone=True
+        )
+        if not row:
+            return []
+        ders_id, _, tarih, saat, surum_id = row
+        studs = self.db.execute(
+            "SELECT ogrenci_no FROM ogrenci_ders WHERE ders_id=%s ORDER BY ogrenci_no",
+            (ders_id,), fetchall=True
+        )
+        students = [s[0] for s in studs]
+
+        # Bölünmüş sınav: aynı sürüm ve oturumdaki parçalar id sırasıyla kapasiteleri kadar doldurulur
+        parts = self.db.execute(
+            "SELECT id, derslik_id FROM sinavlar "
+            "WHERE ders_id=%s AND tarih=%s AND saat=%s AND surum_id IS NOT DISTINCT FROM %s ORDER BY id",
+            (ders_id, tarih, saat, surum_id), fetchall=True
+        )
+        if parts and len(parts) > 1:
+            caps = [(ref_cache.for_db(self.db).room(rid) or {}).get("kapasite", 0) for _, rid in parts]
+            k = [pid for pid, _ in parts].index(sinav_id)
+            start, n = split_counts(caps, len(students))[k]
+            students = students[start:start + n]
+        return students
+
+    def get_room_info(self, derslik_id: int):
+        room = ref_cache.for_db(self.db).room(derslik_id)
+        if not room:
+            return None
+        return room["ad"], room["enine"], room["boyuna"], room["sira"]
+
+    def assign_seats(self, sinav_id: int):
+        row = self.db.execute(
+            "SELECT ders_id, derslik_id FROM sinavlar WHERE id=%s",
+            (sinav_id,), fetchone=True
+        )
+        if not row:
+            raise RuntimeError("Sınav bulunamadı")
+        derslik_id = row[1]
+
+        students = self.get_students_for_exam(sinav_id)
+        room = self.get_room_info(derslik_id)
+        if not room:
+            raise RuntimeError("Derslik bilgisi yok")
+
+        _, enine, boyuna, _ = room
+        capacity = int(enine) * int(boyuna)
+        if len(students) > capacity:
+            raise RuntimeError(f"Kapasite yetersiz: {len(students)} öğrenci, kapasite {capacity}")
+
+        assignments = []
+        idx = 0
+        for r in range(int(boyuna)):
+            for c in range(int(enine)):
+                if idx >= len(students):
+                    break
+                assignments.append({
+                    "ogrenci_no": students[idx][0] if isinstance(students[idx], tuple) else students[idx],
+                    "row": r + 1,
+                    "col": c + 1
+                })
+                idx += 1
+            if idx >= len(students):
+                break
+
+        # DB'ye yaz (mevcutları temizle)
+        self.db.execute("DELETE FROM oturma WHERE sinav_id=%s", (sinav_id,))
+        for a in assignments:
+            self.db.execute(
+                "INSERT INTO oturma (sinav_id, ogrenci_no, sira, sutun) VALUES (%s, %s, %s, %s)",
+                (sinav_id, a['ogrenci_no'], a['row'], a['col'])
+            )
+        return assignments
+
+    def export_pdf(self, sinav_id: int, output_path: str):
+        info = self.db.execute(
+            """
+            SELECT s.id, d.kod, d.ad, s.tarih, s.saat, l.ad, l.enine_sira, l.boyuna_sira
+            FROM sinavlar s
+            JOIN dersler d ON s.ders_id = d.id
+            JOIN derslikler l ON s.derslik_id = l.id
+            WHERE s.id = %s
+            """,
+            (sinav_id,), fetchone=True
+        )
+        if not info:
+            raise RuntimeError("Sınav bulunamadı")
+
+        # render_pdf satırları tek geçişte çizer; liste yerine akış verilir
+        assigns = self.db.stream(
+            """
+            SELECT o.ogrenci_no, ogr.adsoyad, o.sira, o.sutun
+            FROM oturma o
+            JOIN ogrenciler ogr ON o.ogrenci_no = ogr.no
+            WHERE o.sinav_id=%s
+            ORDER BY o.sira, o.sutun
+            """,
+            (sinav_id,)
+        )
+        return self.render_pdf(info, assigns, output_path, proctors=invigilators.proctor_names(self.db, sinav_id))
+
+    @staticmethod
+    def render_pdf(info, assigns, output_path: str, proctors=None):
+        """
+        export_pdf'in çizim aşaması; info sinav satırı, assigns (no, adsoyad, sira, sutun) satırları
+        (liste ya da akış), proctors gözetmen adları.
+        """
+        _, ders_kod, ders_ad, tarih, saat, room_ad, _, _ = info
+
+        c = canvas.Canvas(output_path, pagesize=A4)
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(40, 800, f"{ders_kod} - {ders_ad} Oturma Planı")
+
+        c.setFont("Helvetica", 10)
+        c.drawString(40, 785, f"Tarih: {tarih} Saat: {saat.strftime('%H:%M')} Derslik: {room_ad}")
+        if proctors:
+            c.drawString(40, 771, f"Gözetmen: {', '.join(proctors)}")
+
+        y = 755 if proctors else 760
+        c.setFont("Helvetica", 9)
+        c.drawString(40, y, "No")
+        c.drawString(120, y, "Ad Soyad")
+        c.drawString(360, y, "Sıra")
+        c.drawString(420, y, "Sütun")
+        y -= 14
+
+        for a in assigns:
+            c.drawString(40, y, str(a[0]))
+            c.drawString(120, y, str(a[1]))
+            c.drawString(360, y, str(a[2]))
+            c.drawString(420, y, str(a[3]))
+            y -= 12
+            if y < 60:
+                c.showPage()
+                y = 800
+
+        c.save()
+        return output_path
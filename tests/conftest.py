@@ -0,0 +1,73 @@
+# tests/conftest.py
+"""
+Testler veritabanı olmadan çalışır: planlayıcı plan() ile sentetik anlık görüntü üzerinde,
+SQL kullanan modüller FakeDB ile (sorgu metnine göre hazır cevap) sınanır.
+"""
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exam_scheduler import ExamScheduler  # noqa: E402
+
+
+def make_scheduler(times=("09:00", "13:30"), bekleme=15):
+    """Veritabanısız planlayıcı; yalnızca plan() ile kullanılır."""
+    return ExamScheduler(None, times_per_day=list(times), bekleme_suresi_minutes=bekleme)
+
+
+def make_snapshot(n_courses=6, students_per_course=20, rooms=((1, "A101", 40), (2, "A102", 40)),
+                  shared=()):
+    """
+    load_snapshot biçiminde sentetik girdi. Her dersin kendi öğrencileri vardır;
+    shared içindeki (ders_i, ders_j) çiftleri aynı öğrencileri paylaşır (çakışır).
+    """
+    students = {i: [f"{i:03d}{k:03d}" for k in range(students_per_course)] for i in range(1, n_courses + 1)}
+    for i, j in shared:
+        students[j] = list(students[i])
+    courses = [{"id": i, "kod": f"BLM{100 + i}", "ad": f"Ders {i}", "sinif": 1, "hoca": None,
+                "students": students[i], "n_students": len(students[i])}
+               for i in range(1, n_courses + 1)]
+    return {"courses": courses,
+            "rooms": [{"id": rid, "ad": ad, "kapasite": cap} for rid, ad, cap in rooms],
+            "room_blocks": {}}
+
+
+def as_existing(scheduled):
+    """plan() çıktısını load_existing_exams biçimine çevirir (sinav_id'ler sırayla verilir)."""
+    existing = {}
+    for i, se in enumerate(scheduled, start=1):
+        existing.setdefault(se["ders_id"], []).append({
+            "sinav_id": se.get("sinav_id", i), "ders_id": se["ders_id"], "tarih": se["tarih"],
+            "saat": se["saat"], "sure": se["sure"], "derslik_id": se["derslik_id"],
+        })
+    return existing
+
+
+@pytest.fixture
+def window():
+    # Pazartesi-Cuma
+    return date(2025, 6, 2), date(2025, 6, 6)
+
+
+class FakeDB:
+    """
+    Database.execute yerine geçer: yanıtlar sorgu metninde geçen bir parçaya göre
+    sırayla verilir, tüm çağrılar calls'a yazılır.
+    """
+    def __init__(self, answers=None):
+        self.answers = {k: list(v) for k, v in (answers or {}).items()}
+        self.calls = []
+
+    def execute(self, query, params=None, fetchone=False, fetchall=False):
+        self.calls.append((" ".join(query.split()), params))
+        for key, queue in self.answers.items():
+            if key in query and queue:
+                return queue.pop(0)
+        return [] if fetchall else None
+
+    def stream(self, query, params=None, itersize=2000):
+        return iter(self.execute(query, params, fetchall=True))
@@ -0,0 +1,31 @@
+# tests/test_department_lock.py
+import pytest
+
+import schedule_versions
+from conftest import FakeDB
+from exam_scheduler import CancelToken, SchedulingCancelled
+
+
+def test_lock_is_taken_and_released():
+    db = FakeDB({"pg_try_advisory_lock": [(False,), (True,)]})
+    with schedule_versions.department_lock(db, "BLM", poll=0):
+        pass
+    assert [q.split("(")[0] for q, _ in db.calls] == ["SELECT pg_try_advisory_lock"] * 2 + ["SELECT pg_advisory_unlock"]
+    assert db.calls[-1][1] == db.calls[0][1]
+
+
+def test_waiting_stops_on_cancel():
+    token = CancelToken()
+    token.cancel()
+    db = FakeDB({"pg_try_advisory_lock": [(False,)] * 3})
+    with pytest.raises(SchedulingCancelled):
+        with schedule_versions.department_lock(db, "BLM", cancel_token=token, poll=0):
+            pass
+    assert not any("unlock" in q for q, _ in db.calls)
+
+
+def test_waiting_is_bounded_by_timeout():
+    db = FakeDB({"pg_try_advisory_lock": [(False,)] * 1000})
+    with pytest.raises(TimeoutError):
+        with schedule_versions.department_lock(db, "BLM", timeout=0.05, poll=0.01):
+            pass
@@ -0,0 +1,61 @@
+# tests/test_enrollment_snapshot.py
+from datetime import datetime
+
+import enrollment_snapshot
+from conftest import FakeDB, make_snapshot
+from enrollment_snapshot import EnrollmentSnapshot
+from exam_scheduler import ExamScheduler, _CompactSnapshot
+
+ROWS = [(1, "2001"), (1, "2002"), (2, "2002"), (2, "2003"), (4, "2001")]
+SETUP = datetime(2025, 6, 1, 12, 0)
+
+
+def test_build_and_students_of():
+    snap = EnrollmentSnapshot.build(ROWS)
+    assert snap.student_numbers(snap.students_of(2)) == ["2002", "2003"]
+    assert len(snap.students_of(3)) == 0
+    students = snap.course_students(1)
+    assert list(students) == ["2001", "2002"] and len(students) == 2 and students[1] == "2002"
+    assert list(students.codes) == list(snap.students_of(1))
+
+
+def test_save_load_round_trip(tmp_path):
+    EnrollmentSnapshot.build(ROWS, version="3-x").save(str(tmp_path))
+    assert EnrollmentSnapshot.load(str(tmp_path), "4-x") is None
+    snap = EnrollmentSnapshot.load(str(tmp_path), "3-x")
+    assert snap.version == "3-x"
+    assert [list(snap.course_students(cid)) for cid in (1, 2, 4)] == [["2001", "2002"], ["2002", "2003"], ["2001"]]
+
+
+def _db(counter, rows=ROWS):
+    return FakeDB({"FROM degisiklik_sayaci": [(counter, SETUP)], "FROM ogrenci_ders": [rows]})
+
+
+def test_load_or_build_rebuilds_only_when_counter_changes(tmp_path):
+    cache = str(tmp_path)
+    first = enrollment_snapshot.load_or_build(_db(1), cache)
+    # Sayaç aynı: tablo okunmaz, diskteki görüntü açılır ya da eldeki nesne döner
+    db = _db(1)
+    again = enrollment_snapshot.load_or_build(db, cache)
+    assert not any("FROM ogrenci_ders" in q for q, _ in db.calls)
+    assert list(again.course_students(2)) == ["2002", "2003"]
+    assert enrollment_snapshot.load_or_build(_db(1), cache, current=first) is first
+    # Sayaç arttı: görüntü yeniden kurulur
+    db = _db(2, ROWS + [(5, "2004")])
+    fresh = enrollment_snapshot.load_or_build(db, cache, current=first)
+    assert any("FROM ogrenci_ders" in q for q, _ in db.calls)
+    assert list(fresh.course_students(5)) == ["2004"]
+
+
+def test_scheduler_uses_snapshot_codes_with_the_same_result(window):
+    snap = make_snapshot(n_courses=4, shared=[(1, 2)])
+    rows = sorted((c["id"], s) for c in snap["courses"] for s in c["students"])
+    enrollment = EnrollmentSnapshot.build(rows)
+    plain = ExamScheduler(None, times_per_day=["09:00", "13:30"]).plan(snap, *window)
+    for c in snap["courses"]:
+        c["students"] = enrollment.course_students(c["id"])
+    # Kodlar görüntüden kopyalanmadan alınır
+    assert all(isinstance(c.students, memoryview) for c in _CompactSnapshot(snap).courses)
+    mapped = ExamScheduler(None, times_per_day=["09:00", "13:30"]).plan(snap, *window)
+    key = [(se["ders_id"], se["tarih"], se["saat"], se["derslik_id"]) for se in plain["scheduled"]]
+    assert [(se["ders_id"], se["tarih"], se["saat"], se["derslik_id"]) for se in mapped["scheduled"]] == key
@@ -0,0 +1,46 @@
+# tests/test_incremental.py
+from conftest import as_existing, make_scheduler, make_snapshot
+
+
+def test_unchanged_plan_is_kept(window):
+    snap = make_snapshot()
+    first = make_scheduler().plan(snap, *window)
+    res = make_scheduler().plan(snap, *window, existing=as_existing(first["scheduled"]), other_courses=[])
+    assert res["stale"] == [] and res["scheduled"] == []
+    assert len(res["kept"]) == len(first["scheduled"])
+    assert all(se["fixed"] for se in res["kept"])
+
+
+def test_stored_duration_is_kept_without_override(window):
+    # Süre geçersiz kılmaları kaydedilmez: sonraki çalıştırma onları tekrar vermese de plan korunur
+    snap = make_snapshot()
+    overrides = {c["id"]: 40 for c in snap["courses"]}
+    first = make_scheduler().plan(snap, *window, per_course_durations=overrides)
+    res = make_scheduler().plan(snap, *window, existing=as_existing(first["scheduled"]), other_courses=[])
+    assert res["stale"] == []
+    assert {se["sure"] for se in res["kept"]} == {40}
+
+
+def test_explicit_duration_change_replaces_course(window):
+    snap = make_snapshot()
+    first = make_scheduler().plan(snap, *window)
+    res = make_scheduler().plan(snap, *window, per_course_durations={1: 120},
+                            existing=as_existing(first["scheduled"]), other_courses=[])
+    assert {ex["ders_id"] for ex in res["stale"]} == {1}
+    assert [se["sure"] for se in res["scheduled"] if se["ders_id"] == 1] == [120]
+    assert len(res["kept"]) == len(first["scheduled"]) - 1
+
+
+def test_new_conflict_replaces_later_course(window):
+    snap = make_snapshot(n_courses=2)
+    first = make_scheduler().plan(snap, *window)
+    existing = as_existing(first["scheduled"])
+    # İki ders aynı oturuma taşınmış ve artık öğrenci paylaşıyor: sonraki yeniden planlanır
+    ex1, ex2 = existing[1][0], existing[2][0]
+    ex2.update(tarih=ex1["tarih"], saat=ex1["saat"], derslik_id=2)
+    shared = make_snapshot(n_courses=2, shared=[(1, 2)])
+    res = make_scheduler().plan(shared, *window, existing=existing, other_courses=[])
+    assert [se["ders_id"] for se in res["kept"]] == [1]
+    assert {ex["ders_id"] for ex in res["stale"]} == {2}
+    placed = res["scheduled"][0]
+    assert (placed["tarih"], placed["saat"]) != (ex1["tarih"], ex1["saat"])
@@ -0,0 +1,15 @@
+# tests/test_instructors.py
+from datetime import date
+
+from conftest import make_scheduler, make_snapshot
+
+
+def test_shared_instructor_is_not_double_booked():
+    day = date(2025, 6, 2)
+    snap = make_snapshot(n_courses=2)
+    snap["courses"][0]["hoca"], snap["courses"][1]["hoca"] = "Ali Veli", "  ali  VELI "
+    res = make_scheduler(times=("09:00",)).plan(snap, day, day)
+    assert len(res["scheduled"]) == 1 and len(res["failed"]) == 1
+    snap["courses"][1]["hoca"] = "Ayşe Kaya"
+    res = make_scheduler(times=("09:00",)).plan(snap, day, day)
+    assert len(res["scheduled"]) == 2 and res["failed"] == []
@@ -0,0 +1,60 @@
+# tests/test_invigilators.py
+from datetime import date, time
+
+import invigilators
+
+D1, D2 = date(2025, 6, 2), date(2025, 6, 3)
+
+
+def _exam(d, hh, sure=60, n=30, hoca=None):
+    return {"tarih": d, "saat": time(hh, 0), "sure": sure, "n_students": n, "hoca": hoca}
+
+
+def _staff(*names, max_gorev=None):
+    return [{"id": i, "ad": ad, "max_gorev": max_gorev} for i, ad in enumerate(names, start=1)]
+
+
+def test_overlapping_exams_form_one_block():
+    exams = [_exam(D1, 9), _exam(D1, 9, sure=120), _exam(D1, 10, sure=30), _exam(D1, 13)]
+    blocks = invigilators.time_blocks(exams)
+    assert [sorted(b[3]) for b in blocks] == [[0, 1, 2], [3]]
+
+
+def test_no_double_booking_in_a_block():
+    exams = [_exam(D1, 9), _exam(D1, 9), _exam(D1, 9)]
+    res = invigilators.assign(exams, _staff("A", "B", "C"))
+    ids = [gid for a in res["assignments"] for gid in a]
+    assert len(ids) == 3 and len(set(ids)) == 3
+    assert res["unfilled"] == []
+
+
+def test_load_is_balanced():
+    exams = [_exam(d, hh) for d in (D1, D2) for hh in (9, 13)]
+    res = invigilators.assign(exams, _staff("A", "B"))
+    assert res["max_load"] == 2
+    assert sorted(res["loads"].values()) == [2, 2]
+
+
+def test_augmenting_path_moves_a_proctor():
+    # A her iki oturumda, B yalnızca ilkinde müsait: açgözlü dolum A'yı ilk oturuma koyar,
+    # artırıcı yol A'yı ikinciye kaydırıp ilkine B'yi yerleştirmeli
+    exams = [_exam(D1, 9), _exam(D1, 13)]
+    unavailable = {2: [(D1, time(12, 0), time(18, 0))]}
+    res = invigilators.assign(exams, _staff("A", "B"), unavailable)
+    assert res["assignments"] == [[2], [1]]
+    assert res["max_load"] == 1 and res["unfilled"] == []
+
+
+def test_unavailability_and_task_cap():
+    exams = [_exam(D1, 9), _exam(D1, 13), _exam(D2, 9)]
+    unavailable = {1: [(D2, None, None)]}
+    res = invigilators.assign(exams, _staff("A", max_gorev=1), unavailable)
+    assert res["loads"] == {1: 1}
+    assert len(res["unfilled"]) == 2
+
+
+def test_ratio_and_instructor_preference():
+    exams = [_exam(D1, 9, n=70, hoca="  b  "), _exam(D1, 9, n=10)]
+    res = invigilators.assign(exams, _staff("A", "B", "C", "D"), students_per_proctor=30)
+    assert len(res["assignments"][0]) == 3 and len(res["assignments"][1]) == 1
+    assert 2 in res["assignments"][0]
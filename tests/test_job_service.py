@@ -0,0 +1,45 @@
+# tests/test_job_service.py
+import os
+from concurrent.futures import Future
+
+import pytest
+
+from exam_scheduler import SchedulingCancelled
+from job_service import JobService
+from run_scheduler import ConfigError
+
+
+@pytest.fixture
+def service(tmp_path):
+    svc = JobService({}, workers=1, output_root=str(tmp_path))
+    yield svc
+    svc.shutdown()
+
+
+def test_output_paths_stay_under_the_root(service, tmp_path):
+    root = os.path.realpath(str(tmp_path))
+    assert service.output_path("output_dir", "pdf/blm") == os.path.join(root, "pdf", "blm")
+    for bad in ("/etc/passwd", "../x.pdf", "a/../../x.pdf", "a\\..\\x.pdf", ""):
+        with pytest.raises(ConfigError):
+            service.output_path("output_path", bad)
+    os.symlink("/tmp", os.path.join(root, "kacis"))
+    with pytest.raises(ConfigError):
+        service.output_path("output_dir", "kacis/x")
+
+
+def _finish(service, error):
+    job = {"id": 1, "bolum": "BLM", "status": "running"}
+    service.jobs[1] = job
+    service.busy.add("BLM")
+    future = Future()
+    future.set_exception(error)
+    service._finished(job, future)
+    return job
+
+
+def test_finished_keeps_the_error_message(service):
+    job = _finish(service, TimeoutError("BLM: 60 sn içinde bitmedi, planlama iptal edildi"))
+    assert (job["status"], job["error"]) == ("failed", "BLM: 60 sn içinde bitmedi, planlama iptal edildi")
+    job = _finish(service, SchedulingCancelled("Bölüm kilidi beklenirken iptal edildi."))
+    assert (job["status"], job["error"]) == ("cancelled", "Bölüm kilidi beklenirken iptal edildi.")
+    assert service.busy == set()
@@ -0,0 +1,36 @@
+# tests/test_ogrenci_sinav.py
+import schedule_versions
+from conftest import FakeDB
+
+
+def test_empty_change_list_writes_nothing():
+    db = FakeDB()
+    schedule_versions.refresh_ogrenci_sinav(db, 3, [])
+    assert db.calls == []
+
+
+def test_full_refresh_is_scoped_to_the_version():
+    db = FakeDB()
+    schedule_versions.refresh_ogrenci_sinav(db, 3)
+    (q, params), = db.calls
+    assert "WITH scope AS (SELECT DISTINCT ders_id FROM sinavlar WHERE surum_id=%s)" in q
+    assert params == (3, 3, 3)
+    # Yalnızca verilen sürüm okunur, karışık yayındaki görünüm değil
+    assert "yayindaki_sinavlar" not in q
+
+
+def test_incremental_refresh_covers_only_changed_courses():
+    db = FakeDB()
+    schedule_versions.refresh_ogrenci_sinav(db, 8, (4, 2))
+    (q, params), = db.calls
+    assert "unnest(%s::int[])" in q
+    assert params == ([4, 2], 8, 8)
+    # Kapsamdaki dersler için çıkan satırlar silinir, diğer dersler ellenmez
+    assert "DELETE FROM ogrenci_sinav o WHERE o.ders_id IN (SELECT ders_id FROM scope)" in q
+
+
+def test_refresh_all_walks_published_versions_oldest_first():
+    db = FakeDB({"FROM yayindaki_takvim": [[(5,), (2,)]]})
+    schedule_versions.refresh_all_ogrenci_sinav(db)
+    assert "ORDER BY yayin_zamani" in db.calls[0][0]
+    assert [params for _, params in db.calls[1:]] == [(5, 5, 5), (2, 2, 2)]
@@ -0,0 +1,111 @@
+# tests/test_prepared_statements.py
+import psycopg2.errors
+import pytest
+
+from connection import Database
+
+
+class FakeCursor:
+    """psycopg2 cursor yerine: çalıştırılan ifadeleri yazar, fail içindeki ifadede hata fırlatır."""
+    def __init__(self):
+        self.sent = []
+        self.fail = {}
+        self.rowcount = 1
+        self.description = None
+
+    def execute(self, query, params=None):
+        self.sent.append(query)
+        for prefix, exc in list(self.fail.items()):
+            if query.startswith(prefix):
+                del self.fail[prefix]
+                raise exc
+
+    def fetchone(self):
+        return (1,)
+
+    def fetchall(self):
+        return [(1,)]
+
+
+class FakeConn:
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def _db(threshold=2, size=64):
+    db = Database(prepare_threshold=threshold, prepared_cache_size=size)
+    db.conn, db.cur = FakeConn(), FakeCursor()
+    return db
+
+
+def _prepares(db):
+    return [q for q in db.cur.sent if q.startswith("PREPARE")]
+
+
+def test_repeated_query_is_prepared_then_executed():
+    db = _db()
+    q = "SELECT id FROM dersler WHERE kod=%s AND ad LIKE '%%x'"
+    for kod in ("A", "B", "C"):
+        db.execute(q, (kod,), fetchone=True)
+    assert db.cur.sent[0] == q
+    assert _prepares(db) == ["PREPARE ps_1 AS SELECT id FROM dersler WHERE kod=$1 AND ad LIKE '%x'"]
+    assert db.cur.sent[-1] == "EXECUTE ps_1 (%s)"
+
+
+def test_cte_and_leading_parenthesis_are_prepared():
+    db = _db(threshold=1)
+    db.execute("WITH s AS (SELECT unnest(%s::int[]) AS id) DELETE FROM t WHERE id IN (SELECT id FROM s)", ([1],))
+    db.execute("(SELECT 1 WHERE %s)", (True,), fetchone=True)
+    assert [p.split(" AS ", 1)[0] for p in _prepares(db)] == ["PREPARE ps_1", "PREPARE ps_2"]
+
+
+def test_unpreparable_queries_run_as_is():
+    db = _db(threshold=1)
+    db.execute("CREATE TABLE x (a int DEFAULT %s)", (1,))
+    db.execute("SELECT 1; SELECT %s", (2,), fetchone=True)
+    db.execute("SELECT 1")
+    assert _prepares(db) == []
+
+
+def test_least_recently_used_statement_is_deallocated():
+    db = _db(threshold=1, size=2)
+    for table in ("a", "b", "a", "c"):
+        db.execute(f"SELECT * FROM {table} WHERE id=%s", (1,), fetchall=True)
+    assert "DEALLOCATE ps_2" in db.cur.sent
+    assert list(db._prepared) == ["SELECT * FROM a WHERE id=%s", "SELECT * FROM c WHERE id=%s"]
+
+
+def test_ordinary_errors_keep_the_cache():
+    db = _db(threshold=1)
+    q = "INSERT INTO t (a) VALUES (%s)"
+    db.execute(q, (1,))
+    db.cur.fail["EXECUTE ps_1"] = psycopg2.errors.UniqueViolation("duplicate key")
+    with pytest.raises(psycopg2.errors.UniqueViolation):
+        db.execute(q, (1,))
+    assert db._prepared == {q: "ps_1"}
+    assert not any(s.startswith("DEALLOCATE") for s in db.cur.sent)
+
+
+def test_changed_result_type_deallocates_only_that_statement():
+    db = _db(threshold=1)
+    db.execute("SELECT * FROM a WHERE id=%s", (1,), fetchall=True)
+    db.execute("SELECT * FROM b WHERE id=%s", (1,), fetchall=True)
+    db.cur.fail["EXECUTE ps_1"] = psycopg2.errors.FeatureNotSupported("cached plan must not change result type")
+    with pytest.raises(psycopg2.errors.FeatureNotSupported):
+        db.execute("SELECT * FROM a WHERE id=%s", (1,), fetchall=True)
+    assert db.cur.sent[-1] == "DEALLOCATE ps_1"
+    assert list(db._prepared) == ["SELECT * FROM b WHERE id=%s"]
+    db.execute("SELECT * FROM a WHERE id=%s", (1,), fetchall=True)
+    assert _prepares(db)[-1].startswith("PREPARE ps_3 AS SELECT * FROM a")
+
+
+def test_missing_statement_resets_the_cache():
+    db = _db(threshold=1)
+    db.execute("SELECT * FROM a WHERE id=%s", (1,), fetchall=True)
+    db.cur.fail["EXECUTE ps_1"] = psycopg2.errors.InvalidSqlStatementName("prepared statement does not exist")
+    with pytest.raises(psycopg2.errors.InvalidSqlStatementName):
+        db.execute("SELECT * FROM a WHERE id=%s", (1,), fetchall=True)
+    assert db._prepared == {} and db._query_counts == {}
@@ -0,0 +1,43 @@
+# tests/test_query_stats.py
+import json
+
+from query_stats import BUCKETS_MS, QueryStats, format_report, normalize_query
+
+
+def test_literals_and_in_lists_collapse_to_one_key():
+    keys = {
+        normalize_query("SELECT * FROM dersler WHERE id IN (1, 2, 3) AND kod = 'BLM101'"),
+        normalize_query("SELECT * FROM dersler WHERE id IN (7)  AND kod = 'O''Neil'"),
+        normalize_query(b"SELECT * FROM dersler\n WHERE id IN (4,5) AND kod = '2.5'"),
+    }
+    assert keys == {"SELECT * FROM dersler WHERE id IN (...) AND kod = ?"}
+    # Yer tutuculu listeler de uzunluktan bağımsız tek kalıba iner
+    assert normalize_query("SELECT 1 FROM t WHERE id IN (%s)") == normalize_query("SELECT 1 FROM t WHERE id IN (%s,%s,%s)")
+    # Tanımlayıcıdaki rakamlar sabit değildir
+    assert normalize_query("SELECT ps_12 FROM t2") == "SELECT ps_12 FROM t2"
+
+
+def test_bucket_boundaries():
+    stats = QueryStats(slow_ms=None)
+    for ms in (0.2, 1, 1.01, 5, 999.9, 1000, 1000.1):
+        stats.record("SELECT 1", ms, 1, "t:f")
+    hist = stats.as_dict()["queries"]["SELECT ?"]["hist"]
+    assert len(hist) == len(BUCKETS_MS) + 1
+    # <=1: 0.2, 1 | <=5: 1.01, 5 | <=1000: 999.9, 1000 | >1000: 1000.1
+    assert hist == [2, 2, 0, 0, 0, 0, 2, 1]
+
+
+def test_slow_log_threshold(tmp_path):
+    log = tmp_path / "slow.jsonl"
+    stats = QueryStats(slow_ms=200, slow_log_path=str(log))
+    stats.record("SELECT * FROM sinavlar WHERE id=5", 199.9, 1, "a.py:f")
+    stats.record("SELECT * FROM sinavlar WHERE id=6", 200, 3, "a.py:g", error=ValueError())
+    slow = list(stats.slow)
+    assert [s["caller"] for s in slow] == ["a.py:g"]
+    assert slow[0]["query"] == "SELECT * FROM sinavlar WHERE id=?"
+    assert [json.loads(line)["ms"] for line in log.read_text(encoding="utf-8").splitlines()] == [200]
+    data = stats.as_dict()
+    entry = data["queries"]["SELECT * FROM sinavlar WHERE id=?"]
+    assert (entry["calls"], entry["rows"], entry["errors"]) == (2, 4, 1)
+    assert data["callers"] == {"a.py:f": 1, "a.py:g": 1}
+    assert any(line.startswith("Yavaş sorgular (>= 200 ms)") for line in format_report(data))
@@ -0,0 +1,15 @@
+# tests/test_room_calendar.py
+from conftest import make_scheduler, make_snapshot
+
+
+def test_blocked_room_is_not_used(window):
+    monday = window[0]
+    snap = make_snapshot(n_courses=4)
+    snap["room_blocks"] = {2: [(monday, None, None)]}
+    res = make_scheduler().plan(snap, *window)
+    assert res["failed"] == []
+    assert not any(se["derslik_id"] == 2 and se["tarih"] == monday for se in res["scheduled"])
+    # Tüm derslikleri kapalı gün aramaya girmez
+    snap["room_blocks"][1] = [(monday, None, None)]
+    res = make_scheduler().plan(snap, *window)
+    assert res["failed"] == [] and all(se["tarih"] != monday for se in res["scheduled"])
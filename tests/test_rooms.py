@@ -0,0 +1,22 @@
+# tests/test_rooms.py
+from datetime import date
+
+from conftest import make_scheduler, make_snapshot
+
+
+def test_course_is_split_across_rooms_when_no_room_fits():
+    day = date(2025, 6, 2)
+    snap = make_snapshot(n_courses=1, students_per_course=60)
+    res = make_scheduler(times=("09:00",)).plan(snap, day, day)
+    assert sorted(se["derslik_id"] for se in res["scheduled"]) == [1, 2]
+    assert len({(se["tarih"], se["saat"]) for se in res["scheduled"]}) == 1
+    res = make_scheduler(times=("09:00",)).plan(snap, day, day, split_rooms=False)
+    assert res["scheduled"] == [] and len(res["failed"]) == 1
+
+
+def test_best_fit_uses_smallest_room():
+    day = date(2025, 6, 2)
+    snap = make_snapshot(n_courses=2, students_per_course=30,
+                         rooms=((1, "B", 100), (2, "A", 30), (3, "C", 60)))
+    res = make_scheduler(times=("09:00",)).plan(snap, day, day)
+    assert sorted(se["derslik_id"] for se in res["scheduled"]) == [2, 3]
@@ -0,0 +1,22 @@
+# tests/test_run_report.py
+import time
+
+from run_report import RunReport
+
+
+def test_rebuilt_report_keeps_the_recorded_total():
+    data = {"total_wall": 12.5, "phases": {"search": {"wall": 10.0, "round_trips": 3, "rows_written": 0,
+                                                      "calls": 1}},
+            "counters": {"candidates_tried": 42}}
+    report = RunReport.from_dict(data)
+    time.sleep(0.01)
+    assert report.as_dict() == data
+    assert report.format()[2] == f"{'toplam':<24} {12.5:>9.3f}"
+
+
+def test_live_report_measures_from_start():
+    report = RunReport()
+    with report.phase("load"):
+        time.sleep(0.01)
+    data = report.as_dict()
+    assert data["total_wall"] >= data["phases"]["load"]["wall"] > 0
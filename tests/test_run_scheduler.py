@@ -0,0 +1,81 @@
+# tests/test_run_scheduler.py
+import json
+from datetime import date
+
+import pytest
+
+import run_scheduler
+from run_scheduler import ConfigError, build_job
+
+
+def _base(**over):
+    return {**run_scheduler.DEFAULTS, "start_date": "2025-06-02", "end_date": "2025-06-06", **over}
+
+
+def test_build_job_merges_and_validates():
+    job = build_job({"bolum": "BLM", "duration_default": 90}, _base())
+    assert (job["start_date"], job["duration_default"]) == (date(2025, 6, 2), 90)
+    assert build_job("BLM", _base())["bolum"] == "BLM"
+    for entry, base in [({}, _base()),
+                        ({"bolum": "BLM", "sure": 60}, _base()),
+                        ("BLM", _base(end_date="2025-06-01")),
+                        ("BLM", _base(times_per_day=["9.00"])),
+                        ("BLM", {**run_scheduler.DEFAULTS, "start_date": "2025-06-02"})]:
+        with pytest.raises(ConfigError):
+            build_job(entry, base)
+
+
+class _FakeDatabase:
+    def __init__(self, **kwargs):
+        self.conn = None
+
+    def connect(self):
+        print("Veritabanı bağlantısı başarılı")  # stdout'a yazan kütüphane davranışı
+
+
+def _write_config(tmp_path, departments):
+    path = tmp_path / "takvim.json"
+    path.write_text(json.dumps({"defaults": {"start_date": "2025-06-02", "end_date": "2025-06-06"},
+                                "departments": departments}), encoding="utf-8")
+    return str(path)
+
+
+def _run(capsys, argv):
+    code = run_scheduler.main(argv + ["--quiet"])
+    out = capsys.readouterr().out
+    return code, json.loads(out)  # stdout yalnızca JSON sonucu içerir
+
+
+def test_invalid_config_exits_2(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(run_scheduler, "Database", None)  # bağlantıya hiç gelinmemeli
+    code, out = _run(capsys, [_write_config(tmp_path, [{"bolum": "BLM", "end_date": "2025-13-01"}])])
+    assert code == run_scheduler.EXIT_CONFIG == out["exit_code"]
+    assert "geçersiz tarih" in out["error"] and out["departments"] == []
+
+    code, out = _run(capsys, [str(tmp_path / "yok.json")])
+    assert code == run_scheduler.EXIT_CONFIG
+
+
+def test_unplaced_courses_exit_1(tmp_path, capsys, monkeypatch):
+    def fake_run(db, job, **kwargs):
+        assert kwargs["dry_run"] is True
+        failed = [{"kod": "BLM101", "reason": "uygun oturum yok"}] if job["bolum"] == "BLM" else []
+        return {"bolum": job["bolum"], "status": "partial" if failed else "ok", "n_courses": 1,
+                "scheduled": [], "failed": failed}
+
+    monkeypatch.setattr(run_scheduler, "Database", _FakeDatabase)
+    monkeypatch.setattr(run_scheduler, "run_department", fake_run)
+    code, out = _run(capsys, [_write_config(tmp_path, ["BLM", "MAT"])])
+    assert code == run_scheduler.EXIT_PARTIAL == out["exit_code"]
+    assert [(d["bolum"], d["status"]) for d in out["departments"]] == [("BLM", "partial"), ("MAT", "ok")]
+
+
+def test_department_error_exits_3_and_fail_fast_stops(tmp_path, capsys, monkeypatch):
+    def fake_run(db, job, **kwargs):
+        raise RuntimeError("bağlantı koptu")
+
+    monkeypatch.setattr(run_scheduler, "Database", _FakeDatabase)
+    monkeypatch.setattr(run_scheduler, "run_department", fake_run)
+    code, out = _run(capsys, [_write_config(tmp_path, ["BLM", "MAT"]), "--fail-fast"])
+    assert code == run_scheduler.EXIT_ERROR
+    assert [(d["bolum"], d["status"], d["error"]) for d in out["departments"]] == [("BLM", "error", "bağlantı koptu")]
@@ -0,0 +1,51 @@
+# tests/test_schedule_quality.py
+from datetime import date, time
+
+import schedule_quality
+
+
+def _exam(ders_id, day, hour, minute=0, sure=60, **extra):
+    return dict(ders_id=ders_id, tarih=date(2025, 6, day), saat=time(hour, minute), sure=sure, **extra)
+
+
+def test_hand_checked_metrics():
+    scheduled = [
+        _exam(1, 2, 9, n_students=2, kapasite=2),   # 09:00-10:00
+        _exam(1, 2, 9, n_students=1, kapasite=2),   # bölünmüş sınavın ikinci parçası
+        _exam(2, 2, 10, 30),                        # 10:30-11:30
+        _exam(3, 2, 11),                            # 11:00-12:00, 2 ile çakışır
+        _exam(4, 3, 9),                             # kaydı olmayan ders (ara bir id)
+        _exam(5, 3, 13),
+        _exam(99, 4, 9),                            # kaydı olmayan ders (son id'den büyük)
+    ]
+    courses = [
+        {"id": 1, "students": ["A", "B", "D"]},
+        {"id": 2, "students": ["A"]},
+        {"id": 3, "students": ["A", "C", "D"]},
+        {"id": 5, "students": ["B"]},
+    ]
+    m = schedule_quality.compute(scheduled, schedule_quality.enrollment_from_courses(courses))
+
+    assert (m["n_exams"], m["n_students"]) == (6, 4)
+    # Öğrenci-gün: A 3 sınav, D 2, B iki ayrı günde 1+1, C 1
+    assert m["exams_per_day_hist"] == {1: 3, 2: 1, 3: 1}
+    assert (m["max_exams_per_day"], m["students_multi_exam_days"]) == (3, 2)
+    # A: 1->2 arası 30 dk (art arda), 2->3 çakışma; D: 1->3 arası tam 60 dk (art arda)
+    assert (m["back_to_back"], m["students_back_to_back"], m["conflicts"]) == (2, 2, 1)
+    # En kısa ara: D 1 sa (kova alt sınırı dahil), B 27 sa; A'nın negatif arası dağılıma girmez
+    assert m["min_gap_hist"] == {"0-1 sa": 0, "1-3 sa": 1, "3-12 sa": 0, "12-24 sa": 0,
+                                 "24-48 sa": 1, ">48 sa": 0}
+    assert m["worst_students"] == [
+        {"ogrenci_no": "A", "skor": 5 + 2 + 2, "en_yogun_gun": 3, "art_arda": 1, "cakisma": 1,
+         "en_kisa_ara_dk": -30},
+        {"ogrenci_no": "D", "skor": 2 + 1, "en_yogun_gun": 2, "art_arda": 1, "cakisma": 0,
+         "en_kisa_ara_dk": 60},
+    ]
+    first = m["room_utilization"][0]
+    assert (first["derslik"], first["ogrenci"], first["kapasite"], first["oran"]) == (2, 3, 4, 0.75)
+
+
+def test_no_enrollment_at_all():
+    m = schedule_quality.compute([_exam(1, 2, 9)], schedule_quality.enrollment_from_courses([]))
+    assert (m["n_exams"], m["n_students"], m["max_exams_per_day"]) == (1, 0, 0)
+    assert m["exams_per_day_hist"] == {} and m["worst_students"] == []
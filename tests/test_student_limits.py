@@ -0,0 +1,48 @@
+# tests/test_student_limits.py
+from datetime import datetime, timedelta
+
+from conftest import make_scheduler, make_snapshot
+
+
+def _interval(se):
+    start = datetime.combine(se["tarih"], se["saat"])
+    return start, start + timedelta(minutes=se["sure"])
+
+
+def test_shared_students_never_overlap_and_keep_bekleme(window):
+    # 10:30 oturumu 09:00 sınavı bitince (10:15) bekleme süresi dolmadan başlar
+    snap = make_snapshot(n_courses=4, shared=[(1, 2), (1, 3)])
+    res = make_scheduler(times=("09:00", "10:30", "14:00"), bekleme=30).plan(snap, *window)
+    assert res["failed"] == []
+    by_course = {se["ders_id"]: _interval(se) for se in res["scheduled"]}
+    for a, b in [(1, 2), (1, 3), (2, 3)]:
+        (s1, e1), (s2, e2) = sorted([by_course[a], by_course[b]])
+        assert s2 - e1 >= timedelta(minutes=30)
+
+
+def test_class_year_has_at_most_two_exams_a_day(window):
+    snap = make_snapshot(n_courses=6, rooms=((1, "A101", 40), (2, "A102", 40), (3, "A103", 40)))
+    res = make_scheduler(times=("09:00", "11:00", "13:30", "16:00")).plan(snap, *window)
+    per_day = {}
+    for se in res["scheduled"]:
+        per_day[se["tarih"]] = per_day.get(se["tarih"], 0) + 1
+    assert len(res["scheduled"]) == 6 and max(per_day.values()) == 2
+
+
+def test_student_day_limit(window):
+    snap = make_snapshot(n_courses=3, shared=[(1, 2), (1, 3)])
+    for i, c in enumerate(snap["courses"]):
+        c["sinif"] = i + 1  # sınıf/gün sınırı devreye girmesin
+    sched = make_scheduler(times=("09:00", "11:00", "13:30"))
+    assert len({se["tarih"] for se in sched.plan(snap, *window)["scheduled"]}) == 1
+    res = sched.plan(snap, *window, max_exams_per_student_day=1)
+    assert res["failed"] == [] and len({se["tarih"] for se in res["scheduled"]}) == 3
+
+
+def test_consecutive_limit(window):
+    snap = make_snapshot(n_courses=3, shared=[(1, 2), (1, 3)])
+    for i, c in enumerate(snap["courses"]):
+        c["sinif"] = i + 1
+    res = make_scheduler(times=("09:00", "11:00", "13:30")).plan(snap, *window, max_consecutive_exams=1)
+    same_day = sorted(se["saat"].hour for se in res["scheduled"] if se["tarih"] == window[0])
+    assert same_day == [9, 13]
@@ -0,0 +1,50 @@
+# tests/test_versions.py
+from datetime import date, time
+
+import schedule_versions
+from conftest import FakeDB
+
+
+def _diff_row(ders_id, kod, old=None, new=None):
+    none = (None, None, None, None)
+    return (ders_id, kod) + tuple(old or none) + tuple(new or none)
+
+
+def test_publish_same_version_changes_nothing():
+    db = FakeDB({"JOIN yayindaki_takvim": [(5,)]})
+    assert schedule_versions.publish(db, 5) == []
+    assert any("ON CONFLICT (bolum, tur)" in q for q, _ in db.calls)
+
+
+def test_first_publish_returns_all_courses():
+    db = FakeDB({"JOIN yayindaki_takvim": [None], "SELECT DISTINCT ders_id": [[(1,), (2,), (3,)]]})
+    assert schedule_versions.publish(db, 7) == [1, 2, 3]
+
+
+def test_publish_returns_changed_courses_from_diff():
+    slot = (date(2025, 6, 2), time(9, 0), 75, [1])
+    moved = (date(2025, 6, 3), time(9, 0), 75, [1])
+    db = FakeDB({"JOIN yayindaki_takvim": [(4,)],
+                 "FULL JOIN": [[_diff_row(2, "BLM102", slot, moved), _diff_row(9, "BLM109", new=slot)]]})
+    assert schedule_versions.publish(db, 7) == [2, 9]
+    q, params = db.calls[-1]
+    assert "FULL JOIN" in q and params == (4, 7)
+
+
+def test_diff_classifies_changes():
+    slot = (date(2025, 6, 2), time(9, 0), 75, [1])
+    rows = [
+        _diff_row(1, "BLM101", new=slot),
+        _diff_row(2, "BLM102", old=slot),
+        _diff_row(3, "BLM103", slot, (date(2025, 6, 2), time(13, 30), 75, [1])),
+        _diff_row(4, "BLM104", slot, (date(2025, 6, 2), time(9, 0), 75, [1, 2])),
+    ]
+    changes = schedule_versions.diff(FakeDB({"FULL JOIN": [rows]}), 1, 2)
+    assert [ch["degisim"] for ch in changes] == ["eklendi", "kaldirildi", "tasindi", "derslik"]
+    assert changes[0]["eski"] is None and changes[1]["yeni"] is None
+    assert changes[3]["yeni"][3] == [1, 2]
+
+    lines = schedule_versions.format_diff(changes)
+    assert lines[0] == "Fark: 4 ders"
+    assert lines[1] == "  + BLM101: 2025-06-02 09:00 (75 dk, derslik 1)"
+    assert lines[3].startswith("  ~ BLM103: 2025-06-02 09:00") and "-> 2025-06-02 13:30" in lines[3]